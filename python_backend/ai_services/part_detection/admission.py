@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque
+
+from core.config import settings
+from core.metrics import INFERENCE_IN_FLIGHT, INFERENCE_QUEUE_DEPTH, INFERENCE_QUEUE_WAIT, INFERENCE_REJECTED
+from core.timing import stage
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceOverloaded(Exception):
+    """Raised when an inference cannot be admitted; routes answer 503 with Retry-After"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Inference capacity exceeded ({reason}), retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Caps in-flight inferences for this process across all detectors and requests.
+
+    Up to ``max_concurrency`` inferences run at once and up to ``max_queue``
+    more wait, first come first served. Anything beyond that, or waiting
+    longer than ``queue_timeout``, fails fast with InferenceOverloaded
+    instead of queueing without bound, so latency for admitted requests
+    stays predictable and excess load is pushed back to clients.
+
+    Limits are per process: with several uvicorn workers on a node, divide
+    the node's budget between them.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Smoothed time a slot is held, for the Retry-After estimate
+        self._hold_seconds = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        return self._active
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue should have drained, at least 1"""
+        pending = self.queue_depth + 1
+        return max(1, math.ceil(self._hold_seconds * pending / max(1, self.max_concurrency)))
+
+    def _reject(self, reason: str):
+        INFERENCE_REJECTED.labels(reason=reason).inc()
+        raise InferenceOverloaded(reason, self.retry_after())
+
+    async def acquire(self) -> float:
+        """Wait for a slot and return the seconds spent queued"""
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            INFERENCE_IN_FLIGHT.set(self._active)
+            INFERENCE_QUEUE_WAIT.observe(0.0)
+            return 0.0
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        INFERENCE_QUEUE_DEPTH.set(len(self._waiters))
+        start = time.perf_counter()
+        try:
+            # Not wait_for: on 3.11 it swallows a cancellation that races the slot handover
+            async with asyncio.timeout(self.queue_timeout):
+                await waiter
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as we gave up; pass it on
+                self.release()
+            if isinstance(exc, asyncio.TimeoutError):
+                self._reject("timeout")
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            INFERENCE_QUEUE_DEPTH.set(len(self._waiters))
+        waited = time.perf_counter() - start
+        INFERENCE_QUEUE_WAIT.observe(waited)
+        return waited
+
+    def release(self):
+        """Free a slot, handing it straight to the oldest waiter if there is one"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+        INFERENCE_IN_FLIGHT.set(self._active)
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Hold an inference slot for the duration of the block"""
+        if not settings.INFERENCE_ADMISSION_ENABLED:
+            yield
+            return
+        # Rejections are timed too: a slow 503 is spent waiting here
+        with stage("admission"):
+            await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            held = time.perf_counter() - start
+            self._hold_seconds = held if self._hold_seconds == 0.0 else 0.8 * self._hold_seconds + 0.2 * held
+            self.release()
+
+
+inference_admission = AdmissionController(
+    max_concurrency=settings.INFERENCE_MAX_CONCURRENCY,
+    max_queue=settings.INFERENCE_MAX_QUEUE,
+    queue_timeout=settings.INFERENCE_QUEUE_TIMEOUT_SECONDS
+)
@@ -0,0 +1,17 @@
+"""Inference backends behind PartDetector, selected per model version (see MODEL_BACKENDS)."""
+
+from .base import InferenceBackend
+from .export import backend_for_version, ensure_onnx_model, export_onnx, onnx_path_for, resolve_weights
+from .onnx_backend import OnnxBackend
+from .ultralytics_backend import UltralyticsBackend
+
+__all__ = [
+    "InferenceBackend",
+    "OnnxBackend",
+    "UltralyticsBackend",
+    "backend_for_version",
+    "ensure_onnx_model",
+    "export_onnx",
+    "onnx_path_for",
+    "resolve_weights",
+]
@@ -0,0 +1,33 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+import numpy as np
+
+from ai_services.part_detection.detections import RawDetections
+
+
+class InferenceBackend(ABC):
+    """
+    A loaded detection model as seen by PartDetector.
+
+    Backends take BGR uint8 images at their own resolution and return boxes
+    in those images' pixels; letterboxing, NMS and rescaling are the
+    backend's business. ``predict`` is called from one thread at a time per
+    backend (see BATCH_MAX_CONCURRENT).
+    """
+
+    name = "base"
+    framework = ""
+
+    @property
+    def class_names(self) -> Dict[int, str]:
+        """Class id -> name"""
+        return {}
+
+    @property
+    def input_size(self) -> int:
+        return 640
+
+    @abstractmethod
+    def predict(self, images: List[np.ndarray], conf: float) -> List[RawDetections]:
+        """One forward pass over ``images``, keeping detections scored above ``conf``"""
@@ -0,0 +1,169 @@
+import logging
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import mlflow
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MLFLOW_MODEL_NAME = "part_detector"
+BACKENDS = ("ultralytics", "onnx")
+# Version names that are safe to use as a file name (no separators, no leading dot)
+_SAFE_VERSION = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]{0,63}")
+
+
+def backend_for_version(version: Optional[str]) -> str:
+    """Backend serving a model version: MODEL_BACKENDS[version] ("default" is MODEL_PATH), else INFERENCE_BACKEND"""
+    backend = settings.MODEL_BACKENDS.get(version or "default", settings.INFERENCE_BACKEND)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}' for model version '{version or 'default'}'")
+    return backend
+
+
+def local_weights_path(version: Optional[str]) -> str:
+    """The .pt configured for a version in MODEL_VERSIONS, or MODEL_PATH"""
+    if version and version in settings.MODEL_VERSIONS:
+        return settings.MODEL_VERSIONS[version]
+    return settings.MODEL_PATH
+
+
+def download_registered_artifact(version: Optional[str], download_dir: Optional[str] = None) -> Optional[Path]:
+    """Download the MLflow Model Registry artifact for a version, or None if it is not registered"""
+    try:
+        mlflow.set_tracking_uri(settings.MLFLOW_TRACKING_URI)
+        return Path(mlflow.artifacts.download_artifacts(
+            artifact_uri=f"models:/{MLFLOW_MODEL_NAME}/{version}", dst_path=download_dir
+        ))
+    except Exception as e:
+        logger.info(f"No MLflow artifact for model version '{version}': {e}")
+        return None
+
+
+def is_registered_version(version: str) -> bool:
+    """Whether the MLflow Model Registry has this (numeric) version of the part detector"""
+    if not (version.isascii() and version.isdigit()) or len(version) > 10:
+        return False
+    try:
+        client = mlflow.tracking.MlflowClient(tracking_uri=settings.MLFLOW_TRACKING_URI)
+        client.get_model_version(MLFLOW_MODEL_NAME, version)
+        return True
+    except Exception as e:
+        logger.info(f"Model version '{version}' is not registered: {e}")
+        return False
+
+
+def _find_file(artifact_dir: Optional[Path], suffix: str) -> Optional[str]:
+    files = sorted(artifact_dir.rglob(f"*{suffix}")) if artifact_dir is not None else []
+    return str(files[0]) if files else None
+
+
+def resolve_weights(
+    version: Optional[str],
+    download_dir: Optional[str] = None,
+    artifact_dir: Optional[Path] = None
+) -> str:
+    """
+    Find the PyTorch weights for a model version, in the order PartDetector loads them
+
+    The MLflow Model Registry artifact comes first (downloaded into
+    ``download_dir`` unless ``artifact_dir`` already holds it), then the
+    local path from MODEL_VERSIONS/MODEL_PATH.
+
+    Raises:
+        FileNotFoundError: Neither source has a .pt for this version
+    """
+    if artifact_dir is None:
+        artifact_dir = download_registered_artifact(version, download_dir)
+    weights = _find_file(artifact_dir, ".pt")
+    if weights is not None:
+        logger.info(f"Using weights {weights} from the MLflow Model Registry")
+        return weights
+
+    local_path = local_weights_path(version)
+    if Path(local_path).exists():
+        return local_path
+    raise FileNotFoundError(f"No weights for model version '{version or 'default'}' (looked in MLflow and {local_path})")
+
+
+def install_model_file(source: str, output_path: str, copy: bool = False):
+    """Move (or copy) a model file into place with a rename, so concurrent workers never load a half-written model"""
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    partial = f"{output_path}.{os.getpid()}.partial"
+    if copy:
+        shutil.copyfile(source, partial)
+    else:
+        shutil.move(source, partial)
+    os.replace(partial, output_path)
+
+
+def onnx_path_for(version: Optional[str]) -> str:
+    """Where the ONNX export of a model version lives"""
+    name = version or "default"
+    if not _SAFE_VERSION.fullmatch(name):
+        raise ValueError(f"Invalid model version {name!r}")
+    return os.path.join(settings.ONNX_MODEL_DIR, f"{name}.onnx")
+
+
+def export_onnx(
+    weights_path: str,
+    output_path: str,
+    input_size: int = 640,
+    dynamic: bool = True,
+    opset: Optional[int] = None
+) -> str:
+    """
+    Export YOLOv8 weights to ONNX with Ultralytics and move the file to ``output_path``
+
+    A dynamic export accepts any batch size and input shape, so micro-batches
+    and same-shaped batches padded to a minimal rectangle need no re-export.
+    """
+    from ultralytics import YOLO
+
+    # Ultralytics writes next to the weights; work on a copy so read-only model dirs are fine
+    with tempfile.TemporaryDirectory() as workdir:
+        weights_copy = os.path.join(workdir, Path(weights_path).name)
+        shutil.copyfile(weights_path, weights_copy)
+        exported = YOLO(weights_copy).export(
+            format="onnx", imgsz=input_size, dynamic=dynamic, opset=opset, simplify=False
+        )
+        install_model_file(str(exported), output_path)
+    logger.info(f"Exported {weights_path} to {output_path}")
+    return output_path
+
+
+def ensure_onnx_model(version: Optional[str]) -> str:
+    """
+    Path to a version's ONNX model, fetching or exporting it if it is not in ONNX_MODEL_DIR yet
+
+    Versions registered as ONNX (e.g. INT8 variants from scripts/quantize_model.py)
+    are downloaded from MLflow; others are exported from their weights if
+    ONNX_AUTO_EXPORT allows.
+
+    Raises:
+        FileNotFoundError: The model is missing and ONNX_AUTO_EXPORT is off, or there are no weights
+    """
+    path = onnx_path_for(version)
+    if os.path.exists(path):
+        return path
+    with tempfile.TemporaryDirectory() as download_dir:
+        artifact_dir = download_registered_artifact(version, download_dir)
+        registered = _find_file(artifact_dir, ".onnx")
+        if registered is not None:
+            logger.info(f"Using ONNX model {registered} from the MLflow Model Registry")
+            install_model_file(registered, path)
+            return path
+        if not settings.ONNX_AUTO_EXPORT:
+            raise FileNotFoundError(
+                f"ONNX model {path} not found; run scripts/export_onnx.py or enable ONNX_AUTO_EXPORT"
+            )
+        weights = resolve_weights(version, artifact_dir=artifact_dir)
+        return export_onnx(
+            weights, path, input_size=settings.MODEL_INPUT_SIZE,
+            dynamic=settings.ONNX_DYNAMIC, opset=settings.ONNX_OPSET
+        )
@@ -0,0 +1,188 @@
+import ast
+import logging
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from ai_services.part_detection.backends.base import InferenceBackend
+from ai_services.part_detection.detections import RawDetections, normalize_shape
+
+logger = logging.getLogger(__name__)
+
+# Per-class box offset for class-aware NMS in a single call (Ultralytics uses the same constant)
+MAX_WH = 7680
+PAD_VALUE = 114
+
+
+class OnnxBackend(InferenceBackend):
+    """
+    CPU inference on a YOLOv8 ONNX export through ONNX Runtime.
+
+    Pre- and post-processing mirror Ultralytics (letterbox with grey
+    padding, confidence filter on the best class, class-aware NMS, boxes
+    scaled back and clipped) so detections match the PyTorch model within
+    float tolerance. Dynamic exports batch any number of images; fixed-shape
+    exports run one image per call.
+    """
+
+    name = "onnx"
+    framework = "ONNX Runtime"
+
+    def __init__(
+        self,
+        model_path: str,
+        input_size: int = 640,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+        iou_threshold: float = 0.7,
+        max_detections: int = 300
+    ):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # 0 lets ONNX Runtime pick (one intra-op thread per physical core)
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = (
+            ort.ExecutionMode.ORT_PARALLEL if inter_op_threads > 1 else ort.ExecutionMode.ORT_SEQUENTIAL
+        )
+        self.model_path = model_path
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch, _, height, width = model_input.shape
+        self.dynamic = not isinstance(height, int) or not isinstance(width, int)
+        self.max_batch = None if not isinstance(batch, int) else batch
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.stride = int(metadata.get("stride", 32))
+        self._names = self._parse_names(metadata.get("names"))
+        if self.dynamic:
+            self._input_size = input_size
+        else:
+            self._input_size = max(height, width)
+        logger.info(
+            f"ONNX Runtime session for {model_path}: {'dynamic' if self.dynamic else f'{height}x{width}'} input, "
+            f"intra-op threads {intra_op_threads or 'auto'}, inter-op threads {inter_op_threads or 'auto'}"
+        )
+
+    @staticmethod
+    def _parse_names(raw) -> Dict[int, str]:
+        if not raw:
+            return {}
+        names = ast.literal_eval(raw)
+        if not isinstance(names, dict):
+            names = dict(enumerate(names))
+        return {int(k): str(v) for k, v in names.items()}
+
+    @property
+    def class_names(self) -> Dict[int, str]:
+        return self._names
+
+    @property
+    def input_size(self) -> int:
+        return self._input_size
+
+    def predict(self, images: List[np.ndarray], conf: float) -> List[RawDetections]:
+        if self.max_batch is not None and len(images) > self.max_batch:
+            results = []
+            for start in range(0, len(images), self.max_batch):
+                results.extend(self.predict(images[start:start + self.max_batch], conf))
+            return results
+
+        batch, letterboxes = self._preprocess(images)
+        # (batch, 4 + classes, anchors): xywh then one score per class
+        outputs = self.session.run(None, {self.input_name: batch})[0]
+        return [
+            self._postprocess(prediction, conf, letterbox, image.shape)
+            for prediction, letterbox, image in zip(outputs, letterboxes, images)
+        ]
+
+    def _target_shape(self, images: List[np.ndarray]) -> Tuple[int, int]:
+        """Network input (height, width) for this batch, as Ultralytics picks it"""
+        size = self._input_size
+        shapes = {image.shape[:2] for image in images}
+        if not self.dynamic or len(shapes) != 1:
+            return size, size
+        # Same-shaped images on a dynamic model get the smallest stride-aligned rectangle
+        height, width = shapes.pop()
+        ratio = min(size / height, size / width)
+        unpadded = (round(height * ratio), round(width * ratio))
+        return tuple(dim + (size - dim) % self.stride for dim in unpadded)
+
+    def _preprocess(self, images: List[np.ndarray]) -> Tuple[np.ndarray, List[Tuple[float, float, float]]]:
+        """Letterbox, BGR->RGB, HWC->CHW and scale to [0, 1] into one contiguous float32 batch"""
+        target_h, target_w = self._target_shape(images)
+        batch = np.empty((len(images), 3, target_h, target_w), dtype=np.float32)
+        letterboxes = []
+        for i, image in enumerate(images):
+            padded, letterbox = self._letterbox(image, target_h, target_w)
+            batch[i] = padded[:, :, ::-1].transpose(2, 0, 1)
+            letterboxes.append(letterbox)
+        batch *= 1 / 255.0
+        return batch, letterboxes
+
+    @staticmethod
+    def _letterbox(image: np.ndarray, target_h: int, target_w: int) -> Tuple[np.ndarray, Tuple[float, float, float]]:
+        """Resize keeping aspect ratio and pad to the target; returns the image and (ratio, pad_x, pad_y)"""
+        height, width = image.shape[:2]
+        ratio = min(target_h / height, target_w / width)
+        new_w, new_h = round(width * ratio), round(height * ratio)
+        if (new_w, new_h) != (width, height):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        pad_x, pad_y = (target_w - new_w) / 2, (target_h - new_h) / 2
+        top, bottom = round(pad_y - 0.1), round(pad_y + 0.1)
+        left, right = round(pad_x - 0.1), round(pad_x + 0.1)
+        padded = cv2.copyMakeBorder(
+            image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(PAD_VALUE, PAD_VALUE, PAD_VALUE)
+        )
+        return padded, (ratio, left, top)
+
+    def _postprocess(
+        self,
+        prediction: np.ndarray,
+        conf: float,
+        letterbox: Tuple[float, float, float],
+        image_shape: Tuple[int, ...]
+    ) -> RawDetections:
+        """Confidence filter, class-aware NMS and mapping back to image pixels for one image"""
+        prediction = prediction.T
+        class_scores = prediction[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        keep = scores > conf
+        if not keep.any():
+            return RawDetections.empty(image_shape)
+
+        xywh, scores, class_ids = prediction[keep, :4], scores[keep], class_ids[keep]
+        boxes = np.empty_like(xywh)
+        boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+        # Offsetting boxes by class keeps NMS from suppressing across classes
+        offset = (class_ids[:, None] * MAX_WH).astype(np.float32)
+        nms_boxes = np.concatenate([boxes[:, :2] + offset, xywh[:, 2:]], axis=1)
+        indices = cv2.dnn.NMSBoxes(
+            nms_boxes.tolist(), scores.tolist(), conf, self.iou_threshold, top_k=self.max_detections
+        )
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:self.max_detections]
+
+        ratio, pad_x, pad_y = letterbox
+        boxes = boxes[indices]
+        boxes[:, [0, 2]] -= pad_x
+        boxes[:, [1, 3]] -= pad_y
+        boxes /= ratio
+        height, width = image_shape[:2]
+        boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, width)
+        boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, height)
+        return RawDetections(
+            boxes=boxes.astype(np.float32, copy=False),
+            scores=scores[indices].astype(np.float32, copy=False),
+            class_ids=class_ids[indices].astype(np.int32),
+            image_shape=normalize_shape(image_shape)
+        )
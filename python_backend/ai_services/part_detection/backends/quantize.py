@@ -0,0 +1,196 @@
+import logging
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from ai_services.part_detection.backends.base import InferenceBackend
+from ai_services.part_detection.backends.onnx_backend import OnnxBackend
+from ai_services.part_detection.detections import RawDetections
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_METHODS = ("minmax", "percentile", "entropy")
+
+
+class ImageCalibrationReader:
+    """
+    Feeds calibration images to the ONNX Runtime quantizer, preprocessed
+    exactly as OnnxBackend does at serving time so activation ranges match
+    what the quantized model will see.
+    """
+
+    def __init__(self, backend: OnnxBackend, images: Iterator[np.ndarray]):
+        self.backend = backend
+        self.images = iter(images)
+        self.count = 0
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        image = next(self.images, None)
+        if image is None:
+            return None
+        self.count += 1
+        batch, _ = self.backend._preprocess([image])
+        return {self.backend.input_name: batch}
+
+
+def head_nodes_to_exclude(model_path: str) -> List[str]:
+    """
+    Detect-head nodes to leave in float: everything after the box and class
+    convolutions (DFL, anchor decoding, sigmoid, concat). Their outputs are
+    pixel coordinates and probabilities whose ranges INT8 cannot cover
+    without visibly shifting boxes and scores.
+    """
+    import onnx
+
+    graph = onnx.load(model_path, load_external_data=False).graph
+    output_names = {output.name for output in graph.output}
+    producers = [node.name for node in graph.node if output_names.intersection(node.output)]
+    if not producers or not producers[0].startswith("/model."):
+        return []
+    head_prefix = "/".join(producers[0].split("/")[:2]) + "/"
+    return [
+        node.name for node in graph.node
+        if node.name.startswith(head_prefix) and "/cv2." not in node.name and "/cv3." not in node.name
+    ]
+
+
+def quantize_onnx(
+    fp32_path: str,
+    output_path: str,
+    calibration_images: Iterator[np.ndarray],
+    calibration_method: str = "minmax",
+    per_channel: bool = True
+) -> Dict:
+    """
+    Post-training static INT8 quantization of a YOLOv8 ONNX export
+
+    Weights are quantized per channel to int8, activations to uint8 from
+    ranges observed on ``calibration_images``; QDQ format keeps the graph
+    runnable by any ONNX Runtime build.
+
+    Returns:
+        Parameters used, for the MLflow run
+    """
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if calibration_method not in CALIBRATION_METHODS:
+        raise ValueError(f"calibration_method must be one of {CALIBRATION_METHODS}")
+
+    backend = OnnxBackend(fp32_path)
+    reader = ImageCalibrationReader(backend, calibration_images)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    prepared_path = f"{output_path}.prepared"
+    # Constant folding and shape inference first, as ONNX Runtime recommends before quantizing
+    quant_pre_process(fp32_path, prepared_path, skip_symbolic_shape=True)
+    excluded = head_nodes_to_exclude(prepared_path)
+    try:
+        quantize_static(
+            prepared_path,
+            output_path,
+            reader,
+            quant_format=QuantFormat.QDQ,
+            per_channel=per_channel,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            nodes_to_exclude=excluded,
+            calibrate_method={
+                "minmax": CalibrationMethod.MinMax,
+                "percentile": CalibrationMethod.Percentile,
+                "entropy": CalibrationMethod.Entropy,
+            }[calibration_method]
+        )
+    finally:
+        if os.path.exists(prepared_path):
+            os.remove(prepared_path)
+    if reader.count == 0:
+        raise ValueError("No calibration images")
+    logger.info(f"Quantized {fp32_path} to {output_path} with {reader.count} calibration images")
+    return {
+        "calibration_images": reader.count,
+        "calibration_method": calibration_method,
+        "per_channel": per_channel,
+        "excluded_nodes": len(excluded),
+    }
+
+
+def _box_iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    top_left = np.maximum(box[:2], boxes[:, :2])
+    bottom_right = np.minimum(box[2:], boxes[:, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+    area = np.prod(np.clip(box[2:] - box[:2], 0, None))
+    areas = np.prod(np.clip(boxes[:, 2:] - boxes[:, :2], 0, None), axis=1)
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def compare_detections(
+    reference: List[RawDetections],
+    candidate: List[RawDetections],
+    iou_threshold: float = 0.5
+) -> Dict[str, float]:
+    """
+    How closely candidate detections reproduce the reference model's
+
+    Detections are matched greedily by score within each class at
+    ``iou_threshold``. Without labelled data the FP32 model is the ground
+    truth, so precision/recall here measure agreement, not absolute accuracy.
+    """
+    matched, score_deltas, ious = 0, [], []
+    for ref, cand in zip(reference, candidate):
+        taken = np.zeros(len(cand), dtype=bool)
+        for i in np.argsort(-ref.scores):
+            candidates = np.flatnonzero((cand.class_ids == ref.class_ids[i]) & ~taken)
+            if candidates.size == 0:
+                continue
+            overlaps = _box_iou(ref.boxes[i], cand.boxes[candidates])
+            best = overlaps.argmax()
+            if overlaps[best] < iou_threshold:
+                continue
+            taken[candidates[best]] = True
+            matched += 1
+            ious.append(overlaps[best])
+            score_deltas.append(abs(float(cand.scores[candidates[best]]) - float(ref.scores[i])))
+
+    reference_count = sum(len(raw) for raw in reference)
+    candidate_count = sum(len(raw) for raw in candidate)
+    precision = matched / candidate_count if candidate_count else 1.0
+    recall = matched / reference_count if reference_count else 1.0
+    return {
+        "reference_detections": reference_count,
+        "candidate_detections": candidate_count,
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        "mean_iou": float(np.mean(ious)) if ious else 0.0,
+        "mean_score_delta": float(np.mean(score_deltas)) if score_deltas else 0.0,
+    }
+
+
+def measure_latency(
+    backend: InferenceBackend,
+    images: List[np.ndarray],
+    conf: float,
+    batch_size: int = 8,
+    warmup: int = 2
+) -> Dict[str, float]:
+    """Single-image latency percentiles (ms) and batched throughput (images/s) over ``images``"""
+    for image in images[:warmup]:
+        backend.predict([image], conf)
+
+    latencies = []
+    for image in images:
+        start = time.perf_counter()
+        backend.predict([image], conf)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    for offset in range(0, len(images), batch_size):
+        backend.predict(images[offset:offset + batch_size], conf)
+    elapsed = time.perf_counter() - start
+    return {
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "throughput_images_per_s": len(images) / elapsed,
+    }
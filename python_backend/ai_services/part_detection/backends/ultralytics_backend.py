@@ -0,0 +1,46 @@
+from typing import Dict, List
+
+import numpy as np
+
+from ai_services.part_detection.backends.base import InferenceBackend
+from ai_services.part_detection.detections import RawDetections, normalize_shape
+
+
+class UltralyticsBackend(InferenceBackend):
+    """PyTorch inference through an Ultralytics YOLO model (or an MLflow pyfunc wrapping one)"""
+
+    name = "ultralytics"
+    framework = "Ultralytics"
+
+    def __init__(self, model):
+        self.model = model
+
+    @property
+    def class_names(self) -> Dict[int, str]:
+        names = self.model.model.names if hasattr(self.model, 'model') and hasattr(self.model.model, 'names') else {}
+        if not isinstance(names, dict):
+            names = dict(enumerate(names))
+        return names
+
+    @property
+    def input_size(self) -> int:
+        return getattr(self.model, 'imgsz', 640)
+
+    def predict(self, images: List[np.ndarray], conf: float) -> List[RawDetections]:
+        results = self.model.predict(images, conf=conf)
+        return [self._extract_raw(r, image.shape) for image, r in zip(images, results)]
+
+    @staticmethod
+    def _extract_raw(r, image_shape) -> RawDetections:
+        """Copy a YOLOv8 result's boxes, scores and classes out in one device-to-host transfer"""
+        boxes = r.boxes
+        if boxes is None or len(boxes) == 0:
+            return RawDetections.empty(image_shape)
+        # Rows are x1, y1, x2, y2, [track_id,] confidence, class
+        data = boxes.data.cpu().numpy()
+        return RawDetections(
+            boxes=data[:, :4].astype(np.float32, copy=False),
+            scores=data[:, -2].astype(np.float32, copy=False),
+            class_ids=data[:, -1].astype(np.int32),
+            image_shape=normalize_shape(image_shape)
+        )
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from core.timing import record_stage
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class _BatchItem:
+    image: np.ndarray
+    confidence_threshold: float
+    future: asyncio.Future = field(repr=False)
+    # perf_counter times: queued by submit, forward pass started and finished on the executor thread
+    submitted: float = 0.0
+    started: float = 0.0
+    finished: float = 0.0
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-image inference requests into batched forward passes.
+
+    Requests are queued on the event loop; a background worker collects up to
+    ``max_batch_size`` of them (waiting at most ``max_wait_ms`` after the first
+    arrives), runs ``run_batch`` once in the executor and resolves each caller's
+    future with its own result.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[np.ndarray], List[float]], List[Dict]],
+        executor: Executor,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        max_concurrent_batches: int = 1,
+        on_close: Optional[Callable[[], Any]] = None
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self._run_batch = run_batch
+        self._executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self._on_close = on_close
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, image: np.ndarray, confidence_threshold: float) -> Dict:
+        """
+        Queue an image for the next batch and wait for its result
+
+        Args:
+            image: Decoded BGR image
+            confidence_threshold: Minimum confidence threshold for this image's detections
+
+        Returns:
+            Detection results for this image only
+        """
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        self._ensure_worker()
+        item = _BatchItem(image, confidence_threshold, self._loop.create_future(), submitted=time.perf_counter())
+        self._queue.put_nowait(item)
+        result = await item.future
+        # Recorded here, in the caller's context, so they land on the caller's request timings
+        record_stage("queue", item.started - item.submitted)
+        record_stage("inference", item.finished - item.started)
+        return result
+
+    async def _collect(self, first: _BatchItem) -> List[_BatchItem]:
+        batch = [first]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                # Re-queue so the main loop sees it after this batch is dispatched
+                self._queue.put_nowait(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    async def _run(self):
+        slots = asyncio.Semaphore(self.max_concurrent_batches)
+        in_flight = set()
+
+        def _release(done_task):
+            in_flight.discard(done_task)
+            slots.release()
+
+        try:
+            while True:
+                first = await self._queue.get()
+                if first is _STOP:
+                    break
+                batch = await self._collect(first)
+                await slots.acquire()
+                task = self._loop.create_task(self._dispatch(batch))
+                in_flight.add(task)
+                task.add_done_callback(_release)
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+        finally:
+            if self._closed and self._on_close is not None:
+                self._on_close()
+
+    async def _dispatch(self, batch: List[_BatchItem]):
+        batch = [item for item in batch if not item.future.done()]
+        if not batch:
+            return
+
+        def run_timed(images, thresholds):
+            started = time.perf_counter()
+            try:
+                return self._run_batch(images, thresholds)
+            finally:
+                finished = time.perf_counter()
+                for item in batch:
+                    item.started, item.finished = started, finished
+
+        try:
+            results = await self._loop.run_in_executor(
+                self._executor,
+                run_timed,
+                [item.image for item in batch],
+                [item.confidence_threshold for item in batch]
+            )
+        except Exception as e:
+            logger.error(f"Error in batched inference ({len(batch)} images): {str(e)}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        for item, result in zip(batch, results):
+            if not item.future.done():
+                item.future.set_result(result)
+
+    def close(self):
+        """
+        Stop accepting requests. Queued requests are still served, after which
+        ``on_close`` is invoked. Safe to call from any thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        loop, worker = self._loop, self._worker
+        if worker is None or worker.done() or loop is None or loop.is_closed():
+            if self._on_close is not None:
+                self._on_close()
+            return
+        loop.call_soon_threadsafe(self._queue.put_nowait, _STOP)
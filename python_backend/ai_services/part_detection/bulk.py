@@ -0,0 +1,322 @@
+import json
+import logging
+import os
+import queue
+import tarfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from core.config import settings
+from ai_services.part_detection.decode_pool import DecodeProcessPool, decode_and_preprocess
+from ai_services.preprocessing.ingest import UploadTooLarge
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff")
+OUTPUT_FORMATS = ("jsonl", "parquet")
+
+# An entry is the image bytes, or the reason it cannot be read (e.g. UploadTooLarge)
+Entry = Tuple[str, Union[bytes, Exception]]
+
+_DONE = object()
+
+
+def _is_image(name: str) -> bool:
+    return name.lower().endswith(IMAGE_EXTENSIONS) and not os.path.basename(name).startswith(".")
+
+
+def iter_images(source: str, max_bytes: Optional[int] = None) -> Iterator[Entry]:
+    """
+    Image entries of a directory, ZIP or TAR archive, read one at a time
+
+    Directories are walked recursively in sorted order; TAR archives are read
+    as a stream, so compressed tarballs are never seeked or extracted to disk.
+    Entries larger than ``max_bytes`` are reported instead of read.
+    """
+    max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+    if os.path.isdir(source):
+        yield from _iter_directory(source, max_bytes)
+    elif zipfile.is_zipfile(source):
+        yield from _iter_zip(source, max_bytes)
+    elif tarfile.is_tarfile(source):
+        yield from _iter_tar(source, max_bytes)
+    else:
+        raise ValueError(f"Unsupported bulk source (expected a directory, ZIP or TAR archive): {source}")
+
+
+def _iter_directory(root: str, max_bytes: int) -> Iterator[Entry]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if not _is_image(filename):
+                continue
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, root)
+            if os.path.getsize(path) > max_bytes:
+                yield name, UploadTooLarge(max_bytes)
+                continue
+            with open(path, "rb") as f:
+                yield name, f.read()
+
+
+def _iter_zip(path: str, max_bytes: int) -> Iterator[Entry]:
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not _is_image(info.filename):
+                continue
+            # file_size comes from the archive header, so also cap what is actually inflated
+            if info.file_size > max_bytes:
+                yield info.filename, UploadTooLarge(max_bytes)
+                continue
+            with archive.open(info) as f:
+                data = f.read(max_bytes + 1)
+            yield info.filename, data if len(data) <= max_bytes else UploadTooLarge(max_bytes)
+
+
+def _iter_tar(path: str, max_bytes: int) -> Iterator[Entry]:
+    with tarfile.open(path, "r|*") as archive:
+        for member in archive:
+            if not member.isfile() or not _is_image(member.name):
+                continue
+            if member.size > max_bytes:
+                yield member.name, UploadTooLarge(max_bytes)
+                continue
+            yield member.name, archive.extractfile(member).read()
+
+
+class JsonLinesWriter:
+    """One JSON object per image, flushed as written"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, records: List[Dict]):
+        for record in records:
+            self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetResultWriter:
+    """Parquet file written one row group at a time, so only ``row_group_size`` rows are buffered"""
+
+    def __init__(self, path: str, row_group_size: int = 1000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.schema = pa.schema([
+            ("file", pa.string()),
+            ("width", pa.int32()),
+            ("height", pa.int32()),
+            ("detections", pa.list_(pa.struct([
+                ("bbox", pa.list_(pa.float32(), 4)),
+                ("confidence", pa.float32()),
+                ("class_id", pa.int32()),
+                ("class_name", pa.string()),
+                ("center", pa.list_(pa.float32(), 2))
+            ]))),
+            ("error", pa.string())
+        ])
+        self.row_group_size = row_group_size
+        self._rows: List[Dict] = []
+        self._writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, records: List[Dict]):
+        self._rows.extend(records)
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self.schema))
+            self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def open_writer(path: str, output_format: str = "jsonl"):
+    if output_format == "jsonl":
+        return JsonLinesWriter(path)
+    if output_format == "parquet":
+        return ParquetResultWriter(path)
+    raise ValueError(f"Unsupported output format: {output_format} (expected one of {', '.join(OUTPUT_FORMATS)})")
+
+
+class BulkDetectionPipeline:
+    """
+    Runs a PartDetector over an unbounded stream of images in constant memory.
+
+    A reader thread pulls entries from the source and hands them to a decode
+    thread pool; decoded frames are grouped into batches of ``batch_size``
+    for one ``detect_frames_sync`` forward pass each on the calling thread,
+    and a writer thread appends the results. Every hand-off is a bounded
+    queue, so at most about ``queue_size`` images are in memory at once
+    whatever the size of the archive, and a slow stage stalls the stages
+    before it instead of letting them run ahead. With a ``decode_pool`` the
+    decode threads only wait on worker processes, which do the actual work.
+    """
+
+    def __init__(
+        self,
+        detector,
+        confidence_threshold: float = 0.7,
+        batch_size: Optional[int] = None,
+        decode_workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        decode_pool: Optional[DecodeProcessPool] = None
+    ):
+        self.detector = detector
+        self.confidence_threshold = confidence_threshold
+        self.batch_size = batch_size or settings.BULK_BATCH_SIZE
+        self.decode_workers = decode_workers or settings.BULK_DECODE_WORKERS
+        self.queue_size = queue_size or settings.BULK_QUEUE_SIZE
+        self.decode_pool = decode_pool
+        if decode_pool is not None:
+            # One waiting thread per worker process keeps every process busy
+            self.decode_workers = max(self.decode_workers, decode_pool.workers)
+
+    def run(
+        self,
+        entries: Iterable[Entry],
+        writer,
+        on_progress: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """Detect parts in every entry, write one record per entry and return the totals"""
+        stop = threading.Event()
+        decoded: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        written: queue.Queue = queue.Queue(maxsize=max(2, self.queue_size // self.batch_size))
+        errors: List[BaseException] = []
+        summary = {"processed": 0, "failed": 0, "detections": 0}
+
+        with ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix="bulk-decode") as pool:
+            reader = threading.Thread(
+                target=self._read, args=(entries, pool, decoded, stop, errors), name="bulk-reader", daemon=True
+            )
+            writer_thread = threading.Thread(
+                target=self._write, args=(writer, written, stop, errors), name="bulk-writer", daemon=True
+            )
+            reader.start()
+            writer_thread.start()
+            try:
+                batch: List[Tuple[str, np.ndarray, Tuple[int, ...]]] = []
+                while not errors:
+                    item = decoded.get()
+                    if item is _DONE:
+                        break
+                    name, future = item
+                    try:
+                        image, original_shape = future.result()
+                    except Exception as exc:
+                        summary["failed"] += 1
+                        self._put(written, [self._error_record(name, exc)], stop)
+                        continue
+                    batch.append((name, image, original_shape))
+                    if len(batch) >= self.batch_size:
+                        self._detect(batch, written, stop, summary, on_progress)
+                        batch = []
+                if batch and not errors:
+                    self._detect(batch, written, stop, summary, on_progress)
+            except BaseException:
+                stop.set()
+                raise
+            finally:
+                self._put(written, _DONE, stop)
+                writer_thread.join()
+                stop.set()
+                reader.join()
+
+        if errors:
+            raise errors[0]
+        return summary
+
+    def _read(self, entries: Iterable[Entry], pool: ThreadPoolExecutor, decoded: queue.Queue, stop: threading.Event, errors: List):
+        try:
+            for name, data in entries:
+                future = pool.submit(self._decode, data)
+                if not self._put(decoded, (name, future), stop):
+                    future.cancel()
+                    return
+        except Exception as exc:
+            logger.error(f"Reading bulk source failed: {str(exc)}")
+            errors.append(exc)
+        finally:
+            self._put(decoded, _DONE, stop)
+
+    def _write(self, writer, written: queue.Queue, stop: threading.Event, errors: List):
+        while True:
+            try:
+                records = written.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    return
+                continue
+            if records is _DONE:
+                return
+            try:
+                writer.write(records)
+            except Exception as exc:
+                logger.error(f"Writing bulk results failed: {str(exc)}")
+                errors.append(exc)
+                stop.set()
+                return
+
+    @staticmethod
+    def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+        """Blocking put that gives up once the pipeline is stopping"""
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if stop.is_set():
+                    return False
+
+    def _decode(self, data: Union[bytes, Exception]) -> Tuple[np.ndarray, Tuple[int, ...]]:
+        if isinstance(data, Exception):
+            raise data
+        if self.decode_pool is not None:
+            return self.decode_pool.decode_sync(data)
+        target_size = settings.MODEL_INPUT_SIZE if settings.REDUCED_DECODE_ENABLED else None
+        return decode_and_preprocess(data, target_size, settings.DECODE_PREPROCESS_STEPS)
+
+    def _detect(self, batch, written: queue.Queue, stop: threading.Event, summary: Dict, on_progress):
+        names, images, original_shapes = zip(*batch)
+        try:
+            results = self.detector.detect_frames_sync(
+                list(images),
+                [self.confidence_threshold] * len(images),
+                original_shapes=list(original_shapes)
+            )
+            records = [self._record(name, result) for name, result in zip(names, results)]
+            summary["processed"] += len(records)
+            summary["detections"] += sum(len(record["detections"]) for record in records)
+        except Exception as exc:
+            logger.error(f"Bulk detection of {len(batch)} images failed: {str(exc)}")
+            records = [self._error_record(name, exc) for name in names]
+            summary["failed"] += len(records)
+        self._put(written, records, stop)
+        if on_progress is not None:
+            on_progress(dict(summary))
+
+    @staticmethod
+    def _record(name: str, result: Dict) -> Dict:
+        return {
+            "file": name,
+            "width": result["image_info"]["width"],
+            "height": result["image_info"]["height"],
+            "detections": result["detections"],
+            "error": None
+        }
+
+    @staticmethod
+    def _error_record(name: str, exc: Exception) -> Dict:
+        return {"file": name, "width": None, "height": None, "detections": [], "error": str(exc)}
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with an optional per-entry TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DetectionCache:
+    """
+    Content-addressed cache of detection results.
+
+    Keys combine the SHA-256 of the uploaded bytes with the model version and
+    confidence threshold, so a re-uploaded photo is answered without decoding
+    or inference. Lookups go to the in-process LRU first, then to Redis when a
+    client is configured; Redis hits are promoted into the local tier.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = 3600,
+        redis_client=None,
+        redis_prefix: str = "part-detection:result:"
+    ):
+        self.local = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.ttl_seconds = ttl_seconds
+        self.redis = redis_client
+        self.redis_prefix = redis_prefix
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "local_hits": 0, "redis_hits": 0, "redis_errors": 0}
+
+    @staticmethod
+    def image_digest(image_data) -> str:
+        """SHA-256 hex digest of the raw upload bytes"""
+        return hashlib.sha256(image_data).hexdigest()
+
+    @staticmethod
+    def make_key(image_digest: str, model_version: Optional[str], confidence_threshold: float) -> str:
+        return f"{image_digest}:{model_version or 'default'}:{confidence_threshold:.4f}"
+
+    def _count(self, *names: str):
+        with self._stats_lock:
+            for name in names:
+                self._stats[name] += 1
+
+    async def get(self, key: str) -> Optional[Dict]:
+        """Return a cached result (treat as read-only) or None"""
+        result = self.local.get(key)
+        if result is not None:
+            self._count("hits", "local_hits")
+            return result
+
+        if self.redis is not None:
+            try:
+                payload = await self.redis.get(self.redis_prefix + key)
+            except Exception as e:
+                logger.warning(f"Detection cache Redis lookup failed: {str(e)}")
+                self._count("redis_errors")
+                payload = None
+            if payload is not None:
+                result = json.loads(payload)
+                self.local.set(key, result)
+                self._count("hits", "redis_hits")
+                return result
+
+        self._count("misses")
+        return None
+
+    async def set(self, key: str, result: Dict):
+        self.local.set(key, result)
+        if self.redis is not None:
+            try:
+                payload = json.dumps(result)
+                if self.ttl_seconds:
+                    await self.redis.setex(self.redis_prefix + key, int(self.ttl_seconds), payload)
+                else:
+                    await self.redis.set(self.redis_prefix + key, payload)
+            except Exception as e:
+                logger.warning(f"Detection cache Redis store failed: {str(e)}")
+                self._count("redis_errors")
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["local_entries"] = len(self.local)
+        stats["redis_enabled"] = self.redis is not None
+        return stats
+
+    def clear(self):
+        self.local.clear()
+
+
+def _redis_tier():
+    if not settings.RESULT_CACHE_REDIS_ENABLED:
+        return None
+    try:
+        from core.database import redis_client
+        return redis_client
+    except Exception as e:
+        logger.warning(f"Redis result cache tier disabled: {str(e)}")
+        return None
+
+
+detection_cache = DetectionCache(
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+    redis_client=_redis_tier()
+)
+
+# Unfiltered per-image detections keyed by image hash + model version (see PartDetector.detect_parts)
+raw_detection_cache = LRUCache(
+    max_entries=settings.RAW_DETECTION_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from core.config import settings
+from ai_services.part_detection.frame_store import FrameHandle, SharedFrameStore, frame_store
+from ai_services.preprocessing.image_processor import ImageProcessor
+from ai_services.preprocessing.ingest import decode_image, decode_image_reduced
+
+logger = logging.getLogger(__name__)
+
+# Preprocessing operations that keep the image geometry, so boxes still map onto the upload
+PREPROCESS_STEPS = {
+    "enhance": "enhance_image",
+    "denoise": "denoise_image",
+    "sharpen": "sharpen_image",
+    "normalize": "normalize_image"
+}
+
+_processor = ImageProcessor()
+_worker_store: Optional[SharedFrameStore] = None
+
+
+def decode_and_preprocess(
+    data,
+    target_size: Optional[int] = None,
+    steps: Sequence[str] = ()
+) -> Tuple[np.ndarray, Tuple[int, ...]]:
+    """
+    Decode an upload and run preprocessing steps on it
+
+    Decodes at reduced resolution when ``target_size`` is given (see
+    decode_image_reduced). Returns the image and its full-resolution shape.
+    """
+    if target_size:
+        image, original_shape = decode_image_reduced(data, target_size)
+    else:
+        image = decode_image(data)
+        original_shape = image.shape
+    for step in steps:
+        image = getattr(_processor, PREPROCESS_STEPS[step])(image)
+    return image, tuple(original_shape)
+
+
+def _init_worker(transport: str, spool_dir: str, ttl_seconds: float, prefix: str):
+    global _worker_store
+    # One process per core already; OpenCV's own thread pool would oversubscribe it
+    cv2.setNumThreads(1)
+    _worker_store = SharedFrameStore(transport=transport, spool_dir=spool_dir, ttl_seconds=ttl_seconds, prefix=prefix)
+
+
+def _decode_in_worker(data: bytes, target_size: Optional[int], steps: Tuple[str, ...]) -> Tuple[Dict, Tuple[int, ...]]:
+    image, original_shape = decode_and_preprocess(data, target_size, steps)
+    return _worker_store.put(image).to_dict(), original_shape
+
+
+class DecodeProcessPool:
+    """
+    Decodes and preprocesses uploads in worker processes, off the GIL.
+
+    ``cv2.imdecode`` and preprocessing such as ``fastNlMeansDenoisingColored``
+    are CPU-bound and otherwise compete with inference threads for one
+    interpreter. Only the encoded bytes are pickled to a worker; the decoded
+    frame comes back through the shared frame store and is mapped into this
+    process with ``take``, so the pixels are never serialized.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        steps: Sequence[str] = (),
+        target_size: Optional[int] = None,
+        store: SharedFrameStore = frame_store,
+        start_method: str = "spawn"
+    ):
+        unknown = [step for step in steps if step not in PREPROCESS_STEPS]
+        if unknown:
+            raise ValueError(f"Unsupported preprocessing steps: {', '.join(unknown)} (expected {', '.join(PREPROCESS_STEPS)})")
+        self.workers = workers
+        self.steps = tuple(steps)
+        self.target_size = target_size
+        self.store = store
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            # Forking a process that already runs inference threads is unsafe
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(store.transport, store.spool_dir, store.ttl_seconds, store.prefix)
+        )
+
+    def submit(self, data):
+        """Start decoding in a worker; the future resolves to a (FrameHandle dict, original shape) pair"""
+        return self._executor.submit(_decode_in_worker, bytes(data), self.target_size, self.steps)
+
+    def _collect(self, outcome: Tuple[Dict, Tuple[int, ...]]) -> Tuple[np.ndarray, Tuple[int, ...]]:
+        handle, original_shape = outcome
+        return self.store.take(FrameHandle.from_dict(handle)), original_shape
+
+    async def decode(self, data) -> Tuple[np.ndarray, Tuple[int, ...]]:
+        """Decoded, preprocessed image and its full-resolution shape"""
+        outcome = await asyncio.wrap_future(self.submit(data))
+        return self._collect(outcome)
+
+    def decode_sync(self, data) -> Tuple[np.ndarray, Tuple[int, ...]]:
+        return self._collect(self.submit(data).result())
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_pool: Optional[DecodeProcessPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_decode_pool() -> Optional[DecodeProcessPool]:
+    """The process-wide decode pool, or None when DECODE_PROCESS_WORKERS is 0"""
+    global _pool
+    if settings.DECODE_PROCESS_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = DecodeProcessPool(
+                settings.DECODE_PROCESS_WORKERS,
+                steps=settings.DECODE_PREPROCESS_STEPS,
+                target_size=settings.MODEL_INPUT_SIZE if settings.REDUCED_DECODE_ENABLED else None,
+                start_method=settings.DECODE_PROCESS_START_METHOD
+            )
+            logger.info(f"Started decode process pool with {settings.DECODE_PROCESS_WORKERS} workers")
+        return _pool
+
+
+def shutdown_decode_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
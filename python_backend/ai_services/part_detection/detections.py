@@ -0,0 +1,65 @@
+from dataclasses import dataclass, replace
+from typing import Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class RawDetections:
+    """
+    Unfiltered detections for one image as parallel arrays.
+
+    ``boxes`` is (N, 4) xyxy in original image pixels, ``scores`` (N,) and
+    ``class_ids`` (N,). Keeping the arrays lets any confidence threshold at or
+    above the one used for inference be answered with a vectorized mask.
+    """
+
+    boxes: np.ndarray
+    scores: np.ndarray
+    class_ids: np.ndarray
+    image_shape: Tuple[int, int, int]
+
+    @classmethod
+    def empty(cls, image_shape: Tuple[int, ...]) -> "RawDetections":
+        return cls(
+            boxes=np.zeros((0, 4), dtype=np.float32),
+            scores=np.zeros((0,), dtype=np.float32),
+            class_ids=np.zeros((0,), dtype=np.int32),
+            image_shape=normalize_shape(image_shape)
+        )
+
+    def filter(self, confidence_threshold: float) -> "RawDetections":
+        """Detections with score >= confidence_threshold"""
+        keep = self.scores >= confidence_threshold
+        if keep.all():
+            return self
+        return RawDetections(
+            boxes=self.boxes[keep],
+            scores=self.scores[keep],
+            class_ids=self.class_ids[keep],
+            image_shape=self.image_shape
+        )
+
+    def rescaled(self, image_shape: Tuple[int, ...]) -> "RawDetections":
+        """Map boxes from the decoded (possibly downscaled) image onto ``image_shape`` pixels"""
+        shape = normalize_shape(image_shape)
+        if shape[:2] == self.image_shape[:2]:
+            return self
+        scale_y = shape[0] / self.image_shape[0]
+        scale_x = shape[1] / self.image_shape[1]
+        scale = np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+        return replace(self, boxes=self.boxes * scale, image_shape=shape)
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    @property
+    def nbytes(self) -> int:
+        return self.boxes.nbytes + self.scores.nbytes + self.class_ids.nbytes
+
+
+def normalize_shape(shape: Tuple[int, ...]) -> Tuple[int, int, int]:
+    """(height, width, channels) for colour or grayscale image shapes"""
+    height, width = shape[:2]
+    channels = shape[2] if len(shape) > 2 else 1
+    return (int(height), int(width), int(channels))
@@ -0,0 +1,318 @@
+import errno
+import fcntl
+import logging
+import mmap
+import os
+import secrets
+import struct
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from core.config import RUNTIME_DIR, settings
+
+logger = logging.getLogger(__name__)
+
+# Segment layout: refcount (int64), created_at (float64), padding, then the pixels
+_HEADER = struct.Struct("<qd")
+_HEADER_SIZE = 64
+
+SHM_TRANSPORT = "shm"
+SPOOL_TRANSPORT = "spool"
+
+
+@dataclass(frozen=True)
+class FrameHandle:
+    """What a task message carries instead of the pixels (JSON-serializable via to_dict)"""
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+    transport: str
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "shape": list(self.shape), "dtype": self.dtype, "transport": self.transport}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FrameHandle":
+        return cls(name=data["name"], shape=tuple(data["shape"]), dtype=data["dtype"], transport=data["transport"])
+
+
+class _Mapping:
+    """A writable buffer over one segment plus the callback that unmaps it"""
+
+    def __init__(self, buf: memoryview, close):
+        self.buf = buf
+        self._close = close
+
+    def close(self):
+        try:
+            self._close()
+        except BufferError:
+            # An array built on the buffer is still alive; it is unmapped when collected
+            logger.debug("Frame segment still referenced after use; deferring unmap to GC")
+
+
+class _SharedMemorySegments:
+    """POSIX shared memory (/dev/shm) segments"""
+
+    transport = SHM_TRANSPORT
+
+    def _open(self, name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+        try:
+            return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+        except TypeError:
+            # Before Python 3.13 every attach registers with the resource tracker, which would
+            # unlink the segment when this process exits; lifetime follows the refcount instead
+            segment = shared_memory.SharedMemory(name=name, create=create, size=size)
+            resource_tracker.unregister(segment._name, "shared_memory")
+            return segment
+
+    def create(self, name: str, size: int) -> _Mapping:
+        # tmpfs allocates lazily, so an oversized segment would only fail (SIGBUS) when written
+        if os.path.isdir("/dev/shm"):
+            stats = os.statvfs("/dev/shm")
+            if stats.f_bavail * stats.f_frsize < size:
+                raise OSError(errno.ENOSPC, "Not enough space in /dev/shm")
+        segment = self._open(name, create=True, size=size)
+        return _Mapping(segment.buf, segment.close)
+
+    def attach(self, name: str) -> _Mapping:
+        segment = self._open(name)
+        return _Mapping(segment.buf, segment.close)
+
+    def map(self, name: str):
+        """Buffer over the segment that stays mapped for as long as something references it"""
+        path = os.path.join("/dev/shm", name)
+        if os.path.exists(path):
+            # Linux exposes POSIX shared memory as files, which can be mapped without an owner to close
+            with open(path, "r+b") as f:
+                return mmap.mmap(f.fileno(), 0)
+        mapping = self.attach(name)
+        try:
+            return bytearray(mapping.buf)
+        finally:
+            mapping.close()
+
+    def unlink(self, name: str):
+        segment = self._open(name)
+        segment.close()
+        if hasattr(segment, "_track"):
+            segment.unlink()
+        else:
+            # unlink() unregisters from the tracker, so register first to keep it balanced
+            resource_tracker.register(segment._name, "shared_memory")
+            segment.unlink()
+
+    def names(self, prefix: str) -> List[str]:
+        if not os.path.isdir("/dev/shm"):
+            return []
+        return [name for name in os.listdir("/dev/shm") if name.startswith(prefix)]
+
+
+class _SpoolSegments:
+    """Memory-mapped files, for hosts without (or with a too small) /dev/shm"""
+
+    transport = SPOOL_TRANSPORT
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _map(self, f) -> _Mapping:
+        mapped = mmap.mmap(f.fileno(), 0)
+        f.close()
+        view = memoryview(mapped)
+
+        def close():
+            view.release()
+            mapped.close()
+
+        return _Mapping(view, close)
+
+    def create(self, name: str, size: int) -> _Mapping:
+        os.makedirs(self.directory, exist_ok=True)
+        f = open(self._path(name), "x+b")
+        f.truncate(size)
+        return self._map(f)
+
+    def attach(self, name: str) -> _Mapping:
+        return self._map(open(self._path(name), "r+b"))
+
+    def map(self, name: str):
+        with open(self._path(name), "r+b") as f:
+            return mmap.mmap(f.fileno(), 0)
+
+    def unlink(self, name: str):
+        os.unlink(self._path(name))
+
+    def names(self, prefix: str) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [name for name in os.listdir(self.directory) if name.startswith(prefix)]
+
+
+class SharedFrameStore:
+    """
+    Hands decoded frames from the API to Celery workers on the same host.
+
+    ``put`` copies a frame into a shared-memory segment and returns a small
+    FrameHandle for the task message; the worker maps the same pages with
+    ``consume`` instead of re-reading and re-decoding a file. Each segment
+    carries a refcount (the number of consumers) and is unlinked when the
+    last consumer releases it. Segments whose consumer never ran (lost
+    message, dead worker) are removed by ``sweep`` after ``ttl_seconds``.
+
+    The TTL counts from ``put``, not from last use, and a pending frame's
+    refcount looks the same as an orphan's, so ``ttl_seconds`` must outlast
+    the longest its task can sit in the queue (see FRAME_TASK_EXPIRES_SECONDS).
+    """
+
+    def __init__(
+        self,
+        transport: str = SHM_TRANSPORT,
+        spool_dir: str = os.path.join(RUNTIME_DIR, "frames"),
+        ttl_seconds: float = 600,
+        prefix: str = "pdframe"
+    ):
+        self.transport = transport
+        self.spool_dir = spool_dir
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.backends = {
+            SHM_TRANSPORT: _SharedMemorySegments(),
+            SPOOL_TRANSPORT: _SpoolSegments(spool_dir)
+        }
+        # Next to the spool so containers sharing the runtime volume also share the lock
+        self._lock_path = os.path.join(spool_dir, f".{prefix}.lock")
+        self._last_sweep = 0.0
+
+    @contextmanager
+    def _locked(self):
+        """Cross-process lock around refcount updates and unlinks"""
+        os.makedirs(os.path.dirname(self._lock_path), exist_ok=True)
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def put(self, image: np.ndarray, consumers: int = 1) -> FrameHandle:
+        """Copy ``image`` into a new segment that ``consumers`` tasks will release"""
+        image = np.ascontiguousarray(image)
+        name = f"{self.prefix}_{secrets.token_hex(8)}"
+        size = _HEADER_SIZE + image.nbytes
+        transport = self.transport
+        try:
+            mapping = self.backends[transport].create(name, size)
+        except OSError as e:
+            if transport != SHM_TRANSPORT:
+                raise
+            logger.warning(f"Shared memory segment of {size} bytes unavailable ({str(e)}); spooling frame to disk")
+            transport = SPOOL_TRANSPORT
+            mapping = self.backends[transport].create(name, size)
+
+        try:
+            _HEADER.pack_into(mapping.buf, 0, consumers, time.time())
+            frame = np.ndarray(image.shape, dtype=image.dtype, buffer=mapping.buf, offset=_HEADER_SIZE)
+            frame[...] = image
+            del frame
+        finally:
+            mapping.close()
+
+        if time.monotonic() - self._last_sweep > self.ttl_seconds / 2:
+            self.sweep()
+        return FrameHandle(name=name, shape=tuple(image.shape), dtype=image.dtype.str, transport=transport)
+
+    @contextmanager
+    def open(self, handle: FrameHandle) -> Iterator[np.ndarray]:
+        """Read-only view of a stored frame, valid inside the ``with`` block"""
+        mapping = self.backends[handle.transport].attach(handle.name)
+        try:
+            frame = np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=mapping.buf, offset=_HEADER_SIZE)
+            frame.flags.writeable = False
+            yield frame
+        finally:
+            frame = None
+            mapping.close()
+
+    def release(self, handle: FrameHandle):
+        """Drop one consumer's reference; the segment is unlinked with the last one"""
+        backend = self.backends[handle.transport]
+        with self._locked():
+            try:
+                mapping = backend.attach(handle.name)
+            except FileNotFoundError:
+                return
+            try:
+                refcount, created_at = _HEADER.unpack_from(mapping.buf, 0)
+                refcount -= 1
+                _HEADER.pack_into(mapping.buf, 0, refcount, created_at)
+            finally:
+                mapping.close()
+            if refcount <= 0:
+                backend.unlink(handle.name)
+
+    @contextmanager
+    def consume(self, handle: FrameHandle) -> Iterator[np.ndarray]:
+        """open() then release(), for a task that is the frame's consumer"""
+        try:
+            with self.open(handle) as frame:
+                yield frame
+        finally:
+            self.release(handle)
+
+    def take(self, handle: FrameHandle) -> np.ndarray:
+        """
+        Map a frame as a standalone array and release this consumer's reference
+
+        No pixels are copied: the mapping outlives the unlink and its pages are
+        freed when the returned array is garbage collected.
+        """
+        buffer = self.backends[handle.transport].map(handle.name)
+        try:
+            dtype = np.dtype(handle.dtype)
+            count = int(np.prod(handle.shape))
+            return np.frombuffer(buffer, dtype=dtype, count=count, offset=_HEADER_SIZE).reshape(handle.shape)
+        finally:
+            self.release(handle)
+
+    def sweep(self) -> int:
+        """Unlink segments older than ttl_seconds; returns how many were removed"""
+        self._last_sweep = time.monotonic()
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        with self._locked():
+            for backend in self.backends.values():
+                for name in backend.names(self.prefix):
+                    try:
+                        mapping = backend.attach(name)
+                        try:
+                            _, created_at = _HEADER.unpack_from(mapping.buf, 0)
+                        finally:
+                            mapping.close()
+                        if created_at < cutoff:
+                            backend.unlink(name)
+                            removed += 1
+                    except (FileNotFoundError, ValueError, struct.error):
+                        continue
+        if removed:
+            logger.warning(f"Removed {removed} expired shared frames")
+        return removed
+
+    def __len__(self) -> int:
+        return sum(len(backend.names(self.prefix)) for backend in self.backends.values())
+
+
+frame_store = SharedFrameStore(
+    transport=settings.FRAME_STORE_TRANSPORT,
+    spool_dir=settings.FRAME_STORE_SPOOL_DIR,
+    ttl_seconds=settings.FRAME_STORE_TTL_SECONDS
+)
@@ -4,11 +4,22 @@ from typing import Dict, List, Tuple, Optional
 import logging
 from pathlib import Path
 import asyncio
+import time
 from concurrent.futures import ThreadPoolExecutor
 import mlflow
 
 from ultralytics import YOLO
 from core.config import settings
+from core.timing import record_stage, stage
+from ai_services.part_detection.admission import inference_admission
+from ai_services.part_detection.backends import (
+    InferenceBackend, OnnxBackend, UltralyticsBackend, backend_for_version, ensure_onnx_model
+)
+from ai_services.part_detection.batching import MicroBatcher
+from ai_services.part_detection.cache import detection_cache, raw_detection_cache
+from ai_services.part_detection.decode_pool import decode_and_preprocess, get_decode_pool
+from ai_services.part_detection.detections import RawDetections
+from ai_services.preprocessing.ingest import open_upload
 
 logger = logging.getLogger(__name__)
 
@@ -17,11 +28,36 @@ class PartDetector:
     
     def __init__(self, version: Optional[str] = "1"):
         self.model = None
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.backend: Optional[InferenceBackend] = None
+        self.executor = ThreadPoolExecutor(max_workers=settings.INFERENCE_THREADS)
         self.version = version
         self._load_model()
+        self.class_names = self._build_class_name_table()
+        self.batcher = MicroBatcher(
+            self._predict_batch,
+            self.executor,
+            max_batch_size=settings.BATCH_MAX_SIZE,
+            max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+            max_concurrent_batches=settings.BATCH_MAX_CONCURRENT,
+            on_close=self._shutdown_executor
+        )
     
     def _load_model(self):
+        """Load this version's model on the backend chosen by MODEL_BACKENDS / INFERENCE_BACKEND"""
+        if backend_for_version(self.version) == "onnx":
+            self.backend = OnnxBackend(
+                ensure_onnx_model(self.version),
+                input_size=settings.MODEL_INPUT_SIZE,
+                intra_op_threads=settings.ONNX_INTRA_OP_THREADS,
+                inter_op_threads=settings.ONNX_INTER_OP_THREADS
+            )
+            self.model = self.backend
+        else:
+            self.model = self._load_ultralytics_model()
+            self.backend = UltralyticsBackend(self.model)
+        logger.info(f"Model version '{self.version or 'default'}' served by the {self.backend.name} backend")
+
+    def _load_ultralytics_model(self):
         """Load the YOLOv8 model from MLflow Model Registry"""
         try:
             mlflow.set_tracking_uri(settings.MLFLOW_TRACKING_URI)
@@ -29,8 +65,9 @@ class PartDetector:
             model_uri = f"models:/{model_name}/{self.version}"
             
             logger.info(f"Loading model '{model_name}' version '{self.version}' from MLflow Model Registry...")
-            self.model = mlflow.pyfunc.load_model(model_uri)
+            model = mlflow.pyfunc.load_model(model_uri)
             logger.info("YOLOv8 model loaded successfully from MLflow Model Registry")
+            return model
         except Exception as e:
             logger.error(f"Failed to load model from MLflow Model Registry: {str(e)}")
             logger.warning("Falling back to loading model from local path.")
@@ -43,112 +80,349 @@ class PartDetector:
                 model_path = Path(model_path_str)
                 if not model_path.exists():
                     logger.warning(f"Model not found at {model_path}, using default YOLOv8n")
-                    self.model = YOLO('yolov8n.pt')
+                    model = YOLO('yolov8n.pt')
                 else:
-                    self.model = YOLO(str(model_path))
+                    model = YOLO(str(model_path))
                 logger.info("YOLOv8 model loaded successfully from local path")
+                return model
             except Exception as fallback_e:
                 logger.error(f"Failed to load model from local path: {fallback_e}")
                 raise fallback_e
 
-    async def detect_parts(self, image_file, confidence_threshold: float = 0.7) -> Dict:
+    def _build_class_name_table(self) -> np.ndarray:
+        """Precompute class id -> name so post-processing is a single array lookup"""
+        names = self.backend.class_names
+        size = max(names) + 1 if names else 0
+        return np.array([names.get(i, f"class_{i}") for i in range(size)], dtype=object)
+
+    async def detect_parts(
+        self,
+        image_file,
+        confidence_threshold: float = 0.7,
+        include_columnar: bool = False,
+        include_arrays: bool = False
+    ) -> Dict:
         """
         Detect spare parts in the provided image
         
         Args:
             image_file: File-like object containing the image
             confidence_threshold: Minimum confidence threshold for detections
+            include_columnar: Also return detections as parallel arrays under "columnar"
+            include_arrays: Also attach the numpy detection arrays under "arrays" for the
+                binary response encoders (not cached and not JSON-serializable)
             
         Returns:
             Dictionary with detection results
         """
         try:
-            # Read image
-            image_data = image_file.read()
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if image is None:
-                raise ValueError("Could not decode image")
-            
-            # Run inference in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            results = await loop.run_in_executor(
-                self.executor,
-                self._run_inference,
-                image,
-                confidence_threshold
-            )
+            # The upload is viewed in place (spool buffer or mmap) rather than copied into bytes
+            with open_upload(image_file) as image_data:
+                with stage("cache"):
+                    digest = None
+                    if settings.RESULT_CACHE_ENABLED or settings.RAW_DETECTION_CACHE_ENABLED:
+                        digest = detection_cache.image_digest(image_data)
+
+                    # Identical uploads are answered from the result cache before decoding
+                    cache_key = None
+                    if settings.RESULT_CACHE_ENABLED:
+                        cache_key = detection_cache.make_key(digest, self.version, confidence_threshold)
+                        if include_columnar:
+                            cache_key += ":columnar"
+                        cached = await detection_cache.get(cache_key)
+                        if cached is not None:
+                            return cached
+
+                    # Any threshold at or above the floor is answered by filtering cached raw detections
+                    raw_key = None
+                    raw = None
+                    if settings.RAW_DETECTION_CACHE_ENABLED:
+                        raw_key = f"{digest}:{self.version or 'default'}"
+                        if confidence_threshold >= settings.RAW_DETECTION_SCORE_FLOOR:
+                            raw = raw_detection_cache.get(raw_key)
+
+                if raw is None:
+                    # Admitted before decoding, so a rejected request costs no decode time or frame memory
+                    async with inference_admission.admit():
+                        with stage("decode"):
+                            image, original_shape = await self._decode_async(image_data)
+                        # Boxes come back in decoded-image pixels; report them at the uploaded resolution
+                        raw = (await self._predict(image, confidence_threshold)).rescaled(original_shape)
+                    if raw_key is not None:
+                        raw_detection_cache.set(raw_key, raw)
+
+            with stage("postprocess"):
+                raw = raw.filter(confidence_threshold)
+                results = self._format_result(raw, confidence_threshold, include_columnar)
+
+            if cache_key is not None:
+                with stage("cache"):
+                    await detection_cache.set(cache_key, results)
+
+            if include_arrays:
+                results = {**results, "arrays": self._arrays(raw)}
             
             return results
             
         except Exception as e:
             logger.error(f"Error in detect_parts: {str(e)}")
             raise
+
+    def detect_parts_sync(self, image_file, confidence_threshold: float = 0.7, include_columnar: bool = False) -> Dict:
+        """
+        Synchronous detect_parts for callers without an event loop (Celery workers)
+        
+        Inference runs on the calling thread, bypassing the micro-batcher and
+        the async result cache, so callers must not share one detector across
+        threads.
+        """
+        try:
+            with open_upload(image_file) as image_data:
+                image, original_shape = self._decode(image_data)
+
+            raw = self._predict_batch([image], [confidence_threshold])[0].rescaled(original_shape)
+            return self._format_result(raw.filter(confidence_threshold), confidence_threshold, include_columnar)
+            
+        except Exception as e:
+            logger.error(f"Error in detect_parts_sync: {str(e)}")
+            raise
+
+    async def detect_frame(self, image: np.ndarray, confidence_threshold: float = 0.7, include_columnar: bool = False) -> Dict:
+        """
+        Detect spare parts in an already-decoded frame
+        
+        Internal callers that hold pixels (Celery tasks, video frames) use this
+        instead of encoding to JPEG for detect_parts to decode again.
+        
+        Args:
+            image: BGR uint8 array (grayscale and BGRA are converted)
+            confidence_threshold: Minimum confidence threshold for detections
+            include_columnar: Also return detections as parallel arrays under "columnar"
+        """
+        image = self._as_bgr(image)
+        async with inference_admission.admit():
+            raw = await self._predict(image, confidence_threshold)
+        with stage("postprocess"):
+            return self._format_result(raw.filter(confidence_threshold), confidence_threshold, include_columnar)
+
+    async def warm(self, image: np.ndarray, confidence_threshold: float = 0.5) -> None:
+        """
+        Run one warm-up inference through the serving path and discard the result
+
+        Goes through the MicroBatcher (or the inference executor when batching is
+        off) like requests do, so it never runs the model concurrently with a
+        dispatched batch. Skips admission control and the caches.
+        """
+        await self._predict(self._as_bgr(image), confidence_threshold)
+
+    def detect_frame_sync(self, image: np.ndarray, confidence_threshold: float = 0.7, include_columnar: bool = False) -> Dict:
+        """Synchronous detect_frame; same threading caveat as detect_parts_sync"""
+        return self.detect_frames_sync([image], [confidence_threshold], include_columnar)[0]
+
+    def detect_frames_sync(
+        self,
+        images: List[np.ndarray],
+        confidence_thresholds: List[float],
+        include_columnar: bool = False,
+        original_shapes: Optional[List[Tuple[int, ...]]] = None
+    ) -> List[Dict]:
+        """
+        Detect parts in several decoded frames with one forward pass (one result per frame)
+        
+        original_shapes, when frames were decoded at reduced resolution, maps
+        boxes back onto each image's full-resolution pixels.
+        """
+        images = [self._as_bgr(image) for image in images]
+        with stage("inference"):
+            raws = self._predict_batch(images, confidence_thresholds)
+        with stage("postprocess"):
+            if original_shapes is not None:
+                raws = [raw.rescaled(shape) for raw, shape in zip(raws, original_shapes)]
+            return [
+                self._format_result(raw.filter(threshold), threshold, include_columnar)
+                for raw, threshold in zip(raws, confidence_thresholds)
+            ]
+
+    @staticmethod
+    def _as_bgr(image: np.ndarray) -> np.ndarray:
+        if not isinstance(image, np.ndarray) or image.dtype != np.uint8:
+            raise ValueError("Expected a uint8 numpy image")
+        if image.ndim == 2:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        if image.ndim == 3 and image.shape[2] == 4:
+            return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        if image.ndim != 3 or image.shape[2] != 3:
+            raise ValueError(f"Unsupported image shape {image.shape}")
+        return image
+
+    def _decode(self, image_data) -> Tuple[np.ndarray, Tuple[int, ...]]:
+        """Decode an upload and apply DECODE_PREPROCESS_STEPS, returning the image and its full-resolution shape"""
+        target_size = settings.MODEL_INPUT_SIZE if settings.REDUCED_DECODE_ENABLED else None
+        return decode_and_preprocess(image_data, target_size, settings.DECODE_PREPROCESS_STEPS)
+
+    async def _decode_async(self, image_data) -> Tuple[np.ndarray, Tuple[int, ...]]:
+        """_decode in the decode process pool when DECODE_PROCESS_WORKERS is set, keeping it off the GIL"""
+        pool = get_decode_pool()
+        if pool is None:
+            return self._decode(image_data)
+        return await pool.decode(image_data)
+
+    async def _predict(self, image: np.ndarray, confidence_threshold: float) -> RawDetections:
+        """Run inference off the event loop and return unfiltered detections"""
+        if settings.BATCHING_ENABLED:
+            # Coalesce with concurrent requests into one forward pass
+            return await self.batcher.submit(image, confidence_threshold)
+
+        # Run inference in thread pool to avoid blocking
+        loop = asyncio.get_event_loop()
+        submitted = time.perf_counter()
+        predictions, started = await loop.run_in_executor(
+            self.executor,
+            self._timed_predict_batch,
+            [image],
+            [confidence_threshold]
+        )
+        record_stage("queue", started - submitted)
+        record_stage("inference", time.perf_counter() - started)
+        return predictions[0]
+
+    def _timed_predict_batch(self, images: List[np.ndarray], confidence_thresholds: List[float]):
+        """_predict_batch plus the perf_counter time it started on the executor thread"""
+        started = time.perf_counter()
+        return self._predict_batch(images, confidence_thresholds), started
     
     def _run_inference(self, image: np.ndarray, confidence_threshold: float) -> Dict:
         """Run YOLOv8 inference on the image"""
+        return self.detect_frame_sync(image, confidence_threshold)
+
+    def _predict_conf(self, confidence_thresholds: List[float]) -> float:
+        """Confidence passed to the model: loose enough for every image in the batch"""
+        conf = min(confidence_thresholds)
+        if settings.RAW_DETECTION_CACHE_ENABLED:
+            # Cached raw detections must cover any threshold down to the floor
+            conf = min(conf, settings.RAW_DETECTION_SCORE_FLOOR)
+        return conf
+
+    def _predict_batch(self, images: List[np.ndarray], confidence_thresholds: List[float]) -> List[RawDetections]:
+        """Run a single YOLOv8 forward pass over several images"""
         try:
-            # Run prediction
-            results = self.model.predict(image, conf=confidence_threshold)
-            
-            # Process results
-            detections = []
-            for r in results:
-                boxes = r.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        # Get box coordinates
-                        x1, y1, x2, y2 = box.xyxy[0].tolist()
-                        confidence = box.conf[0].item()
-                        class_id = int(box.cls[0].item())
-                        
-                        # Get class name (if available)
-                        class_name = self.model.model.names[class_id] if hasattr(self.model, 'model') and hasattr(self.model.model, 'names') else f"class_{class_id}"
-                        
-                        detections.append({
-                            "bbox": [x1, y1, x2, y2],
-                            "confidence": confidence,
-                            "class_id": class_id,
-                            "class_name": class_name,
-                            "center": [(x1 + x2) / 2, (y1 + y2) / 2]
-                        })
-            
-            # Calculate image dimensions
-            height, width = image.shape[:2]
-            
-            return {
-                "detections": detections,
-                "image_info": {
-                    "width": width,
-                    "height": height,
-                    "channels": image.shape[2] if len(image.shape) > 2 else 1
-                },
-                "model_info": {
-                    "framework": "YOLOv8",
-                    "confidence_threshold": confidence_threshold,
-                    "model_version": self.version or "default"
-                }
-            }
+            return self.backend.predict(images, self._predict_conf(confidence_thresholds))
             
         except Exception as e:
-            logger.error(f"Error in _run_inference: {str(e)}")
+            logger.error(f"Error in _predict_batch: {str(e)}")
             raise
-    
-    async def batch_detect(self, image_files: List, confidence_threshold: float = 0.7) -> List[Dict]:
-        """Process multiple images in batch"""
-        tasks = [
-            self.detect_parts(image_file, confidence_threshold)
-            for image_file in image_files
+
+    def _lookup_class_names(self, class_ids: np.ndarray) -> List[str]:
+        table = self.class_names
+        if class_ids.size == 0 or class_ids.max() < len(table):
+            return table[class_ids].tolist()
+        return [table[i] if i < len(table) else f"class_{i}" for i in class_ids.tolist()]
+
+    def _columns(self, raw: RawDetections) -> Dict[str, List]:
+        """Detections as parallel per-field lists, computed with whole-array operations"""
+        centers = (raw.boxes[:, :2] + raw.boxes[:, 2:]) / 2
+        return {
+            "bbox": raw.boxes.tolist(),
+            "confidence": raw.scores.tolist(),
+            "class_id": raw.class_ids.tolist(),
+            "class_name": self._lookup_class_names(raw.class_ids),
+            "center": centers.tolist()
+        }
+
+    def _arrays(self, raw: RawDetections) -> Dict:
+        """Detections as the arrays the binary encoders pack as-is"""
+        return {
+            "bbox": raw.boxes,
+            "confidence": raw.scores,
+            "class_id": raw.class_ids,
+            "class_name": self._lookup_class_names(raw.class_ids)
+        }
+
+    def _format_result(self, raw: RawDetections, confidence_threshold: float, include_columnar: bool = False) -> Dict:
+        """Convert raw detections into the API response structure"""
+        columns = self._columns(raw)
+        detections = [
+            {
+                "bbox": bbox,
+                "confidence": confidence,
+                "class_id": class_id,
+                "class_name": class_name,
+                "center": center
+            }
+            for bbox, confidence, class_id, class_name, center in zip(
+                columns["bbox"], columns["confidence"], columns["class_id"],
+                columns["class_name"], columns["center"]
+            )
         ]
-        return await asyncio.gather(*tasks)
+        
+        height, width, channels = raw.image_shape
+        
+        result = {
+            "detections": detections,
+            "image_info": {
+                "width": width,
+                "height": height,
+                "channels": channels
+            },
+            "model_info": {
+                "framework": "YOLOv8",
+                "confidence_threshold": confidence_threshold,
+                "model_version": self.version or "default"
+            }
+        }
+        if include_columnar:
+            result["columnar"] = columns
+        return result
+    
+    async def batch_detect(
+        self,
+        image_files: List,
+        confidence_threshold: float = 0.7,
+        include_columnar: bool = False,
+        include_arrays: bool = False
+    ) -> List[Dict]:
+        """
+        Process multiple images in batch; the micro-batcher groups them into shared forward passes
+
+        The batch fails as a unit: the first error (e.g. InferenceOverloaded) cancels
+        the remaining images straight away, before a freed admission slot can start
+        another of them, and they are awaited so their upload views are released
+        before this returns.
+        """
+        tasks: List[asyncio.Task] = []
+
+        async def detect(image_file) -> Dict:
+            try:
+                return await self.detect_parts(image_file, confidence_threshold, include_columnar, include_arrays)
+            except Exception:
+                for task in tasks:
+                    if task is not asyncio.current_task():
+                        task.cancel()
+                raise
+
+        tasks.extend(asyncio.ensure_future(detect(image_file)) for image_file in image_files)
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
     
     def get_model_info(self) -> Dict:
         """Get information about the loaded model"""
         return {
             "model_type": "YOLOv8",
-            "classes": list(self.model.model.names.values()) if hasattr(self.model, 'model') and hasattr(self.model.model, 'names') else [],
-            "input_size": getattr(self.model, 'imgsz', 640),
-            "framework": "Ultralytics",
+            "classes": list(self.backend.class_names.values()),
+            "input_size": self.backend.input_size,
+            "framework": self.backend.framework,
+            "backend": self.backend.name,
             "version": self.version or "default"
         }
+
+    def close(self):
+        """Stop batching and release the inference thread pool; queued jobs are allowed to finish"""
+        self.batcher.close()
+
+    def _shutdown_executor(self):
+        self.executor.shutdown(wait=False)
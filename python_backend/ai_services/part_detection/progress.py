@@ -0,0 +1,108 @@
+import json
+import logging
+import time
+from typing import AsyncIterator, Dict, Optional
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ("SUCCESS", "FAILURE", "REVOKED")
+
+
+def progress_channel(task_id: str) -> str:
+    return f"part-detection:progress:{task_id}"
+
+
+def last_event_key(task_id: str) -> str:
+    return f"part-detection:progress:last:{task_id}"
+
+
+class ProgressPublisher:
+    """
+    Pushes detection task progress to Redis pub/sub for SSE subscribers.
+
+    Each event is also kept under a per-task key for ``ttl_seconds`` so a
+    client that subscribes late starts from the current state. Publishing is
+    best effort: a Redis outage is logged and never fails the task.
+    """
+
+    def __init__(self, redis_url: str, ttl_seconds: int = 3600):
+        self.redis_url = redis_url
+        self.ttl_seconds = ttl_seconds
+        self._client = None
+
+    def _redis(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.redis_url, decode_responses=True)
+        return self._client
+
+    def publish(self, task_id: str, state: str, **fields) -> Dict:
+        event = {"job_id": task_id, "state": state, "timestamp": time.time(), **fields}
+        payload = json.dumps(event)
+        try:
+            pipe = self._redis().pipeline()
+            pipe.setex(last_event_key(task_id), self.ttl_seconds, payload)
+            pipe.publish(progress_channel(task_id), payload)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to publish progress for job {task_id}: {str(e)}")
+        return event
+
+
+_async_client = None
+
+
+def async_redis():
+    """Process-wide asyncio Redis client on REDIS_URL (the broker the workers publish to)"""
+    global _async_client
+    if _async_client is None:
+        import redis.asyncio as redis
+        _async_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _async_client
+
+
+async def progress_events(
+    task_id: str,
+    redis_client=None,
+    keepalive_seconds: float = 15.0
+) -> AsyncIterator[Optional[Dict]]:
+    """
+    Yield a task's progress events until it reaches a terminal state.
+
+    Subscribes before reading the last stored event, so nothing published in
+    between is lost; duplicates are dropped by timestamp. Yields None when no
+    event arrived within ``keepalive_seconds`` so callers can send keep-alives.
+    """
+    redis_client = redis_client or async_redis()
+    pubsub = redis_client.pubsub()
+    await pubsub.subscribe(progress_channel(task_id))
+    try:
+        last_timestamp = 0.0
+        stored = await redis_client.get(last_event_key(task_id))
+        if stored:
+            event = json.loads(stored)
+            last_timestamp = event["timestamp"]
+            yield event
+            if event["state"] in TERMINAL_STATES:
+                return
+
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=keepalive_seconds)
+            if message is None:
+                yield None
+                continue
+            event = json.loads(message["data"])
+            if event["timestamp"] <= last_timestamp:
+                continue
+            last_timestamp = event["timestamp"]
+            yield event
+            if event["state"] in TERMINAL_STATES:
+                return
+    finally:
+        await pubsub.unsubscribe(progress_channel(task_id))
+        await pubsub.aclose()
+
+
+progress_publisher = ProgressPublisher(settings.REDIS_URL, ttl_seconds=settings.JOB_PROGRESS_TTL_SECONDS)
@@ -0,0 +1,204 @@
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+from core.config import settings
+from ai_services.part_detection.backends.export import is_registered_version
+from ai_services.part_detection.inference import PartDetector
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VERSION_KEY = "default"
+
+
+class UnknownModelVersion(LookupError):
+    """A requested model version is neither configured nor registered in MLflow"""
+
+    def __init__(self, version: str):
+        self.version = version
+        super().__init__(f"Unknown model version '{version}'")
+
+
+class DetectorRegistry:
+    """
+    Process-wide, thread-safe cache of loaded PartDetector instances keyed by model version
+
+    Callers that use a detector across awaits or long-running work should take a
+    lease (acquire/release or the lease() context manager): a leased detector that
+    gets evicted is only closed once its last lease is released.
+    """
+
+    def __init__(
+        self,
+        max_resident: int = 2,
+        factory: Callable[[Optional[str]], PartDetector] = None
+    ):
+        if max_resident < 1:
+            raise ValueError("max_resident must be at least 1")
+        self.max_resident = max_resident
+        self._factory = factory or (lambda version: PartDetector(version=version))
+        self._detectors: "OrderedDict[str, PartDetector]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Only versions with a load in progress hold a lock entry
+        self._load_locks: Dict[str, threading.Lock] = {}
+        # id(detector) -> outstanding leases, and evicted detectors waiting on them
+        self._leases: Dict[int, int] = {}
+        self._retired: Dict[int, PartDetector] = {}
+
+    @staticmethod
+    def _key(version: Optional[str]) -> str:
+        return version or DEFAULT_VERSION_KEY
+
+    def get(self, version: Optional[str] = None) -> PartDetector:
+        """
+        Return the shared detector for a model version, loading it on first use
+
+        Args:
+            version: Model version to load; None selects the default model
+
+        Returns:
+            The PartDetector instance shared by all callers of this version
+        """
+        return self._get(version, lease=False)
+
+    def acquire(self, version: Optional[str] = None) -> PartDetector:
+        """Like get(), but keeps the detector open until release() even if it is evicted meanwhile"""
+        return self._get(version, lease=True)
+
+    def release(self, detector: PartDetector):
+        """Drop a lease taken with acquire(), closing the detector if it was evicted while leased"""
+        with self._lock:
+            remaining = self._leases.get(id(detector), 0) - 1
+            if remaining > 0:
+                self._leases[id(detector)] = remaining
+                return
+            self._leases.pop(id(detector), None)
+            retired = self._retired.pop(id(detector), None)
+        if retired is not None:
+            logger.info("Closing evicted detector after its last in-flight call")
+            retired.close()
+
+    @contextmanager
+    def lease(self, version: Optional[str] = None) -> Iterator[PartDetector]:
+        """Context manager around acquire()/release()"""
+        detector = self.acquire(version)
+        try:
+            yield detector
+        finally:
+            self.release(detector)
+
+    def _lease_locked(self, key: str, lease: bool) -> Optional[PartDetector]:
+        detector = self._detectors.get(key)
+        if detector is not None:
+            self._detectors.move_to_end(key)
+            if lease:
+                self._leases[id(detector)] = self._leases.get(id(detector), 0) + 1
+        return detector
+
+    def _get(self, version: Optional[str], lease: bool) -> PartDetector:
+        key = self._key(version)
+
+        with self._lock:
+            detector = self._lease_locked(key, lease)
+            if detector is not None:
+                return detector
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so a slow load does not block other versions
+        try:
+            with load_lock:
+                with self._lock:
+                    detector = self._lease_locked(key, lease)
+                    if detector is not None:
+                        return detector
+
+                logger.info(f"Loading detector for model version '{key}' into registry")
+                detector = self._factory(version)
+
+                with self._lock:
+                    self._detectors[key] = detector
+                    self._lease_locked(key, lease)
+                    evicted = self._evict_locked()
+        finally:
+            with self._lock:
+                if self._load_locks.get(key) is load_lock:
+                    del self._load_locks[key]
+
+        for evicted_key, evicted_detector in evicted:
+            logger.info(f"Evicting detector for model version '{evicted_key}' from registry")
+            evicted_detector.close()
+
+        return detector
+
+    def _evict_locked(self) -> List:
+        """Pop LRU detectors beyond max_resident; leased ones are retired instead of returned for closing"""
+        evicted = []
+        while len(self._detectors) > self.max_resident:
+            key, detector = self._detectors.popitem(last=False)
+            if self._leases.get(id(detector)):
+                logger.info(f"Evicting detector for model version '{key}' from registry once in-flight calls finish")
+                self._retired[id(detector)] = detector
+            else:
+                evicted.append((key, detector))
+        return evicted
+
+    def loaded_versions(self) -> List[str]:
+        """Resident model versions, least recently used first"""
+        with self._lock:
+            return list(self._detectors.keys())
+
+    def clear(self):
+        """Close and drop every resident (and retired) detector"""
+        with self._lock:
+            detectors = [*self._detectors.values(), *self._retired.values()]
+            self._detectors.clear()
+            self._retired.clear()
+            self._leases.clear()
+        for detector in detectors:
+            detector.close()
+
+
+detector_registry = DetectorRegistry(max_resident=settings.MODEL_REGISTRY_MAX_RESIDENT)
+
+
+def get_detector(version: Optional[str] = None) -> PartDetector:
+    """Shortcut for fetching a detector from the process-wide registry"""
+    return detector_registry.get(version)
+
+
+def acquire_detector(version: Optional[str] = None) -> PartDetector:
+    """Lease a detector from the process-wide registry; pair with release_detector"""
+    return detector_registry.acquire(version)
+
+
+def release_detector(detector: PartDetector):
+    """Return a detector leased with acquire_detector"""
+    detector_registry.release(detector)
+
+
+_registered_versions: Set[str] = set()
+
+
+def resolve_model_version(version: Optional[str]) -> Optional[str]:
+    """
+    Validate a client-supplied model version before anything is loaded or exported for it
+
+    Accepts None/"default" (MODEL_PATH), versions configured in MODEL_VERSIONS and
+    versions registered in the MLflow Model Registry.
+
+    Returns:
+        The version to pass to get_detector (None for the default model)
+
+    Raises:
+        UnknownModelVersion: Any other value
+    """
+    if version is None or version == DEFAULT_VERSION_KEY:
+        return None
+    if version in (settings.MODEL_VERSIONS or {}) or version in _registered_versions:
+        return version
+    if is_registered_version(version):
+        _registered_versions.add(version)
+        return version
+    raise UnknownModelVersion(version)
@@ -1,106 +1,217 @@
+import logging
 import os
-import uuid
-from typing import Dict, Any, List
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from celery import current_task
+from celery.exceptions import TaskRevokedError
+from celery.signals import task_revoked, worker_process_init
+from celery_batches import Batches
 import cv2
 import numpy as np
-from PIL import Image
-import torch
-from pathlib import Path
 
 from core.celery_app import celery_app
-from ai_services.part_detection.inference import PartDetector
+from core.config import settings
+from ai_services.part_detection.bulk import BulkDetectionPipeline, iter_images, open_writer
+from ai_services.part_detection.frame_store import FrameHandle, frame_store
+from ai_services.part_detection.progress import progress_publisher
+from ai_services.part_detection.registry import DEFAULT_VERSION_KEY, detector_registry
+from ai_services.part_detection.warmup import ModelWarmup
 from ai_services.preprocessing.image_processor import ImageProcessor
 
+logger = logging.getLogger(__name__)
+
+# Per worker process; PartDetector instances live in detector_registry
+processor = ImageProcessor()
+
+@worker_process_init.connect
+def preload_detectors(**kwargs):
+    """
+    Load the CELERY_MODEL_VERSION detector once per worker process instead of once per task
+    
+    Runs in each prefork child after it starts, so models survive until the
+    child is recycled after worker_max_tasks_per_child tasks.
+    """
+    if not settings.CELERY_PRELOAD_MODELS:
+        return
+    warmup = ModelWarmup(
+        detector_registry,
+        versions=[settings.CELERY_MODEL_VERSION or DEFAULT_VERSION_KEY],
+        iterations=settings.WARMUP_ITERATIONS,
+        input_size=settings.MODEL_INPUT_SIZE
+    )
+    warmup.run_sync()
+    logger.info(f"Worker process models ready: {warmup.status()['versions']}")
+
+def _worker_model_version() -> Optional[str]:
+    """CELERY_MODEL_VERSION as a registry version (None for the default MODEL_PATH model)"""
+    version = settings.CELERY_MODEL_VERSION
+    return None if version in ("", DEFAULT_VERSION_KEY) else version
+
 @celery_app.task(bind=True, name="detect_parts")
-def detect_parts(self, image_path: str) -> Dict[str, Any]:
+def detect_parts(
+    self,
+    image_path: Optional[str] = None,
+    confidence_threshold: float = 0.7,
+    frame: Optional[Dict] = None,
+    cleanup: bool = False
+) -> Dict[str, Any]:
     """
     Detect parts in an image using YOLOv8
     
+    Progress is recorded in the result backend and published for the job
+    events stream (see ai_services.part_detection.progress).
+    
     Args:
         image_path: Path to the image file
+        confidence_threshold: Minimum confidence threshold for detections
+        frame: FrameHandle dict for a decoded frame in the shared frame store
+            (see submit_frame), used instead of image_path
+        cleanup: Delete image_path once it has been read (job uploads)
         
     Returns:
         Dictionary containing detection results
     """
     try:
-        # Update task state
-        current_task.update_state(state='PROCESSING', meta={'status': 'Loading model...'})
-        
-        # Initialize detector
-        model_path = Path("ai_services/part_detection/models/model.pt")
-        if not model_path.exists():
-            raise FileNotFoundError(f"Model file not found: {model_path}")
-            
-        detector = PartDetector()
-        
         # Preprocess image
-        current_task.update_state(state='PROCESSING', meta={'status': 'Preprocessing image...'})
-        processor = ImageProcessor()
+        _report_progress(self.request.id, 'Preprocessing image...')
         
         # Load and preprocess image
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError(f"Could not load image: {image_path}")
-            
-        processed_image = processor.preprocess(image)
+        with _task_image(image_path, frame, cleanup) as image:
+            processed_image = processor.enhance_image(image)
+            image_shape = image.shape
         
         # Run inference
-        current_task.update_state(state='PROCESSING', meta={'status': 'Running inference...'})
-        
-        # Since PartDetector uses async methods, we need to handle this differently
-        # For now, we'll use the synchronous approach
-        import asyncio
+        _report_progress(self.request.id, 'Running inference...')
         
-        async def run_detection():
-            # Create a mock file-like object for the detector
-            class MockFile:
-                def __init__(self, image_data):
-                    self.image_data = image_data
-                def read(self):
-                    return cv2.imencode('.jpg', self.image_data)[1].tobytes()
-            
-            mock_file = MockFile(processed_image)
-            results = await detector.detect_parts(mock_file, confidence_threshold=0.7)
-            return results
-        
-        # Run async function in sync context
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            results = loop.run_until_complete(run_detection())
-        finally:
-            loop.close()
+        # The decoded frame goes straight to the model, no JPEG round trip. The
+        # resident detector (loaded at process init) is leased so an eviction
+        # cannot close it mid-call
+        with detector_registry.lease(_worker_model_version()) as detector:
+            results = detector.detect_frame_sync(processed_image, confidence_threshold=confidence_threshold)
         
         # Post-process results
-        current_task.update_state(state='PROCESSING', meta={'status': 'Processing results...'})
+        _report_progress(self.request.id, 'Processing results...')
         
-        # Format results for frontend
-        formatted_results = {
+        formatted_results = _format_task_result(self.request.id, image_shape, results)
+        progress_publisher.publish(self.request.id, 'SUCCESS', status='completed', result=formatted_results)
+        return formatted_results
+        
+    except Exception as exc:
+        current_task.update_state(
+            state='FAILURE',
+            meta={
+                'status': 'failed',
+                'error': str(exc),
+                'error_type': type(exc).__name__
+            }
+        )
+        _publish_failure(self.request.id, exc)
+        raise exc
+
+@celery_app.task(
+    base=Batches,
+    name="detect_parts_batch",
+    flush_every=settings.CELERY_BATCH_MAX_SIZE,
+    flush_interval=settings.CELERY_BATCH_LINGER_SECONDS
+)
+def detect_parts_batch(requests: List) -> None:
+    """
+    Detect parts for a batch of queued images with one forward pass
+    
+    Enqueued like detect_parts (``detect_parts_batch.delay(image_path,
+    confidence_threshold=0.7)`` or with ``frame=``); the worker buffers up to
+    CELERY_BATCH_MAX_SIZE messages or CELERY_BATCH_LINGER_SECONDS, whichever
+    comes first, and stores each task's result individually. An unreadable
+    image fails only its own task.
+    """
+    frames, pending = [], []
+    for request in requests:
+        try:
+            image_path, confidence_threshold, frame, cleanup = _batch_request_params(request)
+            with _task_image(image_path, frame, cleanup) as image:
+                if _expired(request):
+                    raise TaskRevokedError("Task expired before a worker picked it up")
+                frames.append(processor.enhance_image(image))
+                pending.append((request, image.shape, confidence_threshold))
+        except Exception as exc:
+            celery_app.backend.mark_as_failure(request.id, exc, request=request)
+            _publish_failure(request.id, exc)
+
+    if not pending:
+        return
+
+    for request, _, _ in pending:
+        progress_publisher.publish(request.id, 'PROCESSING', status=f'Running batched inference ({len(pending)} images)...')
+
+    try:
+        with detector_registry.lease(_worker_model_version()) as detector:
+            results = detector.detect_frames_sync(frames, [threshold for _, _, threshold in pending])
+    except Exception as exc:
+        logger.error(f"Batched detection of {len(pending)} images failed: {str(exc)}")
+        for request, _, _ in pending:
+            celery_app.backend.mark_as_failure(request.id, exc, request=request)
+            _publish_failure(request.id, exc)
+        return
+
+    for (request, image_shape, _), result in zip(pending, results):
+        formatted_results = _format_task_result(request.id, image_shape, result)
+        celery_app.backend.mark_as_done(request.id, formatted_results, request=request)
+        progress_publisher.publish(request.id, 'SUCCESS', status='completed', result=formatted_results)
+
+@celery_app.task(
+    bind=True,
+    name="detect_archive",
+    time_limit=settings.BULK_TASK_TIME_LIMIT_SECONDS,
+    soft_time_limit=settings.BULK_TASK_TIME_LIMIT_SECONDS - 60
+)
+def detect_archive(
+    self,
+    source: str,
+    output_path: str,
+    output_format: str = "jsonl",
+    confidence_threshold: float = 0.7,
+    cleanup: bool = False
+) -> Dict[str, Any]:
+    """
+    Detect parts in every image of a ZIP/TAR archive or directory
+    
+    Results are appended to output_path (JSON Lines or Parquet) as batches
+    finish, so memory stays flat however many images the source holds.
+    
+    Args:
+        source: Archive file or directory on a filesystem shared with the API
+        output_path: Where to write one record per image
+        output_format: "jsonl" or "parquet"
+        confidence_threshold: Minimum confidence threshold for detections
+        cleanup: Delete the source archive when done (uploaded archives)
+    """
+    def report(summary: Dict):
+        status = f"Processed {summary['processed'] + summary['failed']} images..."
+        current_task.update_state(state='PROCESSING', meta={'status': status, **summary})
+        progress_publisher.publish(self.request.id, 'PROCESSING', status=status, **summary)
+
+    try:
+        _report_progress(self.request.id, 'Reading archive...')
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with detector_registry.lease(_worker_model_version()) as detector:
+            pipeline = BulkDetectionPipeline(detector, confidence_threshold=confidence_threshold)
+            writer = open_writer(output_path, output_format)
+            try:
+                summary = pipeline.run(iter_images(source), writer, on_progress=report)
+            finally:
+                writer.close()
+
+        result = {
             'task_id': self.request.id,
             'status': 'completed',
-            'detections': [],
-            'image_info': {
-                'width': image.shape[1],
-                'height': image.shape[0],
-                'channels': image.shape[2]
-            }
+            'output_path': output_path,
+            'output_format': output_format,
+            **summary
         }
-        
-        for detection in results['detections']:
-            formatted_results['detections'].append({
-                'class': detection['class_name'],
-                'confidence': float(detection['confidence']),
-                'bbox': {
-                    'x': int(detection['bbox'][0]),
-                    'y': int(detection['bbox'][1]),
-                    'width': int(detection['bbox'][2] - detection['bbox'][0]),
-                    'height': int(detection['bbox'][3] - detection['bbox'][1])
-                }
-            })
-        
-        return formatted_results
-        
+        progress_publisher.publish(self.request.id, 'SUCCESS', status='completed', result=result)
+        return result
+
     except Exception as exc:
         current_task.update_state(
             state='FAILURE',
@@ -110,7 +221,112 @@ def detect_parts(self, image_path: str) -> Dict[str, Any]:
                 'error_type': type(exc).__name__
             }
         )
+        _publish_failure(self.request.id, exc)
         raise exc
+    finally:
+        if cleanup and os.path.isfile(source):
+            os.remove(source)
+
+def submit_frame(image: np.ndarray, confidence_threshold: float = 0.7, batch: bool = False):
+    """
+    Enqueue detection of an already-decoded frame through the shared frame store
+    
+    Only valid when the worker runs on the same host (or shares /dev/shm and
+    the frame spool directory). The message carries a FrameHandle, not pixels.
+    """
+    handle = frame_store.put(image)
+    task = detect_parts_batch if batch else detect_parts
+    try:
+        # The frame store sweeps frames after FRAME_STORE_TTL_SECONDS, so the task must not outwait that
+        return task.apply_async(
+            kwargs={"frame": handle.to_dict(), "confidence_threshold": confidence_threshold},
+            expires=settings.FRAME_TASK_EXPIRES_SECONDS
+        )
+    except Exception:
+        frame_store.release(handle)
+        raise
+
+@task_revoked.connect
+def release_revoked_frame(request=None, terminated=False, expired=False, **kwargs):
+    """Release the shared frame of a task discarded before it ran (expired or revoked)"""
+    if request is None or terminated:
+        return
+    progress_publisher.publish(request.id, 'REVOKED', status='expired' if expired else 'revoked')
+    frame = (request.kwargs or {}).get("frame")
+    if frame is not None:
+        frame_store.release(FrameHandle.from_dict(frame))
+
+def _expired(request) -> bool:
+    """Whether a batched request is past its ``expires``; celery_batches does not check it"""
+    expires = (request.request_dict or {}).get("expires")
+    if not expires:
+        return False
+    if isinstance(expires, str):
+        expires = datetime.fromisoformat(expires)
+    if expires.tzinfo is None:
+        expires = expires.replace(tzinfo=timezone.utc)
+    return expires <= datetime.now(timezone.utc)
+
+def _report_progress(task_id: str, status: str):
+    """Record a PROCESSING step in the result backend and publish it to job event subscribers"""
+    current_task.update_state(state='PROCESSING', meta={'status': status})
+    progress_publisher.publish(task_id, 'PROCESSING', status=status)
+
+def _publish_failure(task_id: str, exc: Exception):
+    progress_publisher.publish(task_id, 'FAILURE', status='failed', error=str(exc), error_type=type(exc).__name__)
+
+@contextmanager
+def _task_image(image_path: Optional[str], frame: Optional[Dict], cleanup: bool = False) -> Iterator[np.ndarray]:
+    """Task input as a decoded image; a shared frame is released when the block exits"""
+    if frame is not None:
+        with frame_store.consume(FrameHandle.from_dict(frame)) as image:
+            yield image
+        return
+    try:
+        image = cv2.imread(image_path)
+    finally:
+        if cleanup and image_path and os.path.exists(image_path):
+            os.remove(image_path)
+    if image is None:
+        raise ValueError(f"Could not load image: {image_path}")
+    yield image
+
+def _batch_request_params(request) -> Tuple[Optional[str], float, Optional[Dict], bool]:
+    params = dict(zip(("image_path", "confidence_threshold"), request.args))
+    params.update(request.kwargs)
+    return (
+        params.get("image_path"),
+        params.get("confidence_threshold", 0.7),
+        params.get("frame"),
+        params.get("cleanup", False)
+    )
+
+def _format_task_result(task_id: str, image_shape: Tuple[int, ...], results: Dict) -> Dict[str, Any]:
+    """Format detector output for the frontend"""
+    formatted_results = {
+        'task_id': task_id,
+        'status': 'completed',
+        'detections': [],
+        'image_info': {
+            'width': image_shape[1],
+            'height': image_shape[0],
+            'channels': image_shape[2]
+        }
+    }
+    
+    for detection in results['detections']:
+        formatted_results['detections'].append({
+            'class': detection['class_name'],
+            'confidence': float(detection['confidence']),
+            'bbox': {
+                'x': int(detection['bbox'][0]),
+                'y': int(detection['bbox'][1]),
+                'width': int(detection['bbox'][2] - detection['bbox'][0]),
+                'height': int(detection['bbox'][3] - detection['bbox'][1])
+            }
+        })
+    
+    return formatted_results
 
 @celery_app.task(name="health_check")
 def health_check() -> Dict[str, str]:
@@ -118,5 +334,5 @@ def health_check() -> Dict[str, str]:
     return {
         "status": "healthy",
         "service": "part_detection",
-        "model_loaded": "true"
+        "model_loaded": str(bool(detector_registry.loaded_versions())).lower()
     }
@@ -1,7 +1,7 @@
 """Part Detection API v1 - Initial version with basic functionality."""
 
 from .model import PartDetectionModel
-from .inference import run_inference
+from .inference import run_inference, get_model, clear_models
 from .utils import preprocess_image, postprocess_results
 
-__all__ = ["PartDetectionModel", "run_inference", "preprocess_image", "postprocess_results"]
+__all__ = ["PartDetectionModel", "run_inference", "get_model", "clear_models", "preprocess_image", "postprocess_results"]
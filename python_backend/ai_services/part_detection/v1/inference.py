@@ -1,13 +1,32 @@
 """Inference utilities for Part Detection Model v1."""
 
+import threading
 import cv2
 import numpy as np
+from typing import Dict, Optional
 from .model import PartDetectionModel
 
+_models: Dict[Optional[str], PartDetectionModel] = {}
+_models_lock = threading.Lock()
+
+def get_model(model_path: Optional[str] = None) -> PartDetectionModel:
+    """Return the process-wide loaded model for model_path, loading it on first use."""
+    with _models_lock:
+        model = _models.get(model_path)
+        if model is None:
+            model = PartDetectionModel(model_path)
+            model.load_model()
+            _models[model_path] = model
+        return model
+
+def clear_models() -> None:
+    """Drop cached models so the next call reloads them."""
+    with _models_lock:
+        _models.clear()
+
 def run_inference(image_path: str) -> dict:
     """Load image and run part detection inference."""
-    model = PartDetectionModel()
-    model.load_model()
+    model = get_model()
     
     image = cv2.imread(image_path)
     if image is None:
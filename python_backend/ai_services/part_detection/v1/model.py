@@ -10,7 +10,9 @@ class PartDetectionModel:
     
     def __init__(self, model_path: str = None):
         self.model_path = model_path or "models/part_detection_v1.h5"
+        self.version = "1.0.0"
         self.model = None
+        self._predict_fn = None
         self.input_shape = (224, 224, 3)
         self.class_names = [
             "cutting_blade", "motor", "frame", "control_panel", 
@@ -26,6 +28,7 @@ class PartDetectionModel:
             print(f"Error loading model: {e}")
             # Fallback to basic architecture
             self._create_basic_model()
+        self._predict_fn = self._compile_predict_fn()
     
     def _create_basic_model(self) -> None:
         """Create basic model architecture for testing."""
@@ -48,13 +51,27 @@ class PartDetectionModel:
             metrics=['accuracy']
         )
     
+    def _compile_predict_fn(self):
+        """Compile an inference-only tf.function with a fixed input spec."""
+        model = self.model
+
+        @tf.function(input_signature=[tf.TensorSpec(shape=(None, *self.input_shape), dtype=tf.float32)])
+        def predict_fn(images):
+            return model(images, training=False)
+
+        # Trace at load time rather than on the first request
+        predict_fn.get_concrete_function()
+        return predict_fn
+
     def predict(self, image: np.ndarray) -> Dict[str, float]:
         """Run inference on input image."""
         if self.model is None:
             self.load_model()
+        if self._predict_fn is None:
+            self._predict_fn = self._compile_predict_fn()
             
-        processed_image = self._preprocess_image(image)
-        predictions = self.model.predict(processed_image)
+        processed_image = self._preprocess_image(image).astype(np.float32)
+        predictions = self._predict_fn(tf.constant(processed_image)).numpy()
         
         results = {}
         for i, prob in enumerate(predictions[0]):
@@ -74,7 +91,7 @@ class PartDetectionModel:
     def get_model_info(self) -> Dict[str, any]:
         """Get model information for versioning."""
         return {
-            "version": "1.0.0",
+            "version": self.version,
             "input_shape": self.input_shape,
             "class_names": self.class_names,
             "framework": "TensorFlow",
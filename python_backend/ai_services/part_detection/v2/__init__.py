@@ -1,7 +1,7 @@
 """Part Detection API v2 - Enhanced version with improved accuracy and performance."""
 
 from .model import PartDetectionModelV2
-from .inference import run_inference_v2
+from .inference import run_inference_v2, get_model_v2, clear_models_v2
 from .utils import preprocess_image_v2, postprocess_results_v2
 
-__all__ = ["PartDetectionModelV2", "run_inference_v2", "preprocess_image_v2", "postprocess_results_v2"]
+__all__ = ["PartDetectionModelV2", "run_inference_v2", "get_model_v2", "clear_models_v2", "preprocess_image_v2", "postprocess_results_v2"]
@@ -1,10 +1,32 @@
 """Enhanced inference utilities for Part Detection Model v2."""
 
+import threading
 import cv2
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from .model import PartDetectionModelV2
 
+_models: Dict[Optional[str], PartDetectionModelV2] = {}
+_models_lock = threading.Lock()
+
+# Images per forward pass in batch_inference
+DEFAULT_BATCH_SIZE = 8
+
+def get_model_v2(model_path: Optional[str] = None) -> PartDetectionModelV2:
+    """Return the process-wide loaded v2 model for model_path, loading it on first use."""
+    with _models_lock:
+        model = _models.get(model_path)
+        if model is None:
+            model = PartDetectionModelV2(model_path)
+            model.load_model()
+            _models[model_path] = model
+        return model
+
+def clear_models_v2() -> None:
+    """Drop cached v2 models so the next call reloads them."""
+    with _models_lock:
+        _models.clear()
+
 def run_inference_v2(image_path: str, confidence_threshold: float = 0.7) -> Dict[str, any]:
     """
     Enhanced inference with confidence filtering and batch processing support.
@@ -16,15 +38,16 @@ def run_inference_v2(image_path: str, confidence_threshold: float = 0.7) -> Dict
     Returns:
         Dictionary with predictions and metadata
     """
-    model = PartDetectionModelV2()
-    model.load_model()
+    model = get_model_v2()
     
     image = cv2.imread(image_path)
     if image is None:
         raise FileNotFoundError(f"Image not found at path: {image_path}")
     
     results = model.predict(image)
-    
+    return _build_result(results, confidence_threshold)
+
+def _build_result(results: Dict[str, float], confidence_threshold: float) -> Dict[str, any]:
     # Filter results by confidence threshold
     filtered_results = {
         class_name: prob for class_name, prob in results.items()
@@ -39,20 +62,48 @@ def run_inference_v2(image_path: str, confidence_threshold: float = 0.7) -> Dict
         "top_prediction": max(results.items(), key=lambda x: x[1]) if results else None
     }
 
-def batch_inference(image_paths: List[str], confidence_threshold: float = 0.7) -> List[Dict[str, any]]:
-    """Process multiple images in batch."""
-    model = PartDetectionModelV2()
-    model.load_model()
+def batch_inference(
+    image_paths: List[str],
+    confidence_threshold: float = 0.7,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> List[Dict[str, any]]:
+    """
+    Process multiple images with one forward pass per chunk of batch_size images.
+    
+    Images that cannot be read or preprocessed get an error entry in their slot
+    without affecting the rest of the batch.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    model = get_model_v2()
+    
+    results: List[Optional[Dict[str, any]]] = [None] * len(image_paths)
+    pending: List[Tuple[int, np.ndarray]] = []
+    
+    def flush():
+        indices = [index for index, _ in pending]
+        try:
+            predictions = model.predict_preprocessed(np.concatenate([batch for _, batch in pending]))
+        except Exception as e:
+            for index in indices:
+                results[index] = {"error": str(e), "image_path": image_paths[index]}
+        else:
+            for index, prediction in zip(indices, predictions):
+                results[index] = _build_result(prediction, confidence_threshold)
+        pending.clear()
     
-    results = []
-    for path in image_paths:
+    for index, path in enumerate(image_paths):
         try:
-            result = run_inference_v2(path, confidence_threshold)
-            results.append(result)
+            image = cv2.imread(path)
+            if image is None:
+                raise FileNotFoundError(f"Image not found at path: {path}")
+            pending.append((index, model._preprocess_image(image)))
         except Exception as e:
-            results.append({
-                "error": str(e),
-                "image_path": path
-            })
+            results[index] = {"error": str(e), "image_path": path}
+            continue
+        if len(pending) == batch_size:
+            flush()
+    if pending:
+        flush()
     
     return results
@@ -1,16 +1,20 @@
 """Part Detection Model v2 - Enhanced version with improved accuracy and performance."""
 
+import os
 import tensorflow as tf
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import cv2
 
+SERVING_SIGNATURE = "serving_default"
+
 class PartDetectionModelV2:
     """Enhanced part detection model with improved architecture."""
     
     def __init__(self, model_path: str = None):
         self.model_path = model_path or "models/part_detection_v2.h5"
         self.model = None
+        self._predict_fn = None
         self.input_shape = (256, 256, 3)
         self.class_names = [
             "cutting_blade", "motor", "frame", "control_panel", 
@@ -20,31 +24,42 @@ class PartDetectionModelV2:
         self.version = "2.0.0"
         
     def load_model(self) -> None:
-        """Load the trained model with enhanced architecture."""
+        """Load the trained model: an exported serving SavedModel directory or a Keras .h5."""
         try:
-            self.model = tf.keras.models.load_model(self.model_path)
+            if os.path.isdir(self.model_path):
+                self._load_saved_model()
+            else:
+                # compile=False: optimizer state and training metrics are not needed to serve
+                self.model = tf.keras.models.load_model(self.model_path, compile=False)
+                self._predict_fn = self._compile_predict_fn()
             print(f"Model v2 loaded successfully from {self.model_path}")
         except Exception as e:
             print(f"Error loading model v2: {e}")
             self._create_enhanced_model()
+            self._predict_fn = self._compile_predict_fn()
+    
+    def _load_saved_model(self) -> None:
+        """Load a SavedModel written by export_saved_model, calling its serving signature directly."""
+        self.model = tf.saved_model.load(self.model_path)
+        signature = self.model.signatures[SERVING_SIGNATURE]
+        self._predict_fn = lambda images: signature(images=images)["probabilities"]
     
     def _create_enhanced_model(self) -> None:
         """Create enhanced model architecture with ResNet backbone."""
+        self.model = self.build_serving_model()
+    
+    def build_serving_model(self, backbone_weights: Optional[str] = 'imagenet') -> tf.keras.Model:
+        """Inference graph: ResNet backbone and classification head, without augmentation or compilation."""
         base_model = tf.keras.applications.ResNet50(
-            weights='imagenet',
+            weights=backbone_weights,
             include_top=False,
             input_shape=self.input_shape
         )
         
         inputs = tf.keras.layers.Input(shape=self.input_shape)
         
-        # Data augmentation layers
-        x = tf.keras.layers.RandomFlip("horizontal")(inputs)
-        x = tf.keras.layers.RandomRotation(0.1)(x)
-        x = tf.keras.layers.RandomZoom(0.1)(x)
-        
         # Use pre-trained base
-        x = base_model(x, training=False)
+        x = base_model(inputs, training=False)
         x = tf.keras.layers.GlobalAveragePooling2D()(x)
         x = tf.keras.layers.Dense(512, activation='relu')(x)
         x = tf.keras.layers.Dropout(0.3)(x)
@@ -52,27 +67,85 @@ class PartDetectionModelV2:
         x = tf.keras.layers.Dropout(0.3)(x)
         outputs = tf.keras.layers.Dense(len(self.class_names), activation='softmax')(x)
         
-        self.model = tf.keras.Model(inputs, outputs)
+        return tf.keras.Model(inputs, outputs, name="part_detection_v2_serving")
+    
+    def build_training_model(self, serving_model: Optional[tf.keras.Model] = None) -> tf.keras.Model:
+        """
+        Training graph: data augmentation in front of the serving graph, compiled.
+        
+        The serving model's layers are shared, so training updates the weights that
+        ``serving_model`` (default: a new one from build_serving_model) serves and exports.
+        """
+        serving_model = serving_model or self.build_serving_model()
+        inputs = tf.keras.layers.Input(shape=self.input_shape)
         
-        self.model.compile(
+        # Data augmentation layers
+        x = tf.keras.layers.RandomFlip("horizontal")(inputs)
+        x = tf.keras.layers.RandomRotation(0.1)(x)
+        x = tf.keras.layers.RandomZoom(0.1)(x)
+        outputs = serving_model(x)
+        
+        model = tf.keras.Model(inputs, outputs, name="part_detection_v2_training")
+        model.compile(
             optimizer=tf.keras.optimizers.Adam(learning_rate=0.0001),
             loss='categorical_crossentropy',
             metrics=['accuracy', 'precision', 'recall']
         )
+        return model
+    
+    def export_saved_model(self, export_dir: str) -> str:
+        """
+        Export the serving graph as a SavedModel with one fixed-shape signature.
+        
+        Loading it with PartDetectionModelV2(export_dir) skips Keras deserialization,
+        compilation and the ResNet50 weight download, and runs no augmentation.
+        """
+        if self.model is None:
+            self.load_model()
+        if not isinstance(self.model, tf.keras.Model):
+            raise ValueError("Only a Keras model can be exported; this model was loaded from a SavedModel")
+        model = self.model
+        
+        @tf.function(input_signature=[tf.TensorSpec(shape=(None, *self.input_shape), dtype=tf.float32, name="images")])
+        def serve(images):
+            return {"probabilities": model(images, training=False)}
+        
+        tf.saved_model.save(model, export_dir, signatures={SERVING_SIGNATURE: serve.get_concrete_function()})
+        return export_dir
     
+    def _compile_predict_fn(self):
+        """Compile an inference-only tf.function with a fixed input spec."""
+        model = self.model
+
+        @tf.function(input_signature=[tf.TensorSpec(shape=(None, *self.input_shape), dtype=tf.float32)])
+        def predict_fn(images):
+            return model(images, training=False)
+
+        # Trace at load time rather than on the first request
+        predict_fn.get_concrete_function()
+        return predict_fn
+
     def predict(self, image: np.ndarray) -> Dict[str, float]:
         """Run inference on input image with enhanced preprocessing."""
+        return self.predict_preprocessed(self._preprocess_image(image))[0]
+    
+    def predict_batch(self, images: List[np.ndarray]) -> List[Dict[str, float]]:
+        """Run one forward pass over several images."""
+        return self.predict_preprocessed(np.concatenate([self._preprocess_image(image) for image in images]))
+    
+    def predict_preprocessed(self, batch: np.ndarray) -> List[Dict[str, float]]:
+        """Run one forward pass over an (N, 256, 256, 3) batch from _preprocess_image."""
         if self.model is None:
             self.load_model()
+        if self._predict_fn is None:
+            self._predict_fn = self._compile_predict_fn()
             
-        processed_image = self._preprocess_image(image)
-        predictions = self.model.predict(processed_image)
+        predictions = self._predict_fn(tf.constant(batch.astype(np.float32, copy=False))).numpy()
         
-        results = {}
-        for i, prob in enumerate(predictions[0]):
-            results[self.class_names[i]] = float(prob)
-            
-        return results
+        return [
+            {class_name: float(prob) for class_name, prob in zip(self.class_names, row)}
+            for row in predictions
+        ]
     
     def _preprocess_image(self, image: np.ndarray) -> np.ndarray:
         """Enhanced preprocessing with normalization."""
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.config import settings
+from ai_services.part_detection.registry import DEFAULT_VERSION_KEY, DetectorRegistry, detector_registry
+
+logger = logging.getLogger(__name__)
+
+
+class ModelWarmup:
+    """Preloads configured model versions and runs synthetic inferences before the service reports ready"""
+
+    def __init__(
+        self,
+        registry: DetectorRegistry,
+        versions: Optional[List[str]] = None,
+        iterations: int = 2,
+        input_size: int = 640
+    ):
+        self.registry = registry
+        self.versions = versions if versions is not None else self._configured_versions()
+        self.iterations = iterations
+        self.input_size = input_size
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.version_status: Dict[str, Dict] = {
+            version: {"status": "pending"} for version in self.versions
+        }
+
+    def _configured_versions(self) -> List[str]:
+        versions = list(settings.PRELOAD_MODEL_VERSIONS) or [DEFAULT_VERSION_KEY, *(settings.MODEL_VERSIONS or {})]
+        if len(versions) > self.registry.max_resident:
+            logger.warning(
+                f"{len(versions)} model versions configured for preload but only "
+                f"{self.registry.max_resident} can stay resident; preloading {versions[:self.registry.max_resident]}"
+            )
+            versions = versions[:self.registry.max_resident]
+        return versions
+
+    def _acquire(self, version: str):
+        """Lease one version from the registry, loading it if needed; returns (detector, load seconds)"""
+        start = time.perf_counter()
+        detector = self.registry.acquire(None if version == DEFAULT_VERSION_KEY else version)
+        return detector, time.perf_counter() - start
+
+    def _warmup_image(self) -> np.ndarray:
+        # Random pixels exercise the full pipeline (NMS included) at the serving input size
+        rng = np.random.default_rng(0)
+        return rng.integers(0, 255, (self.input_size, self.input_size, 3), dtype=np.uint8)
+
+    def _ready_status(self, load_time: float, warmup_time: float) -> Dict:
+        return {
+            "status": "ready",
+            "load_time_seconds": round(load_time, 3),
+            "warmup_time_seconds": round(warmup_time, 3),
+            "warmup_iterations": self.iterations
+        }
+
+    def _warm_version(self, version: str) -> Dict:
+        """Load one version and run warm-up inferences on the calling thread"""
+        detector, load_time = self._acquire(version)
+        try:
+            image = self._warmup_image()
+            start = time.perf_counter()
+            for _ in range(self.iterations):
+                detector.detect_frame_sync(image, 0.5)
+            return self._ready_status(load_time, time.perf_counter() - start)
+        finally:
+            self.registry.release(detector)
+
+    async def _warm_version_async(self, version: str) -> Dict:
+        """
+        Load one version in a worker thread, then warm it through the serving path
+
+        PartDetector.warm sends the inferences through the detector's MicroBatcher
+        (or its inference executor when batching is off), the same as requests.
+        """
+        loop = asyncio.get_running_loop()
+        detector, load_time = await loop.run_in_executor(None, self._acquire, version)
+        try:
+            image = self._warmup_image()
+            start = time.perf_counter()
+            for _ in range(self.iterations):
+                await detector.warm(image, 0.5)
+            return self._ready_status(load_time, time.perf_counter() - start)
+        finally:
+            self.registry.release(detector)
+
+    def _record_loading(self, version: str):
+        self.version_status[version] = {"status": "loading"}
+
+    def _record_ready(self, version: str, status: Dict):
+        self.version_status[version] = status
+        logger.info(f"Model version '{version}' preloaded: {status}")
+
+    def _record_failure(self, version: str, error: Exception):
+        logger.error(f"Failed to preload model version '{version}': {str(error)}")
+        self.version_status[version] = {"status": "failed", "error": str(error)}
+
+    def _finish(self):
+        self.finished_at = time.time()
+        statuses = self.version_status.values()
+        self.ready = not statuses or any(status["status"] == "ready" for status in statuses)
+
+    async def run(self):
+        """Warm every configured version (loads in a worker thread, inferences via the batcher), then flip readiness"""
+        self.started_at = time.time()
+        for version in self.versions:
+            self._record_loading(version)
+            try:
+                self._record_ready(version, await self._warm_version_async(version))
+            except Exception as e:
+                self._record_failure(version, e)
+        self._finish()
+
+    def run_sync(self):
+        """Warm every configured version on the calling thread (processes without an event loop)"""
+        self.started_at = time.time()
+        for version in self.versions:
+            self._record_loading(version)
+            try:
+                self._record_ready(version, self._warm_version(version))
+            except Exception as e:
+                self._record_failure(version, e)
+        self._finish()
+
+    def status(self) -> Dict:
+        """Readiness report with per-version load and warm-up timings"""
+        return {
+            "ready": self.ready,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "versions": self.version_status
+        }
+
+
+model_warmup = ModelWarmup(
+    detector_registry,
+    versions=None if settings.WARMUP_ENABLED else [],
+    iterations=settings.WARMUP_ITERATIONS,
+    input_size=settings.MODEL_INPUT_SIZE
+)
@@ -1,9 +1,11 @@
 import cv2
 import numpy as np
-from typing import Dict, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 import logging
 from PIL import Image, ImageEnhance, ImageFilter
 
+from ai_services.preprocessing.ingest import decode_image, open_upload
+
 logger = logging.getLogger(__name__)
 
 class ImageProcessor:
@@ -100,13 +102,9 @@ class ImageProcessor:
             Dictionary with preprocessing results
         """
         try:
-            # Read image
-            image_data = image_file.read()
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if image is None:
-                raise ValueError("Could not decode image")
+            # Decode straight from the upload buffer
+            with open_upload(image_file) as image_data:
+                image = decode_image(image_data)
             
             # Apply preprocessing based on operation
             processed_image = image
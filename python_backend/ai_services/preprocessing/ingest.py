@@ -0,0 +1,250 @@
+import io
+import logging
+import math
+import mmap
+import os
+import stat
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Start-of-frame markers carry the image size; C4/C8/CC share the range but are not frames
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# libjpeg scales by 1/2, 1/4 or 1/8 during decode (DCT scaling), largest first
+_REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2)
+)
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds the {max_bytes} byte limit")
+        self.max_bytes = max_bytes
+
+
+class BufferPool:
+    """
+    Reusable bytearrays for uploads that have to be copied out of their stream.
+
+    Each in-flight request holds its own buffer (requests interleave on the
+    event loop, so a single shared buffer could be overwritten mid-request);
+    released buffers are kept for the next request instead of being freed.
+    """
+
+    def __init__(self, max_idle: int = 4, max_buffer_bytes: int = 8 * 1024 * 1024):
+        self.max_idle = max_idle
+        self.max_buffer_bytes = max_buffer_bytes
+        self._idle: List[bytearray] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bytearray:
+        with self._lock:
+            return self._idle.pop() if self._idle else bytearray()
+
+    def release(self, buffer: bytearray):
+        with self._lock:
+            if len(self._idle) < self.max_idle and len(buffer) <= self.max_buffer_bytes:
+                self._idle.append(buffer)
+
+
+buffer_pool = BufferPool()
+
+
+def _in_memory_spool(file) -> Optional[io.BytesIO]:
+    """The BytesIO behind a SpooledTemporaryFile that has not rolled over to disk"""
+    if isinstance(file, io.BytesIO):
+        return file
+    inner = getattr(file, "_file", None)
+    return inner if isinstance(inner, io.BytesIO) else None
+
+
+def _disk_fileno(file) -> Optional[int]:
+    """File descriptor of a regular on-disk file, without forcing a spool rollover"""
+    inner = getattr(file, "_file", file)
+    if isinstance(inner, io.BytesIO) or not hasattr(inner, "fileno"):
+        return None
+    try:
+        fileno = inner.fileno()
+        return fileno if stat.S_ISREG(os.fstat(fileno).st_mode) else None
+    except (OSError, ValueError, io.UnsupportedOperation):
+        return None
+
+
+def _read_into(file, buffer: bytearray, max_bytes: int, chunk_size: int) -> int:
+    """Stream ``file`` into ``buffer`` chunk by chunk, stopping as soon as the limit is crossed"""
+    size = 0
+    readinto = getattr(file, "readinto", None)
+    while True:
+        if len(buffer) < size + chunk_size:
+            buffer.extend(bytes(max(chunk_size, len(buffer))))
+        with memoryview(buffer) as view:
+            target = view[size:size + chunk_size]
+            if readinto is not None:
+                count = readinto(target)
+            else:
+                chunk = file.read(chunk_size)
+                count = len(chunk)
+                target[:count] = chunk
+            target.release()
+        if not count:
+            return size
+        size += count
+        if size > max_bytes:
+            raise UploadTooLarge(max_bytes)
+
+
+@contextmanager
+def open_upload(file, max_bytes: Optional[int] = None, chunk_size: Optional[int] = None) -> Iterator[memoryview]:
+    """
+    Expose an uploaded file as a read-only memoryview without an extra copy.
+
+    - In-memory spools (small UploadFiles, BytesIO) are viewed in place.
+    - Spools that rolled over to disk, and regular files, are mmapped.
+    - Anything else is streamed into a pooled buffer in ``chunk_size`` reads.
+
+    The size limit is checked before mapping, or while streaming, so an
+    oversized upload is rejected without being read in full. The view is only
+    valid inside the ``with`` block.
+    """
+    max_bytes = settings.MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    chunk_size = chunk_size or settings.UPLOAD_READ_CHUNK_BYTES
+    start = file.tell() if hasattr(file, "tell") else 0
+
+    spool = _in_memory_spool(file)
+    if spool is not None:
+        with spool.getbuffer() as whole:
+            view = whole[start:].toreadonly()
+        if len(view) > max_bytes:
+            view.release()
+            raise UploadTooLarge(max_bytes)
+        try:
+            yield view
+        finally:
+            _release(view)
+        return
+
+    fileno = _disk_fileno(file)
+    if fileno is not None:
+        size = os.fstat(fileno).st_size
+        if size - start > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        if size <= start:
+            yield memoryview(b"")
+            return
+        mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        with memoryview(mapped) as whole:
+            view = whole[start:]
+        try:
+            yield view
+        finally:
+            if _release(view):
+                mapped.close()
+        return
+
+    buffer = buffer_pool.acquire()
+    try:
+        size = _read_into(file, buffer, max_bytes, chunk_size)
+        with memoryview(buffer) as whole:
+            view = whole[:size].toreadonly()
+        try:
+            yield view
+        finally:
+            if not _release(view):
+                # Still referenced by the caller; let it be collected instead of reused
+                buffer = None
+    finally:
+        if buffer is not None:
+            buffer_pool.release(buffer)
+
+
+def _release(view: memoryview) -> bool:
+    """Release a view handed out by open_upload; False if arrays built on it are still alive"""
+    try:
+        view.release()
+        return True
+    except BufferError:
+        logger.debug("Upload view still referenced after use; deferring release to GC")
+        return False
+
+
+def decode_image(data, flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+    """Decode encoded image bytes (any buffer) without copying them first"""
+    buffer = np.frombuffer(data, np.uint8)
+    # imdecode asserts on an empty buffer instead of returning None
+    image = cv2.imdecode(buffer, flags) if buffer.size else None
+    if image is None:
+        raise ValueError("Could not decode image")
+    return image
+
+
+def jpeg_dimensions(data) -> Optional[Tuple[int, int]]:
+    """(width, height) from a JPEG's frame header, or None if ``data`` is not a JPEG"""
+    with memoryview(data) as view:
+        if len(view) < 4 or view[0] != 0xFF or view[1] != 0xD8:
+            return None
+        pos, end = 2, len(view)
+        while pos + 4 <= end:
+            if view[pos] != 0xFF:
+                return None
+            marker = view[pos + 1]
+            if marker == 0xFF:
+                # Fill byte before a marker
+                pos += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                # Markers without a length field
+                pos += 2
+                continue
+            if marker in _JPEG_SOF_MARKERS:
+                if pos + 9 > end:
+                    return None
+                height = (view[pos + 5] << 8) | view[pos + 6]
+                width = (view[pos + 7] << 8) | view[pos + 8]
+                return width, height
+            pos += 2 + ((view[pos + 2] << 8) | view[pos + 3])
+    return None
+
+
+def reduction_factor(width: int, height: int, target_size: int) -> int:
+    """Largest JPEG scale-down that keeps the long side at or above ``target_size``"""
+    for factor, _ in _REDUCED_DECODE_FLAGS:
+        if max(width, height) / factor >= target_size:
+            return factor
+    return 1
+
+
+def decode_image_reduced(data, target_size: int) -> Tuple[np.ndarray, Tuple[int, int, int]]:
+    """
+    Decode a JPEG at reduced resolution when it is much larger than the model input.
+
+    The model letterboxes to ``target_size`` anyway, so decoding a 4000px
+    photo at 1/4 scale gives it the same pixels for a fraction of the decode
+    time and memory. Other formats decode at full size. Returns the image and
+    the full-resolution (height, width, channels) for mapping boxes back.
+    """
+    dims = jpeg_dimensions(data)
+    factor = reduction_factor(*dims, target_size) if dims else 1
+    if factor == 1:
+        image = decode_image(data)
+        return image, image.shape[:2] + (image.shape[2] if image.ndim > 2 else 1,)
+
+    image = decode_image(data, dict(_REDUCED_DECODE_FLAGS)[factor])
+    decoded_height, decoded_width = image.shape[:2]
+    width, height = dims
+    # The decoder applies EXIF orientation; header dims are pre-rotation
+    if (decoded_height, decoded_width) != (math.ceil(height / factor), math.ceil(width / factor)) \
+            and (decoded_height, decoded_width) == (math.ceil(width / factor), math.ceil(height / factor)):
+        width, height = height, width
+    return image, (height, width, image.shape[2] if image.ndim > 2 else 1)
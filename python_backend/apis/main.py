@@ -1,5 +1,10 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from prometheus_client import make_asgi_app
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -7,15 +12,29 @@ from slowapi.errors import RateLimitExceeded
 from core.config import settings
 from apis.v1 import router as v1_router
 from apis.v2 import router as v2_router
+from apis.timing import StageTimingMiddleware
+from ai_services.part_detection.decode_pool import shutdown_decode_pool
+from ai_services.part_detection.registry import detector_registry
+from ai_services.part_detection.warmup import model_warmup
 
 # Initialize Limiter
 limiter = Limiter(key_func=get_remote_address, default_limits=[settings.RATE_LIMIT])
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Preload and warm up models in the background; /ready reports when they are done"""
+    warmup_task = asyncio.create_task(model_warmup.run())
+    yield
+    warmup_task.cancel()
+    detector_registry.clear()
+    shutdown_decode_pool()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Almona AI Services API",
     description="AI-powered spare parts identification and processing services",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add Rate Limiter
@@ -32,10 +51,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-stage latency of detection requests (request_stage_duration_seconds, optional Server-Timing)
+app.add_middleware(StageTimingMiddleware)
+
 # Mount the versioned APIs
 app.include_router(v1_router, prefix="/api/v1")
 app.include_router(v2_router, prefix="/api/v2")
 
+# Prometheus scrape endpoint (inference admission queue depth, waits and rejections)
+app.mount("/metrics", make_asgi_app())
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
@@ -46,6 +71,14 @@ async def root():
         "docs": "/docs"
     }
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until configured model versions are loaded and warmed up"""
+    return JSONResponse(
+        status_code=200 if model_warmup.ready else 503,
+        content=model_warmup.status()
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,157 @@
+"""Content negotiation for detection responses (JSON, MessagePack, Arrow IPC)."""
+
+import json
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+SUPPORTED_MEDIA_TYPES = (JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, ARROW_MEDIA_TYPE)
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """
+    Pick the response encoding from an Accept header.
+
+    Clients that do not ask for MessagePack or Arrow explicitly get JSON.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if media_type in SUPPORTED_MEDIA_TYPES and quality > 0:
+            candidates.append((-quality, position, media_type))
+
+    return min(candidates)[2] if candidates else JSON_MEDIA_TYPE
+
+
+def wants_arrays(media_type: str) -> bool:
+    """Binary encodings pack the detector's numpy arrays (see PartDetector.detect_parts include_arrays)"""
+    return media_type != JSON_MEDIA_TYPE
+
+
+def _arrays(result: Dict) -> Dict[str, Any]:
+    """
+    bbox (N, 4) float32, confidence float32 and class_id int32 arrays plus class names.
+
+    Taken as-is from "arrays" when the detector attached them; results without
+    them (cache hits) are rebuilt from "columnar" or the detection dicts.
+    """
+    arrays = result.get("arrays")
+    if arrays is not None:
+        return arrays
+    columns = result.get("columnar")
+    if columns is None:
+        detections = result["detections"]
+        columns = {
+            "bbox": [d["bbox"] for d in detections],
+            "confidence": [d["confidence"] for d in detections],
+            "class_id": [d["class_id"] for d in detections],
+            "class_name": [d["class_name"] for d in detections]
+        }
+    return {
+        "bbox": np.asarray(columns["bbox"], dtype=np.float32).reshape(-1, 4),
+        "confidence": np.asarray(columns["confidence"], dtype=np.float32),
+        "class_id": np.asarray(columns["class_id"], dtype=np.int32),
+        "class_name": columns["class_name"]
+    }
+
+
+def _packed(result: Dict) -> Dict[str, Any]:
+    """One image's detections with bbox/confidence/class_id as little-endian float32/int32 bytes"""
+    arrays = _arrays(result)
+    return {
+        "image_info": result["image_info"],
+        "model_info": result["model_info"],
+        "count": len(arrays["confidence"]),
+        "bbox": np.ascontiguousarray(arrays["bbox"], dtype="<f4").tobytes(),
+        "confidence": np.ascontiguousarray(arrays["confidence"], dtype="<f4").tobytes(),
+        "class_id": np.ascontiguousarray(arrays["class_id"], dtype="<i4").tobytes(),
+        "class_name": list(arrays["class_name"])
+    }
+
+
+def encode_msgpack(content: Dict, data: Union[Dict, List[Dict]]) -> bytes:
+    """MessagePack envelope mirroring the JSON one, with detections packed per image"""
+    try:
+        import msgpack
+    except ImportError:
+        raise HTTPException(status_code=406, detail="MessagePack encoding is not available on this server")
+
+    envelope = dict(content)
+    envelope["data"] = [_packed(r) for r in data] if isinstance(data, list) else _packed(data)
+    return msgpack.packb(envelope, use_bin_type=True)
+
+
+def encode_arrow(content: Dict, data: Union[Dict, List[Dict]]) -> bytes:
+    """
+    Arrow IPC stream with one row per detection across all images.
+
+    Columns: image_index (int32), bbox (fixed_size_list<float32, 4>),
+    confidence (float32), class_id (int32), class_name (dictionary<string>).
+    Per-image image_info/model_info and the envelope fields travel as JSON in
+    the schema metadata under "images" and "envelope".
+    """
+    import pyarrow as pa
+
+    results = data if isinstance(data, list) else [data]
+    image_index, bboxes, confidences, class_ids, class_names = [], [], [], [], []
+    for index, result in enumerate(results):
+        arrays = _arrays(result)
+        count = len(arrays["confidence"])
+        image_index.append(np.full(count, index, dtype=np.int32))
+        bboxes.append(arrays["bbox"])
+        confidences.append(arrays["confidence"])
+        class_ids.append(arrays["class_id"])
+        class_names.extend(arrays["class_name"])
+
+    flat_boxes = np.concatenate(bboxes, dtype=np.float32).reshape(-1) if bboxes else np.zeros(0, dtype=np.float32)
+    table = pa.table({
+        "image_index": pa.array(np.concatenate(image_index) if image_index else np.zeros(0, dtype=np.int32)),
+        "bbox": pa.FixedSizeListArray.from_arrays(pa.array(flat_boxes), 4),
+        "confidence": pa.array(np.concatenate(confidences, dtype=np.float32) if confidences else np.zeros(0, dtype=np.float32)),
+        "class_id": pa.array(np.concatenate(class_ids, dtype=np.int32) if class_ids else np.zeros(0, dtype=np.int32)),
+        "class_name": pa.array(class_names, type=pa.string()).dictionary_encode()
+    })
+
+    envelope = {key: value for key, value in content.items() if key != "data"}
+    envelope["batch"] = isinstance(data, list)
+    table = table.replace_schema_metadata({
+        "envelope": json.dumps(envelope),
+        "images": json.dumps([
+            {"image_info": r["image_info"], "model_info": r["model_info"]} for r in results
+        ])
+    })
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def detection_response(media_type: str, content: Dict) -> Response:
+    """
+    Render a detection envelope (``content["data"]`` holds one result or a list)
+    in the negotiated encoding
+    """
+    if media_type == MSGPACK_MEDIA_TYPE:
+        body = encode_msgpack(content, content["data"])
+    elif media_type == ARROW_MEDIA_TYPE:
+        body = encode_arrow(content, content["data"])
+    else:
+        return JSONResponse(status_code=200, content=content)
+    return Response(content=body, status_code=200, media_type=media_type)
@@ -0,0 +1,47 @@
+"""ASGI middleware exporting per-stage request timings as Prometheus histograms and Server-Timing."""
+
+from starlette.datastructures import MutableHeaders
+
+from core.config import settings
+from core.timing import start_request
+
+
+def route_template(scope) -> str:
+    """Path template of the route that served the request, e.g. ``/api/v2/jobs/{job_id}``; "other" if none matched"""
+    route = scope.get("route")
+    if route is None:
+        return "other"
+    # FastAPI releases that keep included routers nested record the prefixed route separately
+    effective = scope.get("fastapi", {}).get("effective_route_context")
+    return getattr(effective, "path_format", None) or getattr(route, "path_format", route.path)
+
+
+class StageTimingMiddleware:
+    """
+    Starts a RequestTimings (core.timing) for every HTTP request.
+
+    When the response starts, stages recorded by the handler and the
+    detection hot path are observed in request_stage_duration_seconds under
+    the matched route template (never the raw path, so the endpoint label
+    stays bounded), and sent back in a Server-Timing header if
+    SERVER_TIMING_ENABLED. Requests that record no stages are left alone.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = start_request()
+
+        async def send_with_timings(message):
+            if message["type"] == "http.response.start" and timings.stages:
+                timings.observe(route_template(scope))
+                if settings.SERVER_TIMING_ENABLED:
+                    MutableHeaders(scope=message).append("Server-Timing", timings.server_timing())
+            await send(message)
+
+        await self.app(scope, receive, send_with_timings)
@@ -1,9 +1,19 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
 
-from ai_services.part_detection.inference import PartDetector
+from ai_services.part_detection.admission import InferenceOverloaded
+from ai_services.part_detection.registry import (
+    UnknownModelVersion,
+    acquire_detector,
+    get_detector,
+    release_detector,
+    resolve_model_version
+)
+from ai_services.preprocessing.ingest import UploadTooLarge
+from apis.responses import detection_response, negotiate_media_type, wants_arrays
 from core.config import settings
+from core.timing import mark_stage, set_model_version, stage
 import logging
 
 from models.api_v1_models import PartDetectionResponse, GetModelsResponse
@@ -13,36 +23,57 @@ router = APIRouter()
 
 @router.post("/identify-part", response_model=PartDetectionResponse)
 async def identify_part(
+    request: Request,
     image: UploadFile = File(...),
     confidence_threshold: float = Query(0.7, ge=0.0, le=1.0),
-    model_version: Optional[str] = Query(None, alias="model_version")
+    model_version: Optional[str] = Query(None, alias="model_version"),
+    include_columnar: bool = Query(False, description="Also return detections as parallel arrays")
 ):
     """
     Identify spare parts from an uploaded image using a YOLOv8 model.
     A specific model version can be selected via the `model_version` query parameter.
+    Send `Accept: application/x-msgpack` or `application/vnd.apache.arrow.stream`
+    for a compact columnar encoding instead of JSON.
     """
+    # Body receive and multipart parsing happen before the handler runs
+    mark_stage("upload")
+    media_type = negotiate_media_type(request.headers.get("accept"))
     try:
         if not image.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="Invalid file type. Please upload an image.")
 
-        part_detector = PartDetector(version=model_version)
+        # Version lookup (MLflow) and model loading block, so keep them off the event loop
+        model_version = await run_in_threadpool(resolve_model_version, model_version)
+        part_detector = await run_in_threadpool(acquire_detector, model_version)
+        set_model_version(model_version)
         
-        result = await part_detector.detect_parts(
-            image.file,
-            confidence_threshold=confidence_threshold
-        )
+        try:
+            result = await part_detector.detect_parts(
+                image.file,
+                confidence_threshold=confidence_threshold,
+                include_columnar=include_columnar,
+                include_arrays=wants_arrays(media_type)
+            )
+        finally:
+            release_detector(part_detector)
         
         logger.info(f"Successfully identified parts using model version: {model_version or 'default'}")
         
-        return JSONResponse(
-            status_code=200,
-            content={
+        with stage("serialize"):
+            return detection_response(media_type, {
                 "success": True,
                 "data": result,
                 "message": "Parts identified successfully"
-            }
-        )
+            })
         
+    except HTTPException:
+        raise
+    except UnknownModelVersion as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Error identifying part: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
@@ -50,7 +81,7 @@ async def identify_part(
 @router.get("/models", response_model=GetModelsResponse)
 async def get_models():
     """Get information about available AI models and their versions.""" 
-    default_detector = PartDetector()
+    default_detector = await run_in_threadpool(get_detector)
     model_info = default_detector.get_model_info()
 
     available_versions = { "default": settings.MODEL_PATH }
@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 
-from . import auth_fastapi, part_detection_fastapi
+from . import auth_fastapi, detection_jobs, part_detection_fastapi
 
 router = APIRouter()
 router.include_router(auth_fastapi.router, prefix="/auth", tags=["Authentication"])
-router.include_router(part_detection_fastapi.router, prefix="/part-detection", tags=["Part Detection"])
\ No newline at end of file
+router.include_router(part_detection_fastapi.router, prefix="/part-detection", tags=["Part Detection"])
+router.include_router(detection_jobs.router, prefix="/part-detection/jobs", tags=["Detection Jobs"])
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""Asynchronous detection jobs backed by the Celery workers."""
+
+from contextlib import aclosing
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import Dict, List, Optional
+import json
+import os
+import time
+import uuid
+import logging
+
+from ai_services.part_detection.progress import TERMINAL_STATES, progress_events
+from ai_services.part_detection.bulk import OUTPUT_FORMATS
+from ai_services.part_detection.tasks import detect_archive, detect_parts, detect_parts_batch, submit_frame
+from ai_services.preprocessing.ingest import UploadTooLarge, decode_image, open_upload
+from apis.v2.part_detection_fastapi import verify_api_key
+from core.celery_app import celery_app
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+router = APIRouter(dependencies=[Depends(verify_api_key)])
+
+RESULT_MEDIA_TYPES = {"jsonl": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+def _enqueue(image: UploadFile, confidence_threshold: float, batch: bool) -> str:
+    """Hand one upload to the workers and return the job id"""
+    if not image.content_type or not image.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail=f"Invalid file type for {image.filename}. Please upload an image.")
+
+    with open_upload(image.file) as image_data:
+        if settings.JOB_INPUT_TRANSPORT == "frame":
+            # Same-host workers get the decoded pixels through shared memory
+            return submit_frame(decode_image(image_data), confidence_threshold, batch=batch).id
+
+        os.makedirs(settings.JOB_UPLOAD_DIR, exist_ok=True)
+        suffix = os.path.splitext(image.filename or "")[1].lower() or ".jpg"
+        image_path = os.path.join(settings.JOB_UPLOAD_DIR, f"{uuid.uuid4().hex}{suffix}")
+        with open(image_path, "wb") as f:
+            f.write(image_data)
+
+    task = detect_parts_batch if batch else detect_parts
+    try:
+        return task.apply_async(kwargs={
+            "image_path": image_path,
+            "confidence_threshold": confidence_threshold,
+            "cleanup": True
+        }).id
+    except Exception:
+        os.remove(image_path)
+        raise
+
+def _save_archive(archive: UploadFile, path: str, max_bytes: int):
+    """Copy an uploaded archive to disk in chunks, enforcing the size limit while streaming"""
+    written = 0
+    try:
+        with open(path, "wb") as f:
+            while True:
+                chunk = archive.file.read(settings.UPLOAD_READ_CHUNK_BYTES)
+                if not chunk:
+                    return
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                f.write(chunk)
+    except Exception:
+        os.remove(path)
+        raise
+
+def _allowed_directory(directory: str) -> str:
+    """Resolve a server-side directory, which must lie under one of BULK_ALLOWED_DIRECTORIES"""
+    path = os.path.realpath(directory)
+    for root in settings.BULK_ALLOWED_DIRECTORIES:
+        root = os.path.realpath(root)
+        if os.path.commonpath([path, root]) == root:
+            if not os.path.isdir(path):
+                raise HTTPException(status_code=400, detail=f"Directory not found: {directory}")
+            return path
+    raise HTTPException(status_code=403, detail="Directory is not under an allowed bulk directory")
+
+def _job_links(job_id: str) -> Dict:
+    return {
+        "job_id": job_id,
+        "status_url": f"/api/v2/part-detection/jobs/{job_id}",
+        "events_url": f"/api/v2/part-detection/jobs/{job_id}/events"
+    }
+
+def _job_status(job_id: str) -> Dict:
+    result = celery_app.AsyncResult(job_id)
+    status = {"job_id": job_id, "state": result.state}
+    if result.state == "SUCCESS":
+        status["result"] = result.result
+    elif result.state == "FAILURE":
+        status["error"] = str(result.result)
+    elif isinstance(result.info, dict):
+        status["progress"] = result.info
+    return status
+
+@router.post("", status_code=202)
+def submit_job(
+    image: UploadFile = File(...),
+    confidence_threshold: float = Query(0.7, ge=0.0, le=1.0),
+    batch: bool = Query(False, description="Route to the batching worker (higher throughput, up to CELERY_BATCH_LINGER_SECONDS extra latency)")
+):
+    """
+    Queue detection for one image and return immediately.
+    Poll the status URL or follow the events URL (Server-Sent Events) for progress.
+    """
+    try:
+        job_id = _enqueue(image, confidence_threshold, batch)
+    except HTTPException:
+        raise
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error submitting detection job: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error submitting job: {str(e)}")
+
+    return {"success": True, "data": _job_links(job_id)}
+
+@router.post("/bulk", status_code=202)
+def submit_bulk_jobs(
+    images: List[UploadFile] = File(...),
+    confidence_threshold: float = Query(0.7, ge=0.0, le=1.0),
+    batch: bool = Query(True, description="Route to the batching worker")
+):
+    """Queue one detection job per image; each job reports progress independently."""
+    if len(images) > settings.JOB_BULK_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Maximum {settings.JOB_BULK_MAX_FILES} images allowed")
+
+    jobs, errors = [], []
+    for image in images:
+        try:
+            jobs.append({"filename": image.filename, **_job_links(_enqueue(image, confidence_threshold, batch))})
+        except HTTPException as e:
+            errors.append({"filename": image.filename, "error": e.detail})
+        except Exception as e:
+            logger.error(f"Error submitting detection job for {image.filename}: {str(e)}")
+            errors.append({"filename": image.filename, "error": str(e)})
+
+    return {"success": not errors, "data": jobs, "errors": errors, "submitted_count": len(jobs)}
+
+@router.post("/archive", status_code=202)
+def submit_archive_job(
+    archive: Optional[UploadFile] = File(None, description="ZIP or TAR (optionally compressed) of images"),
+    directory: Optional[str] = Form(None, description="Server-side directory under BULK_ALLOWED_DIRECTORIES"),
+    output_format: str = Query("jsonl", description="jsonl or parquet"),
+    confidence_threshold: float = Query(0.7, ge=0.0, le=1.0)
+):
+    """
+    Queue detection over a whole archive or directory of catalog images.
+    Entries are streamed through the worker with constant memory and results are
+    written incrementally; download them from the results URL once the job succeeds.
+    """
+    if (archive is None) == (directory is None):
+        raise HTTPException(status_code=400, detail="Provide either an archive or a directory")
+    if output_format not in OUTPUT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"output_format must be one of {', '.join(OUTPUT_FORMATS)}")
+
+    job_id = uuid.uuid4().hex
+    try:
+        if directory is not None:
+            source, cleanup = _allowed_directory(directory), False
+        else:
+            filename = (archive.filename or "").lower()
+            if not filename.endswith(ARCHIVE_SUFFIXES):
+                raise HTTPException(status_code=400, detail="Archive must be a .zip or .tar file")
+            os.makedirs(settings.JOB_UPLOAD_DIR, exist_ok=True)
+            source = os.path.join(settings.JOB_UPLOAD_DIR, f"{job_id}-{os.path.basename(filename)}")
+            _save_archive(archive, source, settings.BULK_MAX_ARCHIVE_BYTES)
+            cleanup = True
+
+        detect_archive.apply_async(kwargs={
+            "source": source,
+            "output_path": os.path.join(settings.BULK_OUTPUT_DIR, f"{job_id}.{output_format}"),
+            "output_format": output_format,
+            "confidence_threshold": confidence_threshold,
+            "cleanup": cleanup
+        }, task_id=job_id)
+    except HTTPException:
+        raise
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error submitting archive detection job: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error submitting job: {str(e)}")
+
+    return {"success": True, "data": {**_job_links(job_id), "results_url": f"/api/v2/part-detection/jobs/{job_id}/results"}}
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    """Current job state from the result backend, with the result once finished."""
+    return {"success": True, "data": _job_status(job_id)}
+
+@router.get("/{job_id}/results")
+def get_job_results(job_id: str):
+    """Download the JSON Lines or Parquet output of a finished archive job."""
+    result = celery_app.AsyncResult(job_id)
+    if result.state != "SUCCESS":
+        raise HTTPException(status_code=409, detail=f"Job is {result.state}, results are available once it succeeds")
+    output = result.result if isinstance(result.result, dict) else {}
+    output_path = output.get("output_path")
+    if not output_path or not os.path.isfile(output_path):
+        raise HTTPException(status_code=404, detail="No result file for this job")
+    return FileResponse(
+        output_path,
+        media_type=RESULT_MEDIA_TYPES[output["output_format"]],
+        filename=os.path.basename(output_path)
+    )
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-Sent Events stream of job progress, ending with a SUCCESS, FAILURE or REVOKED event.
+    Events come from Redis pub/sub, so the stream holds no worker or result-backend polling.
+    A job still PENDING after JOB_EVENTS_IDLE_TIMEOUT_SECONDS without progress (Celery's
+    state for unknown ids too) ends the stream with a "timeout" event.
+    """
+    async def event_stream():
+        try:
+            last_progress = time.monotonic()
+            # aclosing: returning early still unsubscribes from Redis straight away
+            async with aclosing(progress_events(job_id, keepalive_seconds=settings.JOB_EVENTS_KEEPALIVE_SECONDS)) as events:
+                async for event in events:
+                    if event is None:
+                        # Keep proxies from closing an idle stream; also notices jobs whose
+                        # progress expired from Redis but which already finished
+                        status = await run_in_threadpool(_job_status, job_id)
+                        if status["state"] in TERMINAL_STATES:
+                            yield f"event: {status['state'].lower()}\ndata: {json.dumps(status)}\n\n"
+                            return
+                        if status["state"] == "PENDING" and time.monotonic() - last_progress >= settings.JOB_EVENTS_IDLE_TIMEOUT_SECONDS:
+                            yield f"event: timeout\ndata: {json.dumps(status)}\n\n"
+                            return
+                        yield ": keep-alive\n\n"
+                        continue
+                    last_progress = time.monotonic()
+                    yield f"event: {event['state'].lower()}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            logger.error(f"Job event stream for {job_id} failed: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'job_id': job_id, 'error': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Header
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Header, Request
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional, List
 from datetime import datetime
 import os
 import tempfile
 
-from ai_services.part_detection.inference import PartDetector
+from ai_services.part_detection.admission import InferenceOverloaded
+from ai_services.part_detection.registry import (
+    UnknownModelVersion,
+    acquire_detector,
+    get_detector,
+    release_detector,
+    resolve_model_version
+)
+from ai_services.part_detection.cache import detection_cache
+from ai_services.preprocessing.ingest import UploadTooLarge
+from apis.responses import detection_response, negotiate_media_type, wants_arrays
 from core.config import settings
+from core.timing import mark_stage, set_model_version, stage
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,69 +30,108 @@ async def verify_api_key(x_api_key: str = Header(...)):
 
 @router.post("/detect", dependencies=[Depends(verify_api_key)])
 async def detect_parts(
+    request: Request,
     image: UploadFile = File(...),
     confidence_threshold: float = Query(0.7, ge=0.0, le=1.0),
-    model_version: Optional[str] = Query(None, alias="model_version")
+    model_version: Optional[str] = Query(None, alias="model_version"),
+    include_columnar: bool = Query(False, description="Also return detections as parallel arrays")
 ):
     """
     Enhanced part detection endpoint with security.
+    Supports JSON, MessagePack and Arrow IPC responses via the Accept header.
     """
+    # Body receive and multipart parsing happen before the handler runs
+    mark_stage("upload")
+    media_type = negotiate_media_type(request.headers.get("accept"))
     try:
         if not image.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="Invalid file type. Please upload an image.")
 
-        part_detector = PartDetector(version=model_version)
+        # Version lookup (MLflow) and model loading block, so keep them off the event loop
+        model_version = await run_in_threadpool(resolve_model_version, model_version)
+        part_detector = await run_in_threadpool(acquire_detector, model_version)
+        set_model_version(model_version)
         
-        result = await part_detector.detect_parts(
-            image.file,
-            confidence_threshold=confidence_threshold
-        )
+        try:
+            result = await part_detector.detect_parts(
+                image.file,
+                confidence_threshold=confidence_threshold,
+                include_columnar=include_columnar,
+                include_arrays=wants_arrays(media_type)
+            )
+        finally:
+            release_detector(part_detector)
         
-        return JSONResponse(
-            status_code=200,
-            content={
+        with stage("serialize"):
+            return detection_response(media_type, {
                 "success": True,
                 "data": result,
                 "timestamp": datetime.utcnow().isoformat(),
                 "api_version": "2.0.0"
-            }
-        )
+            })
         
+    except HTTPException:
+        raise
+    except UnknownModelVersion as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Error identifying part: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
 
 @router.post("/batch-detect", dependencies=[Depends(verify_api_key)])
 async def batch_detect_parts(
+    request: Request,
     images: List[UploadFile] = File(...),
     confidence_threshold: float = Query(0.7, ge=0.0, le=1.0),
-    model_version: Optional[str] = Query(None, alias="model_version")
+    model_version: Optional[str] = Query(None, alias="model_version"),
+    include_columnar: bool = Query(False, description="Also return detections as parallel arrays")
 ):
     """
     Batch processing endpoint for multiple images.
+    Supports JSON, MessagePack and Arrow IPC responses via the Accept header.
     """
+    # Body receive and multipart parsing happen before the handler runs
+    mark_stage("upload")
+    media_type = negotiate_media_type(request.headers.get("accept"))
     try:
         if len(images) > 10:
             raise HTTPException(status_code=400, detail="Maximum 10 images allowed")
 
-        part_detector = PartDetector(version=model_version)
+        model_version = await run_in_threadpool(resolve_model_version, model_version)
+        part_detector = await run_in_threadpool(acquire_detector, model_version)
+        set_model_version(model_version)
         
-        results = await part_detector.batch_detect(
-            [image.file for image in images],
-            confidence_threshold=confidence_threshold
-        )
+        try:
+            results = await part_detector.batch_detect(
+                [image.file for image in images],
+                confidence_threshold=confidence_threshold,
+                include_columnar=include_columnar,
+                include_arrays=wants_arrays(media_type)
+            )
+        finally:
+            release_detector(part_detector)
         
-        return JSONResponse(
-            status_code=200,
-            content={
+        with stage("serialize"):
+            return detection_response(media_type, {
                 "success": True,
                 "data": results,
                 "processed_count": len(results),
                 "timestamp": datetime.utcnow().isoformat(),
                 "api_version": "2.0.0"
-            }
-        )
+            })
         
+    except HTTPException:
+        raise
+    except UnknownModelVersion as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InferenceOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Error identifying part: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
@@ -98,8 +148,20 @@ async def health_check():
 @router.get("/model-info")
 async def model_info(model_version: Optional[str] = Query(None, alias="model_version")):
     """Get model information."""
-    part_detector = PartDetector(version=model_version)
+    try:
+        model_version = await run_in_threadpool(resolve_model_version, model_version)
+    except UnknownModelVersion as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    part_detector = await run_in_threadpool(get_detector, model_version)
     return {
         "success": True,
         "data": part_detector.get_model_info()
     }
+
+@router.get("/cache-stats", dependencies=[Depends(verify_api_key)])
+async def cache_stats():
+    """Get detection result cache hit/miss counters."""
+    return {
+        "success": True,
+        "data": detection_cache.stats()
+    }
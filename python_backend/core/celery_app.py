@@ -20,4 +20,10 @@ celery_app.conf.update(
     task_soft_time_limit=25 * 60,  # 25 minutes
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
+    # Children load models in worker_process_init before reporting up
+    worker_proc_alive_timeout=settings.CELERY_WORKER_INIT_TIMEOUT,
+    # Batched detection gets its own worker (started with --prefetch-multiplier=0 so it can buffer a batch)
+    task_routes={
+        "detect_parts_batch": {"queue": settings.CELERY_BATCH_QUEUE},
+    },
 )
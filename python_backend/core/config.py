@@ -1,6 +1,12 @@
-from pydantic import Field
+import os
+import tempfile
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+
+# Default home of frame spools, job uploads and bulk results: outside the source tree,
+# and the place to mount a volume shared by the API and the workers
+RUNTIME_DIR = os.path.join(tempfile.gettempdir(), "almona")
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file='.env', extra='ignore', env_nested_delimiter='__')
@@ -9,6 +15,103 @@ class Settings(BaseSettings):
     MODEL_PATH: str = "ai_services/part_detection/models/yolov8n.pt"
     MODEL_VERSIONS: Optional[Dict[str, str]] = Field(default_factory=dict)
     MLFLOW_TRACKING_URI: str = "file:./mlruns"
+    MODEL_REGISTRY_MAX_RESIDENT: int = 2
+
+    # Inference backend: "ultralytics" (PyTorch) or "onnx" (ONNX Runtime CPU), overridable per version
+    # in MODEL_BACKENDS ("default" is MODEL_PATH). ONNX exports live in ONNX_MODEL_DIR as <version>.onnx
+    INFERENCE_BACKEND: str = "ultralytics"
+    MODEL_BACKENDS: Dict[str, str] = Field(default_factory=dict)
+    ONNX_MODEL_DIR: str = "ai_services/part_detection/models/onnx"
+    ONNX_AUTO_EXPORT: bool = True
+    ONNX_DYNAMIC: bool = True
+    ONNX_OPSET: Optional[int] = None
+    # 0 lets ONNX Runtime choose (intra-op: one thread per physical core)
+    ONNX_INTRA_OP_THREADS: int = 0
+    ONNX_INTER_OP_THREADS: int = 1
+
+    # Inference micro-batching
+    BATCHING_ENABLED: bool = True
+    BATCH_MAX_SIZE: int = 8
+    BATCH_MAX_WAIT_MS: float = 5.0
+    # Ultralytics predictors are not thread-safe, so batches for one model run one at a time by default
+    BATCH_MAX_CONCURRENT: int = 1
+
+    # Inference concurrency: threads per PartDetector, and admission control across all of them
+    INFERENCE_THREADS: int = 4
+    INFERENCE_ADMISSION_ENABLED: bool = True
+    # Per API process; requests beyond max concurrency + queue, or queued past the timeout, get 503
+    INFERENCE_MAX_CONCURRENCY: int = 8
+    INFERENCE_MAX_QUEUE: int = 32
+    INFERENCE_QUEUE_TIMEOUT_SECONDS: float = 2.0
+
+    # Per-stage request timings (request_stage_duration_seconds); also echoed in a Server-Timing header if enabled
+    SERVER_TIMING_ENABLED: bool = False
+
+    # Startup preload / warm-up ("default" refers to MODEL_PATH; empty preloads default + MODEL_VERSIONS)
+    WARMUP_ENABLED: bool = True
+    PRELOAD_MODEL_VERSIONS: List[str] = Field(default_factory=list)
+    WARMUP_ITERATIONS: int = 2
+    MODEL_INPUT_SIZE: int = 640
+
+    # Detection result cache (keyed by image hash + model version + threshold)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_TTL_SECONDS: float = 3600
+    RESULT_CACHE_REDIS_ENABLED: bool = False
+
+    # Threshold-independent mode: infer once at the score floor and filter cached raw detections per request
+    RAW_DETECTION_CACHE_ENABLED: bool = False
+    RAW_DETECTION_SCORE_FLOOR: float = 0.05
+    RAW_DETECTION_CACHE_MAX_ENTRIES: int = 256
+
+    # Upload ingestion
+    MAX_UPLOAD_BYTES: int = 25 * 1024 * 1024
+    UPLOAD_READ_CHUNK_BYTES: int = 1024 * 1024
+    # Decode large JPEGs at 1/2, 1/4 or 1/8 scale while the long side stays >= MODEL_INPUT_SIZE
+    REDUCED_DECODE_ENABLED: bool = True
+    # Decode (and preprocess) uploads in this many worker processes instead of the request thread; 0 disables
+    DECODE_PROCESS_WORKERS: int = 0
+    # Geometry-preserving ImageProcessor steps run after decode: enhance, denoise, sharpen, normalize
+    DECODE_PREPROCESS_STEPS: List[str] = Field(default_factory=list)
+    DECODE_PROCESS_START_METHOD: str = "spawn"
+
+    # Celery workers (the model is loaded once per worker process)
+    # Model version the detection tasks serve; "1" is MLflow registry version 1, which workers
+    # have always served, "default" serves MODEL_PATH
+    CELERY_MODEL_VERSION: str = "1"
+    CELERY_PRELOAD_MODELS: bool = True
+    CELERY_WORKER_INIT_TIMEOUT: float = 120.0
+    # detect_parts_batch: flush after this many queued images or this many seconds, whichever comes first
+    CELERY_BATCH_QUEUE: str = "detection-batch"
+    CELERY_BATCH_MAX_SIZE: int = 16
+    CELERY_BATCH_LINGER_SECONDS: float = 1.0
+
+    # Shared frame store: decoded frames handed to same-host workers by handle ("shm" or "spool")
+    FRAME_STORE_TRANSPORT: str = "shm"
+    FRAME_STORE_SPOOL_DIR: str = os.path.join(RUNTIME_DIR, "frames")
+    # The TTL counts from when a frame is written, so it must outlast the longest a frame task can
+    # wait in the queue: frame tasks expire (are discarded unrun) after FRAME_TASK_EXPIRES_SECONDS,
+    # and the TTL must be at least twice that (checked below)
+    FRAME_STORE_TTL_SECONDS: float = 600
+    FRAME_TASK_EXPIRES_SECONDS: float = 300
+
+    # Async detection jobs (/api/v2/part-detection/jobs); JOB_INPUT_TRANSPORT is "file" or "frame"
+    JOB_INPUT_TRANSPORT: str = "file"
+    JOB_UPLOAD_DIR: str = os.path.join(RUNTIME_DIR, "jobs")
+    JOB_BULK_MAX_FILES: int = 100
+    JOB_PROGRESS_TTL_SECONDS: int = 3600
+    JOB_EVENTS_KEEPALIVE_SECONDS: float = 15.0
+    # Celery reports unknown job ids as PENDING forever; end such event streams after this long
+    JOB_EVENTS_IDLE_TIMEOUT_SECONDS: float = 300.0
+
+    # Bulk detection over ZIP/TAR archives or server-side directories (see ai_services.part_detection.bulk)
+    BULK_BATCH_SIZE: int = 16
+    BULK_DECODE_WORKERS: int = 4
+    BULK_QUEUE_SIZE: int = 64
+    BULK_OUTPUT_DIR: str = os.path.join(RUNTIME_DIR, "bulk")
+    BULK_MAX_ARCHIVE_BYTES: int = 5 * 1024 * 1024 * 1024
+    BULK_ALLOWED_DIRECTORIES: List[str] = Field(default_factory=list)
+    BULK_TASK_TIME_LIMIT_SECONDS: int = 6 * 60 * 60
 
     # Security
     VALID_API_KEYS: str = "your-secret-api-key"
@@ -16,9 +119,12 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str
+    DEBUG: bool = False
 
     # Redis
     REDIS_URL: str
+    REDIS_HOST: str = "localhost"
+    REDIS_PORT: int = 6379
 
     # JWT
     JWT_SECRET_KEY: str
@@ -34,4 +140,14 @@ class Settings(BaseSettings):
     TWILIO_AUTH_TOKEN: str
     TWILIO_PHONE_NUMBER: str
 
+    @model_validator(mode="after")
+    def _check_frame_store_ttl(self) -> "Settings":
+        # A frame swept while its task is still queued fails that task on a missing segment
+        if self.FRAME_STORE_TTL_SECONDS < 2 * self.FRAME_TASK_EXPIRES_SECONDS:
+            raise ValueError(
+                f"FRAME_STORE_TTL_SECONDS ({self.FRAME_STORE_TTL_SECONDS}) must be at least twice "
+                f"FRAME_TASK_EXPIRES_SECONDS ({self.FRAME_TASK_EXPIRES_SECONDS})"
+            )
+        return self
+
 settings = Settings()
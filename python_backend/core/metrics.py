@@ -0,0 +1,35 @@
+"""Prometheus metrics for the API process, exposed at /metrics."""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Waits are short by design (INFERENCE_QUEUE_TIMEOUT_SECONDS), so buckets stay fine-grained
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+INFERENCE_IN_FLIGHT = Gauge(
+    "inference_in_flight",
+    "Inferences admitted and currently running"
+)
+INFERENCE_QUEUE_DEPTH = Gauge(
+    "inference_queue_depth",
+    "Requests waiting for an inference slot"
+)
+INFERENCE_QUEUE_WAIT = Histogram(
+    "inference_queue_wait_seconds",
+    "Time admitted requests waited for an inference slot",
+    buckets=WAIT_BUCKETS
+)
+INFERENCE_REJECTED = Counter(
+    "inference_rejected_total",
+    "Requests rejected with 503 by inference admission control",
+    ["reason"]
+)
+
+# Request stages run from sub-millisecond (cache lookups) to seconds (upload, queueing under load)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_STAGE_DURATION = Histogram(
+    "request_stage_duration_seconds",
+    "Time detection requests spent per stage (see core.timing.STAGES)",
+    ["endpoint", "model_version", "stage"],
+    buckets=STAGE_BUCKETS
+)
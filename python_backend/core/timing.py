@@ -0,0 +1,112 @@
+"""Per-stage timings of detection requests, for Prometheus and the Server-Timing header."""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from core.config import settings
+from core.metrics import REQUEST_STAGE_DURATION
+
+# upload:      request start until the route handler runs (body receive, multipart parsing, auth)
+# cache:       upload hashing and result/raw-detection cache lookups and stores
+# admission:   waiting for an inference slot (AdmissionController)
+# decode:      image decode and DECODE_PREPROCESS_STEPS
+# queue:       waiting for the micro-batcher or an inference thread
+# inference:   the model forward pass, including the backend's letterbox and NMS
+# postprocess: rescaling, threshold filtering and building the result dict
+# serialize:   encoding the response body (JSON, MessagePack or Arrow)
+STAGES = ("upload", "cache", "admission", "decode", "queue", "inference", "postprocess", "serialize")
+
+
+class RequestTimings:
+    """
+    Seconds one request spent per stage.
+
+    Stages entered several times (one per image on batch endpoints) add up,
+    so for concurrent images a stage can exceed the request's wall time.
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = time.perf_counter() if started is None else started
+        self.model_version = "default"
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def mark(self, stage: str):
+        """Record the time since the request started as ``stage``"""
+        self.add(stage, time.perf_counter() - self.started)
+
+    def observe(self, endpoint: str):
+        for stage, seconds in self.stages.items():
+            REQUEST_STAGE_DURATION.labels(endpoint=endpoint, model_version=self.model_version, stage=stage).observe(seconds)
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds"""
+        entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Timings of the request being served, or None outside an instrumented request"""
+    return _current.get()
+
+
+def start_request(started: Optional[float] = None) -> RequestTimings:
+    """Begin collecting timings for the request running in this context"""
+    timings = RequestTimings(started)
+    _current.set(timings)
+    return timings
+
+
+def record_stage(stage: str, seconds: float):
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+def mark_stage(stage: str):
+    """Record the time since the current request started as ``stage``"""
+    timings = _current.get()
+    if timings is not None:
+        timings.mark(stage)
+
+
+def model_version_label(version: Optional[str]) -> str:
+    """
+    Metric label for a model version: "default", a version configured in
+    MODEL_VERSIONS or PRELOAD_MODEL_VERSIONS, or "other" for anything else,
+    so label cardinality stays bounded whatever clients send
+    """
+    if not version or version == "default":
+        return "default"
+    if version in (settings.MODEL_VERSIONS or {}) or version in settings.PRELOAD_MODEL_VERSIONS:
+        return version
+    return "other"
+
+
+def set_model_version(version: Optional[str]):
+    """Label the current request's timings with the model version serving it"""
+    timings = _current.get()
+    if timings is not None:
+        timings.model_version = model_version_label(version)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the block as ``name`` for the current request; a no-op outside one"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
@@ -18,10 +18,18 @@ class ModelInfo(BaseModel):
     confidence_threshold: float
     model_version: str
 
+class DetectionColumns(BaseModel):
+    bbox: List[List[float]]
+    confidence: List[float]
+    class_id: List[int]
+    class_name: List[str]
+    center: List[List[float]]
+
 class PartDetectionResponseData(BaseModel):
     detections: List[BoundingBox]
     image_info: ImageInfo
     model_info: ModelInfo
+    columnar: Optional[DetectionColumns] = None
 
 class PartDetectionResponse(BaseModel):
     success: bool
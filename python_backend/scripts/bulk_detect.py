@@ -0,0 +1,87 @@
+"""
+Run part detection over a ZIP/TAR archive or a directory of images.
+
+Results are written incrementally, one record per image, as JSON Lines or
+Parquet. Memory use stays flat however many images the source holds.
+
+Usage (from python_backend/):
+    python scripts/bulk_detect.py ../public/images/machines -o machines.jsonl
+    python scripts/bulk_detect.py catalog.tar.gz -o catalog.parquet --batch-size 32
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_services.part_detection.bulk import OUTPUT_FORMATS, BulkDetectionPipeline, iter_images, open_writer  # noqa: E402
+from ai_services.part_detection.decode_pool import DecodeProcessPool  # noqa: E402
+from ai_services.part_detection.registry import get_detector  # noqa: E402
+from core.config import settings  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk part detection over an archive or directory")
+    parser.add_argument("source", help="ZIP or TAR archive, or a directory (searched recursively)")
+    parser.add_argument("-o", "--output", required=True, help="Output file (.jsonl or .parquet)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="Output format (default: from the output extension)")
+    parser.add_argument("--confidence", type=float, default=0.7, help="Minimum detection confidence")
+    parser.add_argument("--model-version", default=None, help="Model version to load (default: the default model)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Images per forward pass (BULK_BATCH_SIZE)")
+    parser.add_argument("--decode-workers", type=int, default=None, help="Decode threads (BULK_DECODE_WORKERS)")
+    parser.add_argument("--queue-size", type=int, default=None, help="Images buffered between stages (BULK_QUEUE_SIZE)")
+    parser.add_argument(
+        "--decode-processes", type=int, default=settings.DECODE_PROCESS_WORKERS,
+        help="Decode and preprocess in this many processes instead of threads (DECODE_PROCESS_WORKERS)"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    output_format = args.format or ("parquet" if args.output.endswith(".parquet") else "jsonl")
+
+    decode_pool = None
+    if args.decode_processes > 0:
+        decode_pool = DecodeProcessPool(
+            args.decode_processes,
+            steps=settings.DECODE_PREPROCESS_STEPS,
+            target_size=settings.MODEL_INPUT_SIZE if settings.REDUCED_DECODE_ENABLED else None
+        )
+    pipeline = BulkDetectionPipeline(
+        get_detector(args.model_version),
+        confidence_threshold=args.confidence,
+        batch_size=args.batch_size,
+        decode_workers=args.decode_workers,
+        queue_size=args.queue_size,
+        decode_pool=decode_pool
+    )
+    started = time.perf_counter()
+
+    def report(summary):
+        done = summary["processed"] + summary["failed"]
+        rate = done / (time.perf_counter() - started)
+        print(f"\r{done} images ({summary['failed']} failed), {rate:.1f} images/s", end="", file=sys.stderr, flush=True)
+
+    writer = open_writer(args.output, output_format)
+    try:
+        summary = pipeline.run(iter_images(args.source), writer, on_progress=report)
+    finally:
+        writer.close()
+        if decode_pool is not None:
+            decode_pool.close()
+
+    print(file=sys.stderr)
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    summary["output"] = args.output
+    print(json.dumps(summary))
+    return 1 if summary["failed"] and not summary["processed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
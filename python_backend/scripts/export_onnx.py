@@ -0,0 +1,65 @@
+"""
+Export model versions to ONNX for the ONNX Runtime backend.
+
+Weights are taken from the MLflow Model Registry, falling back to
+MODEL_VERSIONS/MODEL_PATH, and written to ONNX_MODEL_DIR/<version>.onnx
+where PartDetector looks for them. Serve a version from the export with
+MODEL_BACKENDS__<version>=onnx.
+
+Usage (from python_backend/):
+    python scripts/export_onnx.py                  # the default model (MODEL_PATH)
+    python scripts/export_onnx.py V2 V3 --force
+    python scripts/export_onnx.py --weights custom.pt -o models/custom.onnx
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_services.part_detection.backends import export_onnx, onnx_path_for, resolve_weights  # noqa: E402
+from core.config import settings  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export YOLOv8 model versions to ONNX")
+    parser.add_argument("versions", nargs="*", default=["default"], help="Model versions (\"default\" is MODEL_PATH)")
+    parser.add_argument("--weights", help="Export this .pt instead of resolving a version (requires -o)")
+    parser.add_argument("-o", "--output", help="Output path (default: ONNX_MODEL_DIR/<version>.onnx)")
+    parser.add_argument("--imgsz", type=int, default=settings.MODEL_INPUT_SIZE, help="Input size (MODEL_INPUT_SIZE)")
+    parser.add_argument("--static", action="store_true", help="Fixed batch size and input shape instead of dynamic axes")
+    parser.add_argument("--opset", type=int, default=settings.ONNX_OPSET, help="ONNX opset (default: Ultralytics' choice)")
+    parser.add_argument("--force", action="store_true", help="Re-export versions that already have an ONNX file")
+    args = parser.parse_args()
+    if args.weights and not args.output:
+        parser.error("--weights requires --output")
+    if args.output and len(args.versions) > 1:
+        parser.error("--output takes a single version")
+    return args
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    export_kwargs = {"input_size": args.imgsz, "dynamic": not args.static, "opset": args.opset}
+
+    if args.weights:
+        print(export_onnx(args.weights, args.output, **export_kwargs))
+        return 0
+
+    for name in args.versions:
+        version = None if name == "default" else name
+        output = args.output or onnx_path_for(version)
+        if os.path.exists(output) and not args.force:
+            print(f"{output} exists, skipping (use --force to re-export)")
+            continue
+        with tempfile.TemporaryDirectory() as download_dir:
+            print(export_onnx(resolve_weights(version, download_dir), output, **export_kwargs))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""
+Export the v2 TensorFlow classifier's serving graph as a SavedModel.
+
+The export has no augmentation layers, optimizer or training metrics and a single
+fixed-shape "serving_default" signature. Point PartDetectionModelV2 at the export
+directory to load it without Keras deserialization or a ResNet50 weight download.
+
+Usage (from python_backend/):
+    python scripts/export_v2_saved_model.py
+    python scripts/export_v2_saved_model.py --model models/part_detection_v2.h5 -o models/part_detection_v2_serving
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_services.part_detection.v2.model import PartDetectionModelV2  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export the v2 classifier as a serving SavedModel")
+    parser.add_argument("--model", default=None, help="Keras .h5 to export (default: PartDetectionModelV2's model path)")
+    parser.add_argument("-o", "--output", default="models/part_detection_v2_serving", help="SavedModel directory")
+    parser.add_argument("--force", action="store_true", help="Overwrite an existing export")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if os.path.exists(args.output) and not args.force:
+        print(f"{args.output} exists, skipping (use --force to re-export)")
+        return 0
+
+    model = PartDetectionModelV2(args.model)
+    model.load_model()
+    print(model.export_saved_model(args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+INT8 post-training quantization of a part_detector version.
+
+Takes a registered version's ONNX export (exported from its weights if
+needed), calibrates activation ranges on a directory of sample images, and
+registers the INT8 model in MLflow as a new part_detector version next to
+the FP32 one. Detection agreement with FP32 and latency/throughput of both
+are logged to the MLflow run and printed as JSON.
+
+Serve the new version on ONNX Runtime with MODEL_BACKENDS__<version>=onnx;
+PartDetector downloads the registered .onnx on first load.
+
+Usage (from python_backend/):
+    python scripts/quantize_model.py 1 --calibration-dir ../public/images/machines
+    python scripts/quantize_model.py 3 --calibration-dir calib/ --eval-dir holdout/ --calibration-method percentile
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import sys
+import tempfile
+
+import mlflow
+from mlflow.tracking import MlflowClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_services.part_detection.backends import OnnxBackend, ensure_onnx_model, onnx_path_for  # noqa: E402
+from ai_services.part_detection.backends.export import MLFLOW_MODEL_NAME, install_model_file  # noqa: E402
+from ai_services.part_detection.backends.quantize import (  # noqa: E402
+    CALIBRATION_METHODS, compare_detections, measure_latency, quantize_onnx
+)
+from ai_services.part_detection.bulk import iter_images  # noqa: E402
+from ai_services.part_detection.decode_pool import decode_and_preprocess  # noqa: E402
+from core.config import settings  # noqa: E402
+
+EXPERIMENT_NAME = "part_detection_models"
+DEFAULT_IMAGE_DIR = os.path.join("..", "public", "images", "machines")
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Quantize a part_detector version to INT8 and register it in MLflow")
+    parser.add_argument("version", help="Source model version (\"default\" is MODEL_PATH)")
+    parser.add_argument("--calibration-dir", default=DEFAULT_IMAGE_DIR, help="Sample images for calibration")
+    parser.add_argument("--eval-dir", help="Images for the FP32/INT8 comparison (default: the calibration images)")
+    parser.add_argument("--max-calibration-images", type=int, default=200)
+    parser.add_argument("--max-eval-images", type=int, default=100)
+    parser.add_argument("--calibration-method", choices=CALIBRATION_METHODS, default="minmax")
+    parser.add_argument("--per-tensor", action="store_true", help="Per-tensor instead of per-channel weight scales")
+    parser.add_argument("--confidence", type=float, default=0.25, help="Confidence used when comparing detections")
+    parser.add_argument("--batch-size", type=int, default=settings.BATCH_MAX_SIZE, help="Batch size for throughput")
+    parser.add_argument("--no-register", action="store_true", help="Evaluate only; write the INT8 model to -o")
+    parser.add_argument("-o", "--output", help="Also keep the INT8 model at this path")
+    return parser.parse_args()
+
+
+def load_images(directory: str, limit: int):
+    """Decode up to ``limit`` images the way PartDetector does at serving time, skipping unreadable files"""
+    target_size = settings.MODEL_INPUT_SIZE if settings.REDUCED_DECODE_ENABLED else None
+    for name, data in itertools.islice(iter_images(directory), limit):
+        if isinstance(data, Exception):
+            logger.warning(f"Skipping {name}: {data}")
+            continue
+        try:
+            yield decode_and_preprocess(data, target_size, settings.DECODE_PREPROCESS_STEPS)[0]
+        except ValueError as e:
+            logger.warning(f"Skipping {name}: {e}")
+
+
+def evaluate(fp32_path: str, int8_path: str, images, confidence: float, batch_size: int):
+    """FP32-vs-INT8 detection agreement plus latency and throughput of each"""
+    fp32 = OnnxBackend(fp32_path, intra_op_threads=settings.ONNX_INTRA_OP_THREADS)
+    int8 = OnnxBackend(int8_path, intra_op_threads=settings.ONNX_INTRA_OP_THREADS)
+    metrics = {
+        f"agreement_{key}": value
+        for key, value in compare_detections(
+            [fp32.predict([image], confidence)[0] for image in images],
+            [int8.predict([image], confidence)[0] for image in images]
+        ).items()
+    }
+    for precision, backend in (("fp32", fp32), ("int8", int8)):
+        for key, value in measure_latency(backend, images, confidence, batch_size).items():
+            metrics[f"{precision}_{key}"] = value
+    metrics["speedup_p50"] = metrics["fp32_latency_p50_ms"] / metrics["int8_latency_p50_ms"]
+    metrics["speedup_throughput"] = metrics["int8_throughput_images_per_s"] / metrics["fp32_throughput_images_per_s"]
+    metrics["fp32_size_mb"] = os.path.getsize(fp32_path) / 2 ** 20
+    metrics["int8_size_mb"] = os.path.getsize(int8_path) / 2 ** 20
+    return metrics
+
+
+def register(int8_path: str, source_version: str, params, metrics) -> str:
+    """Log the INT8 model and its evaluation to an MLflow run and register it as a new part_detector version"""
+    client = MlflowClient()
+    with mlflow.start_run(run_name=f"{MLFLOW_MODEL_NAME}-v{source_version}-int8") as run:
+        mlflow.log_params(params)
+        mlflow.log_metrics(metrics)
+        mlflow.log_artifact(int8_path, artifact_path="model")
+        mlflow.log_dict({"params": params, "metrics": metrics}, "evaluation.json")
+        # A plain artifact rather than an MLflow flavor, so register its location directly
+        try:
+            client.get_registered_model(MLFLOW_MODEL_NAME)
+        except Exception:
+            client.create_registered_model(MLFLOW_MODEL_NAME)
+        registered = client.create_model_version(
+            MLFLOW_MODEL_NAME,
+            source=f"{run.info.artifact_uri}/model",
+            run_id=run.info.run_id,
+            tags={"precision": "int8", "format": "onnx", "source_version": source_version}
+        )
+
+    try:
+        client.set_model_version_tag(MLFLOW_MODEL_NAME, source_version, "int8_version", registered.version)
+    except Exception as e:
+        # The source may be a local MODEL_PATH/MODEL_VERSIONS model that was never registered
+        logger.info(f"Source version '{source_version}' is not registered, not tagging it: {e}")
+    return registered.version
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.no_register and not args.output:
+        print("--no-register requires --output", file=sys.stderr)
+        return 2
+    mlflow.set_tracking_uri(settings.MLFLOW_TRACKING_URI)
+    mlflow.set_experiment(EXPERIMENT_NAME)
+
+    version = None if args.version == "default" else args.version
+    fp32_path = ensure_onnx_model(version)
+    eval_images = list(load_images(args.eval_dir or args.calibration_dir, args.max_eval_images))
+    if not eval_images:
+        print("No readable evaluation images", file=sys.stderr)
+        return 1
+
+    with tempfile.TemporaryDirectory() as workdir:
+        int8_path = os.path.join(workdir, "model_int8.onnx")
+        params = quantize_onnx(
+            fp32_path,
+            int8_path,
+            load_images(args.calibration_dir, args.max_calibration_images),
+            calibration_method=args.calibration_method,
+            per_channel=not args.per_tensor
+        )
+        params.update({"source_version": args.version, "confidence": args.confidence, "eval_images": len(eval_images)})
+        metrics = evaluate(fp32_path, int8_path, eval_images, args.confidence, args.batch_size)
+
+        summary = {"params": params, "metrics": metrics}
+        if not args.no_register:
+            int8_version = register(int8_path, args.version, params, metrics)
+            # Ready for MODEL_BACKENDS__<version>=onnx without a round trip to MLflow
+            install_model_file(int8_path, onnx_path_for(int8_version), copy=True)
+            summary["registered_version"] = int8_version
+        if args.output:
+            install_model_file(int8_path, args.output, copy=True)
+            summary["output"] = args.output
+
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
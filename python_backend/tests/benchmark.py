@@ -1,88 +1,352 @@
-import mlflow
+"""
+CPU benchmark suite for the detection pipeline: upload decoding, ImageProcessor
+operations, PartDetector inference at several batch sizes, post-processing and
+end-to-end HTTP through the FastAPI app in-process (no server, no GPU).
+Run from python_backend with: PYTHONPATH=. python tests/benchmark.py
+
+Each case reports p50/p95/p99 latency (perf_counter), throughput, peak RSS and the
+peak of Python-tracked allocations per call (tracemalloc, measured in a separate
+pass so tracing does not skew the timings). --output writes the results as JSON;
+--baseline compares against an earlier JSON and exits with status 1 when a case's
+p95 latency, throughput or allocations regress by more than --tolerance.
+
+Record the baseline on the deploy hardware, e.g.
+    PYTHONPATH=. python tests/benchmark.py --threads 4 --output tests/benchmark_baseline.json
+and check a change against it with
+    PYTHONPATH=. python tests/benchmark.py --threads 4 --baseline tests/benchmark_baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
 import time
-import numpy as np
-import cv2
+import tracemalloc
 from pathlib import Path
-import pynvml
 
-def run_benchmark(model_name, model_version, image_path, num_iterations=100):
+import cv2
+import numpy as np
+
+SCHEMA_VERSION = 1
+SUITES = ["decode", "preprocess", "inference", "postprocess", "http"]
+# Allocation growth below this is noise (interpreter caches, small lists)
+ALLOC_SLACK_MB = 1.0
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is in KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def measure(fn, iterations, warmup, items_per_call=1, alloc_iterations=5):
     """
-    Benchmarks a model from the MLflow Model Registry.
+    Latency percentiles, throughput, peak RSS and peak traced allocations for fn().
     """
-    # Initialize NVML for GPU monitoring
-    pynvml.nvmlInit()
-    handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+    for _ in range(warmup):
+        fn()
+
+    rss_before = peak_rss_mb()
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - start
+    rss_after = peak_rss_mb()
 
-    # Load the model from MLflow
-    model_uri = f"models:/{model_name}/{model_version}"
+    allocated = []
+    tracemalloc.start()
     try:
-        model = mlflow.pyfunc.load_model(model_uri)
-    except Exception as e:
-        print(f"Failed to load model {model_name}:{model_version}. Error: {e}")
-        return None
-
-    # Load and preprocess the image
-    image = cv2.imread(str(image_path))
-    if image is None:
-        print(f"Failed to load image from {image_path}")
-        return None
-
-    # Warm-up run
-    model.predict(image)
-
-    # Run the benchmark
-    start_time = time.time()
-    for _ in range(num_iterations):
-        model.predict(image)
-    end_time = time.time()
-
-    # Get GPU stats
-    mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-    gpu_util = pynvml.nvmlDeviceGetUtilizationRates(handle).gpu
-
-    # Shutdown NVML
-    pynvml.nvmlShutdown()
-
-    # Calculate metrics
-    total_time = end_time - start_time
-    avg_inference_time = (total_time / num_iterations) * 1000  # in ms
-    throughput = num_iterations / total_time  # images per second
+        for _ in range(alloc_iterations):
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn()
+            allocated.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
 
+    latency_ms = timings * 1000
     return {
-        "model_name": model_name,
-        "model_version": model_version,
-        "avg_inference_time_ms": avg_inference_time,
-        "throughput_fps": throughput,
-        "gpu_memory_used_mb": mem_info.used / (1024**2),
-        "gpu_utilization_percent": gpu_util,
+        "iterations": iterations,
+        "items_per_call": items_per_call,
+        "mean_ms": float(latency_ms.mean()),
+        "p50_ms": float(np.percentile(latency_ms, 50)),
+        "p95_ms": float(np.percentile(latency_ms, 95)),
+        "p99_ms": float(np.percentile(latency_ms, 99)),
+        "max_ms": float(latency_ms.max()),
+        "throughput_per_s": items_per_call * iterations / float(timings.sum()),
+        "peak_rss_mb": rss_after,
+        "rss_growth_mb": rss_after - rss_before,
+        "alloc_peak_mb": max(allocated) / (1024 * 1024)
     }
 
+def load_image_bytes(path, size):
+    """The benchmark photo, or a seeded synthetic JPEG of size x size when there is none"""
+    if path and Path(path).exists():
+        return Path(path).read_bytes()
+    rng = np.random.default_rng(0)
+    image = cv2.GaussianBlur(rng.integers(0, 255, (size, size, 3), dtype=np.uint8), (0, 0), 3)
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+def synthetic_detections(count, shape, num_classes, seed=0):
+    """RawDetections shaped like a busy frame, independent of what the model weights predict"""
+    from ai_services.part_detection.detections import RawDetections
+    rng = np.random.default_rng(seed)
+    height, width = shape[:2]
+    xy = rng.uniform(0, [width * 0.9, height * 0.9], (count, 2))
+    wh = rng.uniform(10, [width * 0.1, height * 0.1], (count, 2))
+    return RawDetections(
+        boxes=np.hstack([xy, xy + wh]).astype(np.float32),
+        scores=rng.uniform(0.2, 1.0, count).astype(np.float32),
+        class_ids=rng.integers(0, max(num_classes, 1), count).astype(np.int32),
+        image_shape=tuple(shape)
+    )
+
+def decode_cases(data, target_size):
+    from ai_services.preprocessing.ingest import decode_image, decode_image_reduced
+    return {
+        "decode/full": lambda: decode_image(data),
+        "decode/reduced": lambda: decode_image_reduced(data, target_size)
+    }
+
+def preprocess_cases(image):
+    from ai_services.preprocessing.image_processor import ImageProcessor
+    processor = ImageProcessor()
+    operations = {
+        "enhance": processor.enhance_image,
+        "normalize": processor.normalize_image,
+        "resize": processor.resize_image,
+        "denoise": processor.denoise_image,
+        "sharpen": processor.sharpen_image,
+        "grayscale": processor.convert_to_grayscale
+    }
+    return {f"preprocess/{name}": (lambda op=op: op(image)) for name, op in operations.items()}
+
+def inference_cases(detector, image, batch_sizes, confidence):
+    cases = {}
+    for batch_size in batch_sizes:
+        images = [image.copy() for _ in range(batch_size)]
+        thresholds = [confidence] * batch_size
+        cases[f"inference/batch-{batch_size}"] = (
+            lambda images=images, thresholds=thresholds: detector._predict_batch(images, thresholds),
+            batch_size
+        )
+    return cases
+
+def postprocess_cases(detector, decoded_shape, original_shape, count, confidence):
+    raw = synthetic_detections(count, decoded_shape, len(detector.backend.class_names))
+    return {
+        f"postprocess/{count}-boxes": lambda: detector._format_result(raw.filter(confidence), confidence),
+        f"postprocess/{count}-boxes-rescaled": lambda: detector._format_result(
+            raw.rescaled(original_shape).filter(confidence), confidence
+        )
+    }
+
+def http_cases(data, model_version, confidence):
+    from fastapi.testclient import TestClient
+    from apis.main import app
+    from core.config import settings
+
+    # Not entered as a context manager: lifespan would start a background model warmup
+    client = TestClient(app)
+    headers = {"X-API-Key": settings.VALID_API_KEYS.split(",")[0]}
+    params = {"confidence_threshold": confidence}
+    if model_version:
+        params["model_version"] = model_version
+
+    def post(path):
+        response = client.post(path, params=params, headers=headers, files={"image": ("benchmark.jpg", data, "image/jpeg")})
+        response.raise_for_status()
+
+    return {"http/v2-detect": lambda: post("/api/v2/part-detection/detect")}
+
+def collect_metadata(args, detector, image_shape):
+    def package_version(name):
+        try:
+            return __import__(name).__version__
+        except Exception:
+            return None
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "threads": args.threads,
+        "packages": {name: package_version(name) for name in ["numpy", "cv2", "torch", "onnxruntime", "fastapi"]},
+        "backend": detector.backend.name if detector else None,
+        "model_version": args.model_version,
+        "image_shape": list(image_shape),
+        "iterations": args.iterations,
+        "warmup": args.warmup
+    }
+
+def run_suites(args):
+    from core.config import settings
+    from ai_services.preprocessing.ingest import decode_image, decode_image_reduced
+
+    # Every iteration sends the same image; cache hits would hide the pipeline
+    settings.RESULT_CACHE_ENABLED = False
+    settings.RAW_DETECTION_CACHE_ENABLED = False
+    if args.threads:
+        cv2.setNumThreads(args.threads)
+        settings.ONNX_INTRA_OP_THREADS = args.threads
+        try:
+            import torch
+            torch.set_num_threads(args.threads)
+        except ImportError:
+            pass
+
+    data = load_image_bytes(args.image, args.synthetic_size)
+    image = decode_image(data)
+    reduced, original_shape = decode_image_reduced(data, settings.MODEL_INPUT_SIZE)
+
+    detector = None
+    if {"inference", "postprocess", "http"} & set(args.suites):
+        from ai_services.part_detection.registry import get_detector
+        detector = get_detector(args.model_version)
+
+    cases = {}
+    if "decode" in args.suites:
+        cases.update(decode_cases(data, settings.MODEL_INPUT_SIZE))
+    if "preprocess" in args.suites:
+        cases.update(preprocess_cases(image))
+    if "inference" in args.suites:
+        cases.update(inference_cases(detector, reduced, args.batch_sizes, args.confidence))
+    if "postprocess" in args.suites:
+        cases.update(postprocess_cases(detector, reduced.shape, original_shape, args.detections, args.confidence))
+
+    skipped = {}
+    if "http" in args.suites:
+        try:
+            cases.update(http_cases(data, args.model_version, args.confidence))
+        except Exception as e:
+            skipped["http/v2-detect"] = f"{type(e).__name__}: {e}"
+
+    results = {}
+    for name, case in cases.items():
+        fn, items = case if isinstance(case, tuple) else (case, 1)
+        try:
+            results[name] = measure(fn, args.iterations, args.warmup, items)
+        except Exception as e:
+            skipped[name] = f"{type(e).__name__}: {e}"
+
+    return {
+        "metadata": collect_metadata(args, detector, image.shape),
+        "results": results,
+        "skipped": skipped
+    }
+
+def compare(report, baseline, tolerance):
+    """
+    Per-case relative change against a baseline report; a case regresses when p95
+    latency grows, throughput drops or allocations grow by more than tolerance.
+    """
+    rows = []
+    for name, current in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        latency = current["p95_ms"] / previous["p95_ms"] - 1
+        throughput = current["throughput_per_s"] / previous["throughput_per_s"] - 1
+        alloc_growth = current["alloc_peak_mb"] - previous["alloc_peak_mb"]
+        alloc = alloc_growth / previous["alloc_peak_mb"] if previous["alloc_peak_mb"] else 0.0
+        rows.append({
+            "case": name,
+            "p95_change": latency,
+            "throughput_change": throughput,
+            "alloc_change": alloc,
+            "regressed": latency > tolerance or throughput < -tolerance
+                or (alloc > tolerance and alloc_growth > ALLOC_SLACK_MB)
+        })
+    return rows
+
+def print_report(report):
+    print("## Results")
+    print("| Case | p50 (ms) | p95 (ms) | p99 (ms) | Throughput (/s) | Peak RSS (MB) | Allocations (MB) |")
+    print("|---|---|---|---|---|---|---|")
+    for name, r in report["results"].items():
+        print(
+            f"| {name} | {r['p50_ms']:.2f} | {r['p95_ms']:.2f} | {r['p99_ms']:.2f} | "
+            f"{r['throughput_per_s']:.1f} | {r['peak_rss_mb']:.0f} | {r['alloc_peak_mb']:.2f} |"
+        )
+    for name, reason in report["skipped"].items():
+        print(f"- **Skipped {name}:** {reason}")
+
+def print_comparison(rows, report, baseline):
+    print("\n## Comparison with baseline")
+    for key in ["machine", "cpu_count", "threads", "backend"]:
+        if baseline.get("metadata", {}).get(key) != report["metadata"][key]:
+            print(f"- **Warning:** {key} differs from the baseline ({baseline['metadata'].get(key)} vs {report['metadata'][key]})")
+    print("| Case | p95 | Throughput | Allocations | Status |")
+    print("|---|---|---|---|---|")
+    for row in rows:
+        status = "REGRESSION" if row["regressed"] else "ok"
+        print(f"| {row['case']} | {row['p95_change']:+.1%} | {row['throughput_change']:+.1%} | {row['alloc_change']:+.1%} | {status} |")
+    missing = sorted(set(baseline.get("results", {})) - set(report["results"]))
+    if missing:
+        print(f"- **Not measured in this run:** {', '.join(missing)}")
+
+def parse_args(argv, defaults):
+    parser = argparse.ArgumentParser(description="CPU benchmark suite for the detection pipeline")
+    parser.add_argument("--suites", type=lambda s: s.split(","), default=SUITES, help=f"Comma-separated subset of {','.join(SUITES)}")
+    parser.add_argument("--image", default=defaults["image"], help="JPEG to benchmark with (synthetic if missing)")
+    parser.add_argument("--synthetic-size", type=int, default=defaults["synthetic_size"])
+    parser.add_argument("--model-version", default=defaults["model_version"])
+    parser.add_argument("--batch-sizes", type=lambda s: [int(b) for b in s.split(",")], default=defaults["batch_sizes"])
+    parser.add_argument("--detections", type=int, default=defaults["detections"], help="Boxes per frame in the post-processing cases")
+    parser.add_argument("--confidence", type=float, default=defaults["confidence"])
+    parser.add_argument("--iterations", type=int, default=defaults["iterations"])
+    parser.add_argument("--warmup", type=int, default=defaults["warmup"])
+    parser.add_argument("--threads", type=int, default=defaults["threads"], help="Pin OpenCV, torch and ONNX Runtime threads")
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare against a JSON written by --output")
+    parser.add_argument("--tolerance", type=float, default=defaults["tolerance"], help="Allowed relative regression")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
     # --- Configuration ---
-    MLFLOW_TRACKING_URI = "file:../mlruns"  # Relative to the script location
-    IMAGE_PATH = Path("../public/images/machines/cutting-machine.jpg") # Relative to the script location
-    MODELS_TO_BENCHMARK = [
-        {"name": "part_detector", "version": "1"},
-        # Add other models to benchmark here
-    ]
+    DEFAULTS = {
+        "image": str(Path(__file__).resolve().parents[2] / "public/images/machines/cutting-machine.jpg"),
+        "synthetic_size": 2000,
+        "model_version": None,
+        "batch_sizes": [1, 2, 4, 8],
+        "detections": 100,
+        "confidence": 0.25,
+        "iterations": 50,
+        "warmup": 5,
+        "threads": None,
+        "tolerance": 0.10
+    }
     # --- End Configuration ---
 
-    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    args = parse_args(sys.argv[1:], DEFAULTS)
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        sys.exit(f"Unknown suites: {', '.join(sorted(unknown))}")
 
-    print("# GPU Benchmarking Report")
+    print("# CPU Pipeline Benchmark")
     print("---")
+    report = run_suites(args)
+    print_report(report)
 
-    for model_info in MODELS_TO_BENCHMARK:
-        result = run_benchmark(
-            model_name=model_info["name"],
-            model_version=model_info["version"],
-            image_path=IMAGE_PATH,
-        )
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.output}")
 
-        if result:
-            print(f"## Model: {result['model_name']}:{result['model_version']}")
-            print(f"- **Average Inference Time:** {result['avg_inference_time_ms']:.2f} ms")
-            print(f"- **Throughput:** {result['throughput_fps']:.2f} FPS")
-            print(f"- **GPU Memory Used:** {result['gpu_memory_used_mb']:.2f} MB")
-            print(f"- **GPU Utilization:** {result['gpu_utilization_percent']}%")
-            print("\n")
\ No newline at end of file
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        rows = compare(report, baseline, args.tolerance)
+        print_comparison(rows, report, baseline)
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
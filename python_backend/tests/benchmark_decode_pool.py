@@ -0,0 +1,121 @@
+"""
+Decode + preprocess throughput versus worker count: threads in the API
+process vs DecodeProcessPool, with and without inference running alongside.
+Run from python_backend with: PYTHONPATH=. python tests/benchmark_decode_pool.py
+
+Worker counts go up to os.cpu_count(), so run it on the 16- and 32-core
+nodes themselves; set BENCH_MAX_WORKERS to cap or extend the sweep.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+from core.config import settings
+from ai_services.part_detection.decode_pool import DecodeProcessPool, decode_and_preprocess
+
+def make_jpeg(width, height):
+    """Smooth gradients plus sensor-like noise, closer to a photo than pure noise"""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    noise = rng.normal(0, 8, (height, width, 3))
+    image = np.clip(base + noise, 0, 255).astype(np.uint8)
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 92])[1].tobytes()
+
+def worker_counts(max_workers):
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+class InferenceLoad:
+    """Runs detect_frame_sync back to back on one thread and counts completed inferences"""
+
+    def __init__(self, detector):
+        self.detector = detector
+        self.frame = np.zeros((settings.MODEL_INPUT_SIZE, settings.MODEL_INPUT_SIZE, 3), dtype=np.uint8)
+        self.count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.detector.detect_frame_sync(self.frame)
+            self.count += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def run_benchmark(decode, data, workers, num_images, detector=None):
+    """Images/s decoded with ``workers`` concurrent callers, plus inferences/s if a detector runs alongside"""
+    with ThreadPoolExecutor(max_workers=workers) as callers:
+        list(callers.map(decode, [data] * workers))  # warm-up (and process start-up)
+        load = InferenceLoad(detector) if detector is not None else None
+        if load is not None:
+            load.__enter__()
+        start = time.perf_counter()
+        list(callers.map(decode, [data] * num_images))
+        elapsed = time.perf_counter() - start
+        if load is not None:
+            load.__exit__()
+    return {
+        "images_per_s": num_images / elapsed,
+        "inferences_per_s": load.count / elapsed if load is not None else None
+    }
+
+if __name__ == "__main__":
+    # --- Configuration ---
+    IMAGE_SIZE = (2048, 1536)
+    STEP_SETS = [[], ["enhance"], ["denoise"]]
+    IMAGES_PER_WORKER = 8
+    MAX_WORKERS = int(os.environ.get("BENCH_MAX_WORKERS", os.cpu_count()))
+    WITH_INFERENCE = os.environ.get("BENCH_WITH_INFERENCE", "1") == "1"
+    # --- End Configuration ---
+
+    data = make_jpeg(*IMAGE_SIZE)
+    target_size = settings.MODEL_INPUT_SIZE if settings.REDUCED_DECODE_ENABLED else None
+    detector = None
+    if WITH_INFERENCE:
+        from ai_services.part_detection.registry import get_detector
+        detector = get_detector()
+
+    print("# Decode/Preprocess Scaling Benchmark")
+    print(f"{IMAGE_SIZE[0]}x{IMAGE_SIZE[1]} JPEG, {os.cpu_count()} cores, reduced decode {'on' if target_size else 'off'}")
+    print("---")
+
+    for steps in STEP_SETS:
+        print(f"## steps: {', '.join(steps) or '(decode only)'}")
+        print("| workers | threads (img/s) | processes (img/s) | speedup | inference with threads (/s) | inference with processes (/s) |")
+        print("|---|---|---|---|---|---|")
+        for workers in worker_counts(MAX_WORKERS):
+            num_images = workers * IMAGES_PER_WORKER
+            threaded = run_benchmark(
+                lambda d: decode_and_preprocess(d, target_size, steps), data, workers, num_images, detector
+            )
+            pool = DecodeProcessPool(workers, steps=steps, target_size=target_size)
+            try:
+                pooled = run_benchmark(pool.decode_sync, data, workers, num_images, detector)
+            finally:
+                pool.close()
+            inference = ("-", "-")
+            if detector is not None:
+                inference = (f"{threaded['inferences_per_s']:.1f}", f"{pooled['inferences_per_s']:.1f}")
+            print(
+                f"| {workers} | {threaded['images_per_s']:.1f} | {pooled['images_per_s']:.1f} "
+                f"| {pooled['images_per_s'] / threaded['images_per_s']:.2f}x | {inference[0]} | {inference[1]} |"
+            )
+        print("\n")
+
+    if detector is not None:
+        detector.close()
@@ -0,0 +1,102 @@
+"""
+Benchmarks JSON vs MessagePack vs Arrow IPC encodings of detection responses.
+Run from python_backend with: PYTHONPATH=. python tests/benchmark_encoding.py
+"""
+
+import json
+import time
+import numpy as np
+import msgpack
+import pyarrow as pa
+from fastapi.responses import JSONResponse
+
+from apis.responses import encode_arrow, encode_msgpack
+
+CLASS_NAMES = ["cutting_blade", "motor", "frame", "control_panel", "safety_guard", "conveyor", "sensor", "fastener"]
+
+def make_result(num_boxes, rng):
+    """Build a detection result shaped like PartDetector output for binary requests (include_arrays)"""
+    xy = rng.uniform(0, 3000, (num_boxes, 2))
+    wh = rng.uniform(10, 400, (num_boxes, 2))
+    boxes = np.hstack([xy, xy + wh]).astype(np.float32)
+    scores = rng.uniform(0.5, 1.0, num_boxes).astype(np.float32)
+    class_ids = rng.integers(0, len(CLASS_NAMES), num_boxes).astype(np.int32)
+    columns = {
+        "bbox": boxes.tolist(),
+        "confidence": scores.tolist(),
+        "class_id": class_ids.tolist(),
+        "class_name": [CLASS_NAMES[i] for i in class_ids],
+        "center": ((boxes[:, :2] + boxes[:, 2:]) / 2).tolist()
+    }
+    return {
+        "detections": [
+            {"bbox": b, "confidence": c, "class_id": k, "class_name": n, "center": m}
+            for b, c, k, n, m in zip(*columns.values())
+        ],
+        "image_info": {"width": 4000, "height": 3000, "channels": 3},
+        "model_info": {"framework": "YOLOv8", "confidence_threshold": 0.5, "model_version": "1"},
+        "arrays": {"bbox": boxes, "confidence": scores, "class_id": class_ids, "class_name": columns["class_name"]}
+    }
+
+def time_call(fn, iterations):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        out = fn()
+    return (time.perf_counter() - start) / iterations * 1000, out
+
+def run_benchmark(num_boxes, batch_size=1, iterations=50):
+    """
+    Encode and decode one response per format; times are per response in ms.
+    """
+    rng = np.random.default_rng(0)
+    results = [make_result(num_boxes, rng) for _ in range(batch_size)]
+    data = results if batch_size > 1 else results[0]
+    content = {"success": True, "data": data, "api_version": "2.0.0"}
+    # JSON clients receive the plain per-detection list, without the arrays
+    json_content = {
+        "success": True,
+        "data": [{k: v for k, v in r.items() if k != "arrays"} for r in results] if batch_size > 1
+        else {k: v for k, v in results[0].items() if k != "arrays"},
+        "api_version": "2.0.0"
+    }
+
+    encoders = {
+        "json": lambda: JSONResponse(content=json_content).body,
+        "msgpack": lambda: encode_msgpack(content, data),
+        "arrow": lambda: encode_arrow(content, data),
+    }
+    decoders = {
+        "json": json.loads,
+        "msgpack": lambda body: msgpack.unpackb(body, raw=False),
+        "arrow": lambda body: pa.ipc.open_stream(body).read_all(),
+    }
+
+    report = {}
+    for name, encode in encoders.items():
+        encode_ms, body = time_call(encode, iterations)
+        decode_ms, _ = time_call(lambda: decoders[name](body), iterations)
+        report[name] = {"bytes": len(body), "encode_ms": encode_ms, "decode_ms": decode_ms}
+    return report
+
+if __name__ == "__main__":
+    # --- Configuration ---
+    SCENARIOS = [
+        {"num_boxes": 10, "batch_size": 1},
+        {"num_boxes": 100, "batch_size": 1},
+        {"num_boxes": 1000, "batch_size": 1},
+        {"num_boxes": 100, "batch_size": 10},
+    ]
+    # --- End Configuration ---
+
+    print("# Response Encoding Benchmark")
+    print("---")
+
+    for scenario in SCENARIOS:
+        report = run_benchmark(**scenario)
+        print(f"## {scenario['num_boxes']} boxes x {scenario['batch_size']} image(s)")
+        print("| format | size (KB) | encode (ms) | decode (ms) |")
+        print("|---|---|---|---|")
+        for name, row in report.items():
+            print(f"| {name} | {row['bytes'] / 1024:.1f} | {row['encode_ms']:.3f} | {row['decode_ms']:.3f} |")
+        print("\n")
@@ -0,0 +1,99 @@
+"""
+Peak RSS per request for upload ingestion: read() + frombuffer vs open_upload,
+with full-size and reduced-resolution JPEG decoding.
+Run from python_backend with: PYTHONPATH=. python tests/benchmark_ingest.py
+
+Each request runs in a fresh process so ru_maxrss reflects that request only.
+"""
+
+import multiprocessing
+import resource
+import shutil
+import tempfile
+import time
+import numpy as np
+from PIL import Image
+
+# Starlette spools uploads to disk past 1 MB
+SPOOL_MAX_SIZE = 1024 * 1024
+
+def make_image(path, size, quality=95):
+    array = np.random.default_rng(0).integers(0, 255, (size, size, 3), dtype=np.uint8)
+    Image.fromarray(array).save(path, "JPEG", quality=quality)
+
+def spooled_upload(path, max_size=SPOOL_MAX_SIZE):
+    spool = tempfile.SpooledTemporaryFile(max_size=max_size)
+    with open(path, "rb") as f:
+        shutil.copyfileobj(f, spool)
+    spool.seek(0)
+    return spool
+
+def legacy_request(upload):
+    import cv2
+    image_data = upload.read()
+    nparr = np.frombuffer(image_data, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+def ingest_request(upload):
+    from ai_services.preprocessing.ingest import decode_image, open_upload
+    with open_upload(upload, max_bytes=1 << 30) as image_data:
+        return decode_image(image_data)
+
+def reduced_request(upload, target_size=640):
+    from ai_services.preprocessing.ingest import decode_image_reduced, open_upload
+    with open_upload(upload, max_bytes=1 << 30) as image_data:
+        return decode_image_reduced(image_data, target_size)[0]
+
+STRATEGIES = {"read()": legacy_request, "open_upload": ingest_request, "open_upload + reduced": reduced_request}
+
+def _measure(strategy, path, max_size, queue):
+    import cv2  # noqa: F401 - import cost stays out of the measurement
+    import ai_services.preprocessing.ingest  # noqa: F401
+    upload = spooled_upload(path, max_size)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    image = STRATEGIES[strategy](upload)
+    elapsed = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({"peak_rss_mb": (after - before) / 1024, "time_ms": elapsed * 1000, "shape": image.shape})
+
+def run_benchmark(path, strategy, max_size=SPOOL_MAX_SIZE):
+    """
+    Peak RSS growth (MB) and wall time for one request in a fresh process.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(strategy, path, max_size, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+if __name__ == "__main__":
+    # --- Configuration ---
+    IMAGE_SIZES = [1000, 4000]
+    # A spool larger than the upload never rolls over, like a small UploadFile
+    SPOOL_SIZES = {"on-disk spool": SPOOL_MAX_SIZE, "in-memory spool": 1 << 30}
+    # --- End Configuration ---
+
+    print("# Upload Ingestion Benchmark")
+    print("---")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in IMAGE_SIZES:
+            path = f"{workdir}/image_{size}.jpg"
+            make_image(path, size)
+            file_mb = len(open(path, "rb").read()) / (1024 * 1024)
+            decoded_mb = size * size * 3 / (1024 * 1024)
+
+            print(f"## {size}x{size} JPEG ({file_mb:.1f} MB encoded, {decoded_mb:.1f} MB decoded)")
+            print("| spool | strategy | decoded shape | peak RSS growth (MB) | time (ms) |")
+            print("|---|---|---|---|---|")
+            for spool_name, max_size in SPOOL_SIZES.items():
+                for strategy in STRATEGIES:
+                    result = run_benchmark(path, strategy, max_size)
+                    print(
+                        f"| {spool_name} | {strategy} | {result['shape']} | "
+                        f"{result['peak_rss_mb']:.1f} | {result['time_ms']:.1f} |"
+                    )
+            print("\n")
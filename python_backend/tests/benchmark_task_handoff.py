@@ -0,0 +1,73 @@
+"""
+Per-task CPU cost of handing a decoded frame to PartDetector:
+JPEG re-encode + detect_parts_sync (old Celery task) vs detect_frame_sync.
+Run from python_backend with: PYTHONPATH=. python tests/benchmark_task_handoff.py
+"""
+
+import io
+import time
+import cv2
+import numpy as np
+
+from ai_services.part_detection.registry import get_detector
+
+def make_frame(width, height):
+    """Smooth gradients plus sensor-like noise, closer to a photo than pure noise"""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    noise = rng.normal(0, 8, (height, width, 3))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+def reencode_task(detector, frame):
+    image_file = io.BytesIO(cv2.imencode('.jpg', frame)[1].tobytes())
+    return detector.detect_parts_sync(image_file, confidence_threshold=0.7)
+
+def frame_task(detector, frame):
+    return detector.detect_frame_sync(frame, confidence_threshold=0.7)
+
+def reencode_only(detector, frame):
+    image_file = io.BytesIO(cv2.imencode('.jpg', frame)[1].tobytes())
+    return detector._decode(image_file.getbuffer())
+
+def run_benchmark(detector, frame, task, num_iterations=10):
+    """
+    Mean CPU seconds (all threads) and wall seconds per task.
+    """
+    task(detector, frame)  # warm-up
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for _ in range(num_iterations):
+        task(detector, frame)
+    return {
+        "cpu_ms": (time.process_time() - cpu_start) / num_iterations * 1000,
+        "wall_ms": (time.perf_counter() - wall_start) / num_iterations * 1000
+    }
+
+if __name__ == "__main__":
+    # --- Configuration ---
+    FRAME_SIZES = [(1280, 960), (4032, 3024)]
+    NUM_ITERATIONS = 10
+    # --- End Configuration ---
+
+    detector = get_detector()
+    tasks = {
+        "re-encode + detect_parts_sync": reencode_task,
+        "detect_frame_sync": frame_task,
+        "(re-encode + decode only)": reencode_only,
+    }
+
+    print("# Celery Task Handoff Benchmark")
+    print("---")
+
+    for width, height in FRAME_SIZES:
+        frame = make_frame(width, height)
+        print(f"## {width}x{height} frame")
+        print("| path | CPU per task (ms) | wall per task (ms) |")
+        print("|---|---|---|")
+        for name, task in tasks.items():
+            result = run_benchmark(detector, frame, task, NUM_ITERATIONS)
+            print(f"| {name} | {result['cpu_ms']:.1f} | {result['wall_ms']:.1f} |")
+        print("\n")
+
+    detector.close()
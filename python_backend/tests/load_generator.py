@@ -0,0 +1,391 @@
+"""
+Open-loop load generator for the detection routes: /api/v1/part-detection/identify-part
+and /api/v2/part-detection/detect and /batch-detect, with a weighted mix of image sizes,
+confidence thresholds and endpoints.
+Run from python_backend with: PYTHONPATH=. python tests/load_generator.py [--nodes onnx-batched] [--host URL]
+
+Requests go out on a Poisson arrival schedule whatever the server's response times
+(Locust's closed-loop users slow down with the server and hide saturation), and latency
+is measured from each request's scheduled send time. The arrival rate ramps through
+stages; every stage reports completed throughput, latency percentiles, 503s (load
+shedding) and errors, and the first stage that misses the SLO is the node's saturation
+point.
+
+Without --host each node configuration starts its own uvicorn server with a stand-in
+model: yolov8n built from its config with untrained weights (no download, no MLflow),
+so compute matches yolov8n but there are few detections to post-process. Pass --model
+to load real weights instead.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import cv2
+import httpx
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+ENDPOINTS = {
+    "v1-identify-part": "/api/v1/part-detection/identify-part",
+    "v2-detect": "/api/v2/part-detection/detect",
+    "v2-batch-detect": "/api/v2/part-detection/batch-detect"
+}
+# Settings every local node shares; node configurations override them
+BASE_NODE_ENV = {
+    # The generator reuses a handful of payloads, so cache hits would hide inference
+    "RESULT_CACHE_ENABLED": False,
+    "RAW_DETECTION_CACHE_ENABLED": False,
+    "PRELOAD_MODEL_VERSIONS": []
+}
+
+def make_image_bytes(width, height, seed=0, quality=90):
+    """A seeded JPEG with gradients, blocks and noise, encoded like a camera photo"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    image = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    for _ in range(12):
+        w, h = rng.integers(width // 20, width // 4), rng.integers(height // 20, height // 4)
+        left, top = rng.integers(0, width - w), rng.integers(0, height - h)
+        image[top:top + h, left:left + w] = rng.integers(0, 255, 3)
+    image += rng.normal(0, 8, image.shape)
+    image = np.clip(image, 0, 255).astype(np.uint8)
+    return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+
+def make_payloads(image_sizes, variants=3):
+    """A few distinct JPEGs per "WIDTHxHEIGHT" size"""
+    payloads = {}
+    for size in image_sizes:
+        width, height = (int(v) for v in size.lower().split("x"))
+        payloads[size] = [make_image_bytes(width, height, seed) for seed in range(variants)]
+    return payloads
+
+def choose(rng, weights):
+    keys = list(weights)
+    p = np.array([weights[k] for k in keys], dtype=float)
+    return keys[rng.choice(len(keys), p=p / p.sum())]
+
+def build_request(rng, mix, payloads):
+    """One request from the mix: (endpoint, path, query params, multipart files)"""
+    endpoint = choose(rng, mix["endpoints"])
+    params = {"confidence_threshold": float(rng.choice(mix["thresholds"]))}
+    if mix.get("model_version"):
+        params["model_version"] = mix["model_version"]
+
+    def pick_image(i):
+        variants = payloads[choose(rng, mix["image_sizes"])]
+        return (f"image_{i}.jpg", variants[rng.integers(len(variants))], "image/jpeg")
+
+    if endpoint == "v2-batch-detect":
+        low, high = mix["batch_images"]
+        files = [("images", pick_image(i)) for i in range(rng.integers(low, high + 1))]
+    else:
+        files = {"image": pick_image(0)}
+    return endpoint, ENDPOINTS[endpoint], params, files
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else None
+
+def summarize(records, rate, duration, elapsed, dropped):
+    """Throughput and latency percentiles (ms, successful requests only) for one stage"""
+    ok = [r["latency"] * 1000 for r in records if r["status"] == 200]
+    shed = sum(1 for r in records if r["status"] == 503)
+    by_endpoint = {}
+    for endpoint in sorted({r["endpoint"] for r in records}):
+        latencies = [r["latency"] * 1000 for r in records if r["endpoint"] == endpoint and r["status"] == 200]
+        by_endpoint[endpoint] = {
+            "sent": sum(1 for r in records if r["endpoint"] == endpoint),
+            "ok": len(latencies),
+            "p50_ms": percentile(latencies, 50),
+            "p99_ms": percentile(latencies, 99)
+        }
+    return {
+        "offered_rps": rate,
+        "duration_s": duration,
+        "sent": len(records),
+        "ok": len(ok),
+        "shed": shed,
+        "errors": len(records) - len(ok) - shed,
+        "dropped": dropped,
+        "completed_rps": len(ok) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ok, 50),
+        "p95_ms": percentile(ok, 95),
+        "p99_ms": percentile(ok, 99),
+        "max_ms": max(ok) if ok else None,
+        "by_endpoint": by_endpoint
+    }
+
+def is_saturated(stage, slo_p99_ms, max_failure_rate):
+    """
+    A stage misses the SLO when p99 exceeds it or too many requests fail (503s, errors and
+    requests the generator had to drop). Latency counts from the scheduled send time, so a
+    server falling behind the arrival rate shows up as a growing p99.
+    """
+    attempted = stage["sent"] + stage["dropped"]
+    failures = stage["shed"] + stage["errors"] + stage["dropped"]
+    if not attempted:
+        return False
+    return (
+        stage["p99_ms"] is None
+        or stage["p99_ms"] > slo_p99_ms
+        or failures / attempted > max_failure_rate
+    )
+
+async def send(client, request, scheduled, records, loop):
+    endpoint, path, params, files = request
+    try:
+        response = await client.post(path, params=params, files=files)
+        status = response.status_code
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    records.append({"endpoint": endpoint, "status": status, "latency": loop.time() - scheduled})
+
+async def run_stage(client, rate, duration, mix, payloads, rng, max_in_flight):
+    """
+    Send Poisson arrivals at ``rate`` per second for ``duration`` seconds, then wait for
+    the stragglers. Arrivals beyond ``max_in_flight`` outstanding requests are dropped
+    and counted rather than delayed, so the schedule stays open-loop.
+    """
+    loop = asyncio.get_running_loop()
+    records, in_flight = [], set()
+    dropped = 0
+    start = loop.time()
+    offset = rng.exponential(1 / rate)
+    while offset < duration:
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            dropped += 1
+        else:
+            request = build_request(rng, mix, payloads)
+            task = asyncio.create_task(send(client, request, start + offset, records, loop))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        offset += rng.exponential(1 / rate)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    return summarize(records, rate, duration, loop.time() - start, dropped)
+
+async def run_ramp(base_url, stages, mix, payloads, args):
+    """Run the ramp against one node, stopping after the first saturated stage unless --full-ramp"""
+    rng = np.random.default_rng(args.seed)
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    results, saturation = [], None
+    async with httpx.AsyncClient(
+        base_url=base_url, headers={"X-API-Key": args.api_key}, timeout=args.timeout, limits=limits
+    ) as client:
+        for rate, duration in stages:
+            stage = await run_stage(client, rate, duration, mix, payloads, rng, args.max_in_flight)
+            stage["saturated"] = is_saturated(stage, args.slo_p99_ms, args.max_failure_rate)
+            results.append(stage)
+            print_stage(stage)
+            if stage["saturated"] and saturation is None:
+                saturation = rate
+                if not args.full_ramp:
+                    break
+            await asyncio.sleep(args.cooldown)
+    sustained = [s for s in results if not s["saturated"]]
+    return {
+        "stages": results,
+        "saturation_rps": saturation,
+        "max_sustained_rps": max((s["offered_rps"] for s in sustained), default=None)
+    }
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_ready(base_url, process, timeout):
+    """Poll /ready until the node has loaded and warmed up its model"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode} during startup")
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Server at {base_url} not ready after {timeout}s")
+
+def env_value(value):
+    return value if isinstance(value, str) else json.dumps(value)
+
+@contextmanager
+def local_node(config, model_path, workdir, api_key, startup_timeout):
+    """A uvicorn server for one node configuration, stopped on exit"""
+    port = free_port()
+    env = dict(os.environ)
+    env.update({key: env_value(value) for key, value in {**BASE_NODE_ENV, **config.get("env", {})}.items()})
+    env.update({
+        "MODEL_PATH": model_path,
+        "MLFLOW_TRACKING_URI": f"file:{workdir}/mlruns",
+        "ONNX_MODEL_DIR": f"{workdir}/onnx",
+        "VALID_API_KEYS": api_key
+    })
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "apis.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(config.get("workers", 1)), "--log-level", "warning"
+        ],
+        cwd=BACKEND_DIR,
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(base_url, process, startup_timeout)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def standin_model(path):
+    """yolov8n with untrained weights, built from its config so nothing is downloaded"""
+    from ultralytics import YOLO
+    YOLO("yolov8n.yaml").save(str(path))
+    return str(path)
+
+def fmt(value, spec=".0f"):
+    return "-" if value is None else format(value, spec)
+
+def print_stage(stage):
+    print(
+        f"| {stage['offered_rps']:g} | {stage['completed_rps']:.2f} | {fmt(stage['p50_ms'])} | "
+        f"{fmt(stage['p95_ms'])} | {fmt(stage['p99_ms'])} | {stage['shed']} | "
+        f"{stage['errors']} | {stage['dropped']} | {'yes' if stage['saturated'] else 'no'} |",
+        flush=True
+    )
+
+def print_node_header(name, config):
+    print(f"\n## Node: {name}")
+    if config:
+        print(f"- **Workers:** {config.get('workers', 1)}")
+        print(f"- **Settings:** {json.dumps(config.get('env', {}))}")
+    print("| Offered (req/s) | Completed (req/s) | p50 (ms) | p95 (ms) | p99 (ms) | 503 | Errors | Dropped | Saturated |")
+    print("|---|---|---|---|---|---|---|---|---|")
+
+def print_summary(report):
+    print("\n## Saturation by node")
+    print("| Node | Max sustained (req/s) | p99 there (ms) | Saturated at (req/s) |")
+    print("|---|---|---|---|")
+    for name, node in report["nodes"].items():
+        if "error" in node:
+            print(f"| {name} | failed: {node['error']} | - | - |")
+            continue
+        sustained = next((s for s in node["stages"] if s["offered_rps"] == node["max_sustained_rps"]), None)
+        print(
+            f"| {name} | {fmt(node['max_sustained_rps'], 'g')} | {fmt(sustained and sustained['p99_ms'])} | "
+            f"{fmt(node['saturation_rps'], 'g')} |"
+        )
+
+def parse_stages(spec):
+    """"RATE:SECONDS,..." (e.g. "1:30,2:30,4:30"), or "ramp:START:STOP:FACTOR:SECONDS" for a geometric ramp"""
+    if spec.startswith("ramp:"):
+        start, stop, factor, duration = (float(v) for v in spec.split(":")[1:])
+        stages, rate = [], start
+        while rate <= stop:
+            stages.append((rate, duration))
+            rate *= factor
+        return stages
+    return [tuple(float(v) for v in stage.split(":")) for stage in spec.split(",")]
+
+def parse_args(argv, defaults):
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the detection routes")
+    parser.add_argument("--host", help="Target a running server instead of starting local nodes")
+    parser.add_argument("--nodes", type=lambda s: s.split(","), default=list(defaults["nodes"]), help="Node configurations to run")
+    parser.add_argument("--stages", type=parse_stages, default=defaults["stages"], help="RATE:SECONDS,... or ramp:START:STOP:FACTOR:SECONDS")
+    parser.add_argument("--full-ramp", action="store_true", help="Keep ramping past the saturation point")
+    parser.add_argument("--model", help="Weights for local nodes (default: untrained yolov8n stand-in)")
+    parser.add_argument("--model-version", default=None)
+    parser.add_argument("--api-key", default=os.environ.get("VALID_API_KEYS", "your-secret-api-key").split(",")[0])
+    parser.add_argument("--slo-p99-ms", type=float, default=defaults["slo_p99_ms"])
+    parser.add_argument("--max-failure-rate", type=float, default=defaults["max_failure_rate"])
+    parser.add_argument("--max-in-flight", type=int, default=defaults["max_in_flight"])
+    parser.add_argument("--timeout", type=float, default=defaults["timeout"])
+    parser.add_argument("--cooldown", type=float, default=defaults["cooldown"], help="Seconds between stages")
+    parser.add_argument("--startup-timeout", type=float, default=defaults["startup_timeout"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this path")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    # --- Configuration ---
+    REQUEST_MIX = {
+        "endpoints": {"v1-identify-part": 0.2, "v2-detect": 0.6, "v2-batch-detect": 0.2},
+        "image_sizes": {"640x480": 0.4, "1920x1080": 0.4, "4000x3000": 0.2},
+        "thresholds": [0.25, 0.5, 0.7],
+        "batch_images": (2, 4)
+    }
+    # Settings are passed to the server as environment variables; "workers" is uvicorn --workers
+    NODE_CONFIGS = {
+        "pytorch-batched": {"workers": 1, "env": {"INFERENCE_BACKEND": "ultralytics", "BATCHING_ENABLED": True}},
+        "pytorch-unbatched": {"workers": 1, "env": {"INFERENCE_BACKEND": "ultralytics", "BATCHING_ENABLED": False}},
+        "onnx-batched": {"workers": 1, "env": {"INFERENCE_BACKEND": "onnx", "BATCHING_ENABLED": True}},
+        "onnx-decode-pool": {"workers": 1, "env": {"INFERENCE_BACKEND": "onnx", "DECODE_PROCESS_WORKERS": 2}},
+        "onnx-2-workers": {"workers": 2, "env": {"INFERENCE_BACKEND": "onnx", "ONNX_INTRA_OP_THREADS": 2}}
+    }
+    DEFAULTS = {
+        "nodes": NODE_CONFIGS,
+        "stages": parse_stages("ramp:1:32:2:30"),
+        "slo_p99_ms": 2000.0,
+        "max_failure_rate": 0.01,
+        "max_in_flight": 256,
+        "timeout": 30.0,
+        "cooldown": 5.0,
+        "startup_timeout": 300.0
+    }
+    # --- End Configuration ---
+
+    args = parse_args(sys.argv[1:], DEFAULTS)
+    unknown = set(args.nodes) - set(NODE_CONFIGS)
+    if unknown and not args.host:
+        sys.exit(f"Unknown node configurations: {', '.join(sorted(unknown))}")
+    REQUEST_MIX["model_version"] = args.model_version
+    payloads = make_payloads(REQUEST_MIX["image_sizes"])
+
+    print("# Detection Load Test")
+    print("---")
+    print(f"- **Stages:** {', '.join(f'{rate:g} req/s x {duration:g}s' for rate, duration in args.stages)}")
+    print(f"- **SLO:** p99 <= {args.slo_p99_ms:g} ms, failures <= {args.max_failure_rate:.0%}")
+    print(f"- **Mix:** {json.dumps({k: v for k, v in REQUEST_MIX.items() if k != 'model_version'})}")
+
+    report = {"mix": REQUEST_MIX, "stages": args.stages, "slo_p99_ms": args.slo_p99_ms, "nodes": {}}
+    if args.host:
+        print_node_header(args.host, None)
+        report["nodes"][args.host] = asyncio.run(run_ramp(args.host, args.stages, REQUEST_MIX, payloads, args))
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            model_path = args.model or standin_model(Path(workdir) / "standin_yolov8n.pt")
+            for name in args.nodes:
+                config = NODE_CONFIGS[name]
+                print_node_header(name, config)
+                try:
+                    with local_node(config, model_path, workdir, args.api_key, args.startup_timeout) as base_url:
+                        result = asyncio.run(run_ramp(base_url, args.stages, REQUEST_MIX, payloads, args))
+                except (RuntimeError, TimeoutError) as e:
+                    print(f"- **Failed:** {e}")
+                    result = {"error": str(e)}
+                report["nodes"][name] = {"config": config, **result}
+
+    print_summary(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.output}")
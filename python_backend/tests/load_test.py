@@ -1,37 +1,63 @@
 #!/usr/bin/env python3
 """
 Load testing script using Locust
-Run with: locust -f load_test.py --host=http://localhost:8000
+Run from python_backend with: locust -f tests/load_test.py --host=http://localhost:8000
+
+Locust users are closed-loop (each waits for its response before the next request),
+which is handy for interactive exploration; use load_generator.py for open-loop
+arrival rates, ramp schedules and saturation points per node configuration.
 """
 
-from locust import HttpUser, task, between
+import os
 import random
-import json
+import sys
+from pathlib import Path
+
+from locust import HttpUser, task, between
+
+# load_generator sits next to this file, which is not on sys.path when locust runs from python_backend
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from load_generator import ENDPOINTS, make_image_bytes  # noqa: E402
+
+API_KEY = os.environ.get("VALID_API_KEYS", "your-secret-api-key").split(",")[0]
+IMAGE_SIZES = [(640, 480), (1920, 1080), (4000, 3000)]
+THRESHOLDS = [0.25, 0.5, 0.7]
+IMAGES = [make_image_bytes(width, height, seed) for seed, (width, height) in enumerate(IMAGE_SIZES)]
 
 class AlmonaAPIUser(HttpUser):
-    """Load test user for Almona API"""
-    
+    """Load test user for the Almona detection API"""
+
     wait_time = between(1, 3)
-    
-    @task(3)
+
+    def _image(self, name="image"):
+        return (name, (f"{name}.jpg", random.choice(IMAGES), "image/jpeg"))
+
+    def _params(self):
+        return {"confidence_threshold": random.choice(THRESHOLDS)}
+
+    @task(1)
     def health_check(self):
-        self.client.get("/health")
-    
+        self.client.get("/api/v2/part-detection/health")
+
     @task(2)
-    def get_products(self):
-        self.client.get("/api/products")
-    
-    @task(1)
-    def post_contact(self):
-        payload = {
-            "name": "Test User",
-            "email": "testuser@example.com",
-            "message": "This is a load test message."
-        }
-        self.client.post("/api/contact", json=payload)
-    
-    @task(1)
-    def search(self):
-        queries = ["machine", "fabrication", "cutting", "welding"]
-        query = random.choice(queries)
-        self.client.get(f"/api/search?q={query}")
+    def identify_part_v1(self):
+        self.client.post(ENDPOINTS["v1-identify-part"], params=self._params(), files=[self._image()])
+
+    @task(6)
+    def detect_v2(self):
+        self.client.post(
+            ENDPOINTS["v2-detect"],
+            params=self._params(),
+            files=[self._image()],
+            headers={"X-API-Key": API_KEY}
+        )
+
+    @task(2)
+    def batch_detect_v2(self):
+        self.client.post(
+            ENDPOINTS["v2-batch-detect"],
+            params=self._params(),
+            files=[self._image("images") for _ in range(random.randint(2, 4))],
+            headers={"X-API-Key": API_KEY}
+        )
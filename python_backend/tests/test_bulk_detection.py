@@ -0,0 +1,193 @@
+"""Tests for bulk archive and directory detection."""
+
+import io
+import json
+import tarfile
+import zipfile
+import cv2
+import numpy as np
+import pytest
+from core.config import settings
+from ai_services.part_detection.bulk import BulkDetectionPipeline, iter_images, open_writer
+from ai_services.preprocessing.ingest import UploadTooLarge
+
+def encode(width=64, height=48):
+    return cv2.imencode(".jpg", np.full((height, width, 3), 120, dtype=np.uint8))[1].tobytes()
+
+class FakeDetector:
+    """Records batch sizes; echoes the original image sizes like PartDetector."""
+
+    def __init__(self, fail_on=None):
+        self.batch_sizes = []
+        self.fail_on = fail_on
+
+    def detect_frames_sync(self, images, confidence_thresholds, include_columnar=False, original_shapes=None):
+        self.batch_sizes.append(len(images))
+        if self.fail_on is not None and len(self.batch_sizes) == self.fail_on:
+            raise RuntimeError("inference failed")
+        return [
+            {
+                "detections": [{"bbox": [1.0, 2.0, 3.0, 4.0], "confidence": 0.9, "class_id": 0, "class_name": "motor", "center": [2.0, 3.0]}],
+                "image_info": {"width": shape[1], "height": shape[0], "channels": 3}
+            }
+            for shape in original_shapes
+        ]
+
+class ListWriter:
+    def __init__(self):
+        self.records = []
+
+    def write(self, records):
+        self.records.extend(records)
+
+@pytest.fixture
+def image_dir(tmp_path):
+    root = tmp_path / "machines"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.jpg").write_bytes(encode())
+    (root / "sub" / "b.jpg").write_bytes(encode(80, 60))
+    (root / "notes.txt").write_text("not an image")
+    return root
+
+class TestSources:
+    """Test cases for reading directories and archives"""
+
+    def test_directory_is_walked_recursively(self, image_dir):
+        names = [name for name, _ in iter_images(str(image_dir))]
+        assert names == ["a.jpg", "sub/b.jpg"]
+
+    def test_zip_archive(self, tmp_path):
+        path = tmp_path / "images.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("x/one.jpg", encode())
+            archive.writestr("readme.md", "skip me")
+            archive.writestr("two.png", encode())
+
+        entries = list(iter_images(str(path)))
+
+        assert [name for name, _ in entries] == ["x/one.jpg", "two.png"]
+        assert entries[0][1] == encode()
+
+    def test_compressed_tar_is_streamed(self, tmp_path):
+        path = tmp_path / "images.tar.gz"
+        with tarfile.open(path, "w:gz") as archive:
+            for name in ("one.jpg", "two.jpg"):
+                data = encode()
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+
+        assert [name for name, _ in iter_images(str(path))] == ["one.jpg", "two.jpg"]
+
+    def test_oversized_entry_is_reported(self, tmp_path):
+        path = tmp_path / "images.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("big.jpg", b"x" * 2048)
+
+        (_, data), = iter_images(str(path), max_bytes=1024)
+
+        assert isinstance(data, UploadTooLarge)
+
+    def test_unsupported_source(self, tmp_path):
+        path = tmp_path / "images.txt"
+        path.write_text("nope")
+        with pytest.raises(ValueError):
+            list(iter_images(str(path)))
+
+class TestBulkDetectionPipeline:
+    """Test cases for the bounded decode -> detect -> write pipeline"""
+
+    def test_results_for_every_image_in_order(self, monkeypatch):
+        monkeypatch.setattr(settings, "REDUCED_DECODE_ENABLED", False)
+        detector = FakeDetector()
+        writer = ListWriter()
+        entries = [(f"{i}.jpg", encode(64 + i, 48)) for i in range(10)]
+
+        summary = BulkDetectionPipeline(detector, batch_size=4, decode_workers=3, queue_size=4).run(entries, writer)
+
+        assert summary == {"processed": 10, "failed": 0, "detections": 10}
+        assert detector.batch_sizes == [4, 4, 2]
+        assert [record["file"] for record in writer.records] == [name for name, _ in entries]
+        assert writer.records[9]["width"] == 73
+
+    def test_bad_entries_fail_individually(self):
+        writer = ListWriter()
+        entries = [("ok.jpg", encode()), ("bad.jpg", b"not a jpeg"), ("empty.jpg", b""), ("big.jpg", UploadTooLarge(10))]
+
+        summary = BulkDetectionPipeline(FakeDetector(), batch_size=4).run(entries, writer)
+
+        assert summary["processed"] == 1 and summary["failed"] == 3
+        errors = {record["file"]: record["error"] for record in writer.records}
+        assert errors["ok.jpg"] is None
+        assert errors["bad.jpg"] == errors["empty.jpg"] == "Could not decode image"
+        assert errors["big.jpg"] == "Upload exceeds the 10 byte limit"
+
+    def test_failed_batch_is_recorded_and_pipeline_continues(self):
+        writer = ListWriter()
+        entries = [(f"{i}.jpg", encode()) for i in range(4)]
+
+        summary = BulkDetectionPipeline(FakeDetector(fail_on=1), batch_size=2).run(entries, writer)
+
+        assert summary["processed"] == 2 and summary["failed"] == 2
+        assert [record["error"] for record in writer.records[:2]] == ["inference failed"] * 2
+
+    def test_reader_is_bounded_by_queue(self):
+        consumed = []
+
+        def entries():
+            for i in range(200):
+                consumed.append(i)
+                yield f"{i}.jpg", encode()
+
+        class SlowDetector(FakeDetector):
+            def detect_frames_sync(self, images, *args, **kwargs):
+                # The reader may only be a bounded distance ahead of inference
+                self.lead = max(getattr(self, "lead", 0), len(consumed) - sum(self.batch_sizes))
+                return super().detect_frames_sync(images, *args, **kwargs)
+
+        detector = SlowDetector()
+        BulkDetectionPipeline(detector, batch_size=4, decode_workers=2, queue_size=8).run(entries(), ListWriter())
+
+        assert sum(detector.batch_sizes) == 200
+        assert detector.lead <= 8 + 4 + 2
+
+    def test_source_errors_propagate(self):
+        def entries():
+            yield "ok.jpg", encode()
+            raise OSError("truncated archive")
+
+        with pytest.raises(OSError, match="truncated archive"):
+            BulkDetectionPipeline(FakeDetector()).run(entries(), ListWriter())
+
+    def test_progress_callback(self):
+        updates = []
+        entries = [(f"{i}.jpg", encode()) for i in range(5)]
+
+        BulkDetectionPipeline(FakeDetector(), batch_size=2).run(entries, ListWriter(), on_progress=updates.append)
+
+        assert [update["processed"] for update in updates] == [2, 4, 5]
+
+class TestWriters:
+    """Test cases for incremental result writers"""
+
+    def test_jsonl_and_parquet_round_trip(self, image_dir, tmp_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+        for output_format in ("jsonl", "parquet"):
+            path = tmp_path / f"out.{output_format}"
+            writer = open_writer(str(path), output_format)
+            try:
+                BulkDetectionPipeline(FakeDetector(), batch_size=1).run(iter_images(str(image_dir)), writer)
+            finally:
+                writer.close()
+
+            if output_format == "jsonl":
+                rows = [json.loads(line) for line in path.read_text().splitlines()]
+            else:
+                rows = pq.read_table(path).to_pylist()
+            assert [row["file"] for row in rows] == ["a.jpg", "sub/b.jpg"]
+            assert rows[1]["width"] == 80
+            assert rows[0]["detections"][0]["class_name"] == "motor"
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            open_writer(str(tmp_path / "out.csv"), "csv")
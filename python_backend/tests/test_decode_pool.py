@@ -0,0 +1,70 @@
+"""Tests for the process-pool decode/preprocess stage."""
+
+import cv2
+import numpy as np
+import pytest
+from core.config import settings
+from ai_services.part_detection import decode_pool as decode_pool_module
+from ai_services.part_detection.decode_pool import DecodeProcessPool, decode_and_preprocess, get_decode_pool
+from ai_services.part_detection.frame_store import SPOOL_TRANSPORT, SharedFrameStore
+
+def encode(width=160, height=120):
+    image = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    return cv2.imencode(".png", image)[1].tobytes()
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    spool_dir = str(tmp_path_factory.mktemp("frames"))
+    store = SharedFrameStore(transport=SPOOL_TRANSPORT, spool_dir=spool_dir, ttl_seconds=60, prefix="pdtestpool")
+    yield store
+    store.ttl_seconds = -1
+    store.sweep()
+
+@pytest.fixture(scope="module")
+def pool(store):
+    pool = DecodeProcessPool(2, steps=["sharpen"], store=store)
+    yield pool
+    pool.close()
+
+class TestDecodeProcessPool:
+    """Test cases for decoding in worker processes"""
+
+    def test_matches_in_process_decode(self, pool, store):
+        data = encode()
+
+        image, shape = pool.decode_sync(data)
+
+        expected, expected_shape = decode_and_preprocess(data, steps=["sharpen"])
+        np.testing.assert_array_equal(image, expected)
+        assert shape == expected_shape == (120, 160, 3)
+        assert len(store) == 0
+
+    @pytest.mark.asyncio
+    async def test_async_decode_accepts_memoryview(self, pool):
+        image, _ = await pool.decode(memoryview(encode(64, 32)))
+        assert image.shape == (32, 64, 3)
+
+    def test_decode_errors_are_raised_in_caller(self, pool):
+        with pytest.raises(ValueError, match="Could not decode image"):
+            pool.decode_sync(b"not an image")
+
+    def test_rejects_geometry_changing_steps(self, store):
+        with pytest.raises(ValueError, match="resize"):
+            DecodeProcessPool(1, steps=["resize"], store=store)
+
+    def test_disabled_by_default(self, monkeypatch):
+        monkeypatch.setattr(settings, "DECODE_PROCESS_WORKERS", 0)
+        monkeypatch.setattr(decode_pool_module, "_pool", None)
+        assert get_decode_pool() is None
+
+    def test_bulk_pipeline_decodes_in_pool(self, pool):
+        from ai_services.part_detection.bulk import BulkDetectionPipeline
+        from tests.test_bulk_detection import FakeDetector, ListWriter
+
+        writer = ListWriter()
+        summary = BulkDetectionPipeline(FakeDetector(), batch_size=2, decode_pool=pool).run(
+            [(f"{i}.png", encode()) for i in range(3)], writer
+        )
+
+        assert summary["processed"] == 3
+        assert writer.records[0]["width"] == 160
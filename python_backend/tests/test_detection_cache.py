@@ -0,0 +1,94 @@
+"""Tests for the content-addressed detection result cache."""
+
+import json
+import time
+import pytest
+from ai_services.part_detection.cache import DetectionCache, LRUCache
+
+class FakeRedis:
+    """Minimal async Redis stand-in storing string values."""
+
+    def __init__(self, fail=False):
+        self.store = {}
+        self.fail = fail
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis down")
+        return self.store.get(key)
+
+    async def setex(self, key, ttl, value):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.store[key] = value
+
+RESULT = {"detections": [{"bbox": [1.0, 2.0, 3.0, 4.0], "confidence": 0.9}], "image_info": {"width": 4}}
+
+class TestLRUCache:
+    """Test cases for the in-process LRU tier"""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_ttl_expiry(self):
+        cache = LRUCache(max_entries=2, ttl_seconds=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+class TestDetectionCache:
+    """Test cases for DetectionCache"""
+
+    def test_key_depends_on_bytes_version_and_threshold(self):
+        digest = DetectionCache.image_digest(b"image-bytes")
+        key = DetectionCache.make_key(digest, "1", 0.7)
+
+        assert key == DetectionCache.make_key(DetectionCache.image_digest(b"image-bytes"), "1", 0.7)
+        assert key != DetectionCache.make_key(DetectionCache.image_digest(b"other-bytes"), "1", 0.7)
+        assert key != DetectionCache.make_key(digest, "2", 0.7)
+        assert key != DetectionCache.make_key(digest, "1", 0.5)
+        assert DetectionCache.make_key(digest, None, 0.7).endswith(":default:0.7000")
+
+    @pytest.mark.asyncio
+    async def test_local_hit_and_miss_counters(self):
+        cache = DetectionCache(max_entries=4)
+        assert await cache.get("k") is None
+        await cache.set("k", RESULT)
+        assert await cache.get("k") == RESULT
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["local_hits"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_redis_hit_is_promoted_to_local(self):
+        redis = FakeRedis()
+        writer = DetectionCache(max_entries=4, redis_client=redis)
+        await writer.set("k", RESULT)
+        assert json.loads(redis.store["part-detection:result:k"]) == RESULT
+
+        reader = DetectionCache(max_entries=4, redis_client=redis)
+        assert await reader.get("k") == RESULT
+        assert await reader.get("k") == RESULT
+        assert reader.stats()["redis_hits"] == 1
+        assert reader.stats()["local_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_degrade_to_miss(self):
+        cache = DetectionCache(max_entries=4, redis_client=FakeRedis(fail=True))
+        await cache.set("k", RESULT)
+        cache.clear()
+
+        assert await cache.get("k") is None
+        assert cache.stats()["redis_errors"] == 2
@@ -0,0 +1,364 @@
+"""Tests for the asynchronous detection job routes."""
+
+import io
+import json
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from core.config import settings
+from apis.v2 import detection_jobs
+
+HEADERS = {"x-api-key": "test-key"}
+
+class FakeTask:
+    """Stand-in for a Celery task that records apply_async calls."""
+
+    def __init__(self):
+        self.calls = []
+
+    def apply_async(self, kwargs=None, task_id=None):
+        self.calls.append({"kwargs": kwargs, "task_id": task_id})
+        return FakeAsyncResult(task_id or f"job-{len(self.calls)}")
+
+class FakeAsyncResult:
+    """Stand-in for celery.result.AsyncResult."""
+
+    def __init__(self, job_id, state="PENDING", result=None, info=None):
+        self.id = job_id
+        self.state = state
+        self.result = result
+        self.info = info
+
+class FakeCeleryApp:
+    """Serves canned AsyncResults by job id."""
+
+    def __init__(self):
+        self.results = {}
+
+    def AsyncResult(self, job_id):
+        return self.results.get(job_id, FakeAsyncResult(job_id))
+
+def jpeg_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "white").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+@pytest.fixture
+def tasks(monkeypatch, tmp_path):
+    tasks = {"single": FakeTask(), "batch": FakeTask(), "archive": FakeTask()}
+    monkeypatch.setattr(detection_jobs, "detect_parts", tasks["single"])
+    monkeypatch.setattr(detection_jobs, "detect_parts_batch", tasks["batch"])
+    monkeypatch.setattr(detection_jobs, "detect_archive", tasks["archive"])
+    monkeypatch.setattr(settings, "VALID_API_KEYS", "test-key")
+    monkeypatch.setattr(settings, "JOB_INPUT_TRANSPORT", "file")
+    monkeypatch.setattr(settings, "JOB_UPLOAD_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(settings, "BULK_OUTPUT_DIR", str(tmp_path / "bulk"))
+    return tasks
+
+@pytest.fixture
+def celery(monkeypatch):
+    celery = FakeCeleryApp()
+    monkeypatch.setattr(detection_jobs, "celery_app", celery)
+    return celery
+
+@pytest.fixture
+def client(tasks, celery):
+    app = FastAPI()
+    app.include_router(detection_jobs.router, prefix="/jobs")
+    return TestClient(app)
+
+def submit(client, path="/jobs", files=None, **params):
+    files = files or {"image": ("part.jpg", jpeg_bytes(), "image/jpeg")}
+    return client.post(path, params=params, files=files, headers=HEADERS)
+
+class TestSubmitJob:
+    """Test cases for queueing single-image jobs"""
+
+    def test_accepted_job_is_queued(self, client, tasks):
+        response = submit(client, confidence_threshold=0.5)
+
+        assert response.status_code == 202
+        data = response.json()["data"]
+        assert data["job_id"] == "job-1"
+        assert data["events_url"].endswith("/jobs/job-1/events")
+        kwargs = tasks["single"].calls[0]["kwargs"]
+        assert kwargs["confidence_threshold"] == 0.5
+        assert kwargs["cleanup"] is True
+        assert os.path.isfile(kwargs["image_path"])
+
+    def test_batch_flag_routes_to_batching_task(self, client, tasks):
+        assert submit(client, batch=True).status_code == 202
+        assert len(tasks["batch"].calls) == 1
+        assert tasks["single"].calls == []
+
+    def test_non_image_is_rejected(self, client, tasks):
+        response = submit(client, files={"image": ("notes.txt", b"hello", "text/plain")})
+
+        assert response.status_code == 400
+        assert tasks["single"].calls == []
+
+    def test_oversized_upload_is_rejected(self, client, tasks, monkeypatch):
+        monkeypatch.setattr(settings, "MAX_UPLOAD_BYTES", 16)
+
+        response = submit(client)
+
+        assert response.status_code == 413
+        assert tasks["single"].calls == []
+        assert not os.path.isdir(settings.JOB_UPLOAD_DIR) or os.listdir(settings.JOB_UPLOAD_DIR) == []
+
+    def test_invalid_api_key_is_rejected(self, client, tasks):
+        response = client.post(
+            "/jobs",
+            files={"image": ("part.jpg", jpeg_bytes(), "image/jpeg")},
+            headers={"x-api-key": "wrong-key"}
+        )
+        assert response.status_code == 401
+        assert tasks["single"].calls == []
+
+class TestSubmitBulkJobs:
+    """Test cases for queueing one job per uploaded image"""
+
+    def test_every_image_gets_a_job(self, client, tasks):
+        files = [("images", (f"part{i}.jpg", jpeg_bytes(), "image/jpeg")) for i in range(3)]
+
+        response = submit(client, "/jobs/bulk", files)
+
+        assert response.status_code == 202
+        body = response.json()
+        assert body["submitted_count"] == 3
+        assert [job["filename"] for job in body["data"]] == ["part0.jpg", "part1.jpg", "part2.jpg"]
+        assert len(tasks["batch"].calls) == 3
+
+    def test_invalid_files_are_reported_per_file(self, client, tasks):
+        files = [
+            ("images", ("part.jpg", jpeg_bytes(), "image/jpeg")),
+            ("images", ("notes.txt", b"hello", "text/plain"))
+        ]
+
+        response = submit(client, "/jobs/bulk", files)
+
+        assert response.status_code == 202
+        body = response.json()
+        assert body["success"] is False
+        assert body["submitted_count"] == 1
+        assert body["errors"][0]["filename"] == "notes.txt"
+
+    def test_too_many_files_are_rejected(self, client, tasks, monkeypatch):
+        monkeypatch.setattr(settings, "JOB_BULK_MAX_FILES", 2)
+        files = [("images", (f"part{i}.jpg", jpeg_bytes(), "image/jpeg")) for i in range(3)]
+
+        assert submit(client, "/jobs/bulk", files).status_code == 400
+        assert tasks["batch"].calls == []
+
+class TestJobStatus:
+    """Test cases for polling job state"""
+
+    def test_pending_job(self, client):
+        response = client.get("/jobs/abc", headers=HEADERS)
+
+        assert response.status_code == 200
+        assert response.json()["data"] == {"job_id": "abc", "state": "PENDING"}
+
+    def test_progress_is_reported(self, client, celery):
+        celery.results["abc"] = FakeAsyncResult("abc", "PROCESSING", info={"status": "Running inference..."})
+
+        data = client.get("/jobs/abc", headers=HEADERS).json()["data"]
+
+        assert data["progress"] == {"status": "Running inference..."}
+
+    def test_finished_job_includes_result(self, client, celery):
+        celery.results["abc"] = FakeAsyncResult("abc", "SUCCESS", result={"detections": []})
+        celery.results["bad"] = FakeAsyncResult("bad", "FAILURE", result=ValueError("broken image"))
+
+        assert client.get("/jobs/abc", headers=HEADERS).json()["data"]["result"] == {"detections": []}
+        assert client.get("/jobs/bad", headers=HEADERS).json()["data"]["error"] == "broken image"
+
+def sse_events(body):
+    """(event, data) pairs of a text/event-stream body, skipping comments"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith(":"))
+        if lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+class TestJobEvents:
+    """Test cases for the Server-Sent Events progress stream"""
+
+    def test_stream_ends_with_terminal_event(self, client, monkeypatch):
+        async def progress_events(job_id, keepalive_seconds=15.0):
+            yield {"task_id": job_id, "state": "PROCESSING", "status": "Running inference..."}
+            yield {"task_id": job_id, "state": "SUCCESS", "status": "completed"}
+
+        monkeypatch.setattr(detection_jobs, "progress_events", progress_events)
+
+        response = client.get("/jobs/abc/events", headers=HEADERS)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert [event for event, _ in sse_events(response.text)] == ["processing", "success"]
+
+    def test_keepalive_notices_finished_job(self, client, celery, monkeypatch):
+        async def progress_events(job_id, keepalive_seconds=15.0):
+            yield None
+            yield None
+
+        monkeypatch.setattr(detection_jobs, "progress_events", progress_events)
+        celery.results["abc"] = FakeAsyncResult("abc", "FAILURE", result=RuntimeError("worker lost"))
+
+        events = sse_events(client.get("/jobs/abc/events", headers=HEADERS).text)
+
+        assert events == [("failure", {"job_id": "abc", "state": "FAILURE", "error": "worker lost"})]
+
+    def test_unknown_job_stream_times_out(self, client, monkeypatch):
+        """Celery reports unknown ids as PENDING forever; the stream ends instead of keeping alive"""
+        closed = []
+
+        async def progress_events(job_id, keepalive_seconds=15.0):
+            try:
+                while True:
+                    yield None
+            finally:
+                closed.append(job_id)
+
+        monkeypatch.setattr(detection_jobs, "progress_events", progress_events)
+        monkeypatch.setattr(settings, "JOB_EVENTS_IDLE_TIMEOUT_SECONDS", 0.0)
+
+        events = sse_events(client.get("/jobs/no-such-job/events", headers=HEADERS).text)
+
+        assert events == [("timeout", {"job_id": "no-such-job", "state": "PENDING"})]
+        assert closed == ["no-such-job"]
+
+    def test_progress_resets_the_idle_timeout(self, client, monkeypatch):
+        async def progress_events(job_id, keepalive_seconds=15.0):
+            yield None
+            yield {"job_id": job_id, "state": "PROCESSING", "status": "Running batched inference (2 images)..."}
+            yield None
+            yield {"job_id": job_id, "state": "SUCCESS", "status": "completed"}
+
+        monkeypatch.setattr(detection_jobs, "progress_events", progress_events)
+        monkeypatch.setattr(settings, "JOB_EVENTS_IDLE_TIMEOUT_SECONDS", 60.0)
+
+        response = client.get("/jobs/abc/events", headers=HEADERS)
+
+        assert [event for event, _ in sse_events(response.text)] == ["processing", "success"]
+        assert response.text.count(": keep-alive") == 2
+
+    def test_stream_errors_become_an_error_event(self, client, monkeypatch):
+        async def progress_events(job_id, keepalive_seconds=15.0):
+            raise ConnectionError("redis unavailable")
+            yield
+
+        monkeypatch.setattr(detection_jobs, "progress_events", progress_events)
+
+        events = sse_events(client.get("/jobs/abc/events", headers=HEADERS).text)
+
+        assert events == [("error", {"job_id": "abc", "error": "redis unavailable"})]
+
+@pytest.fixture
+def bulk_roots(monkeypatch, tmp_path):
+    allowed = tmp_path / "catalog"
+    (allowed / "spring").mkdir(parents=True)
+    outside = tmp_path / "private"
+    outside.mkdir()
+    monkeypatch.setattr(settings, "BULK_ALLOWED_DIRECTORIES", [str(allowed)])
+    return allowed, outside
+
+def submit_directory(client, directory):
+    return client.post("/jobs/archive", data={"directory": directory}, headers=HEADERS)
+
+class TestArchiveJob:
+    """Test cases for archive and server-side directory jobs"""
+
+    def test_allowed_directory_is_queued(self, client, tasks, bulk_roots):
+        allowed, _ = bulk_roots
+
+        response = submit_directory(client, str(allowed / "spring"))
+
+        assert response.status_code == 202
+        call = tasks["archive"].calls[0]
+        assert call["kwargs"]["source"] == os.path.realpath(allowed / "spring")
+        assert call["kwargs"]["cleanup"] is False
+        assert call["task_id"] == response.json()["data"]["job_id"]
+
+    def test_directory_outside_allowed_roots_is_forbidden(self, client, tasks, bulk_roots):
+        _, outside = bulk_roots
+        assert submit_directory(client, str(outside)).status_code == 403
+        assert tasks["archive"].calls == []
+
+    def test_dotdot_escape_is_forbidden(self, client, tasks, bulk_roots):
+        allowed, _ = bulk_roots
+        assert submit_directory(client, f"{allowed}/spring/../../private").status_code == 403
+        assert tasks["archive"].calls == []
+
+    def test_sibling_with_shared_prefix_is_forbidden(self, client, tasks, bulk_roots, tmp_path):
+        (tmp_path / "catalog-secrets").mkdir()
+        assert submit_directory(client, str(tmp_path / "catalog-secrets")).status_code == 403
+
+    def test_symlink_escape_is_forbidden(self, client, tasks, bulk_roots):
+        allowed, outside = bulk_roots
+        os.symlink(outside, allowed / "link")
+
+        assert submit_directory(client, str(allowed / "link")).status_code == 403
+        assert tasks["archive"].calls == []
+
+    def test_missing_directory_is_rejected(self, client, tasks, bulk_roots):
+        allowed, _ = bulk_roots
+        assert submit_directory(client, str(allowed / "missing")).status_code == 400
+
+    def test_archive_or_directory_required(self, client, tasks, bulk_roots):
+        assert client.post("/jobs/archive", headers=HEADERS).status_code == 400
+
+    def test_unsupported_archive_suffix_is_rejected(self, client, tasks):
+        response = client.post(
+            "/jobs/archive",
+            files={"archive": ("parts.rar", b"Rar!", "application/octet-stream")},
+            headers=HEADERS
+        )
+        assert response.status_code == 400
+
+    def test_oversized_archive_is_rejected(self, client, tasks, monkeypatch):
+        monkeypatch.setattr(settings, "BULK_MAX_ARCHIVE_BYTES", 4)
+
+        response = client.post(
+            "/jobs/archive",
+            files={"archive": ("parts.zip", b"PK\x03\x04 too long", "application/zip")},
+            headers=HEADERS
+        )
+
+        assert response.status_code == 413
+        assert os.listdir(settings.JOB_UPLOAD_DIR) == []
+
+class TestJobResults:
+    """Test cases for downloading archive job output"""
+
+    def test_unfinished_job_conflicts(self, client, celery):
+        celery.results["abc"] = FakeAsyncResult("abc", "PROCESSING")
+        assert client.get("/jobs/abc/results", headers=HEADERS).status_code == 409
+
+    def test_missing_result_file(self, client, celery, tmp_path):
+        celery.results["abc"] = FakeAsyncResult("abc", "SUCCESS", result={
+            "output_path": str(tmp_path / "gone.jsonl"),
+            "output_format": "jsonl"
+        })
+        assert client.get("/jobs/abc/results", headers=HEADERS).status_code == 404
+
+    def test_job_without_output_path(self, client, celery):
+        celery.results["abc"] = FakeAsyncResult("abc", "SUCCESS", result={"detections": []})
+        assert client.get("/jobs/abc/results", headers=HEADERS).status_code == 404
+
+    def test_result_file_is_downloaded(self, client, celery, tmp_path):
+        output = tmp_path / "abc.jsonl"
+        output.write_text('{"path": "a.jpg"}\n')
+        celery.results["abc"] = FakeAsyncResult("abc", "SUCCESS", result={
+            "output_path": str(output),
+            "output_format": "jsonl"
+        })
+
+        response = client.get("/jobs/abc/results", headers=HEADERS)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert response.text == '{"path": "a.jpg"}\n'
@@ -0,0 +1,133 @@
+"""Tests for detection job progress publishing and streaming."""
+
+import asyncio
+import json
+import pytest
+from ai_services.part_detection.progress import (
+    ProgressPublisher,
+    last_event_key,
+    progress_channel,
+    progress_events,
+)
+
+class FakePubSub:
+    """In-memory stand-in for redis.asyncio PubSub."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = asyncio.Queue()
+        self.channels = set()
+        self.closed = False
+
+    async def subscribe(self, channel):
+        self.channels.add(channel)
+        self.redis.subscribers.append(self)
+
+    async def unsubscribe(self, channel):
+        self.channels.discard(channel)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        self.closed = True
+
+class FakeRedis:
+    """Minimal redis client used by both the publisher (sync) and the stream (async)."""
+
+    def __init__(self):
+        self.values = {}
+        self.subscribers = []
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    # Sync pipeline interface used by ProgressPublisher
+    def pipeline(self):
+        return self
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def publish(self, channel, payload):
+        for subscriber in self.subscribers:
+            if channel in subscriber.channels:
+                subscriber.queue.put_nowait({"type": "message", "data": payload})
+
+    def execute(self):
+        pass
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+@pytest.fixture
+def publisher(redis):
+    publisher = ProgressPublisher("redis://unused")
+    publisher._client = redis
+    return publisher
+
+async def collect(stream):
+    return [event async for event in stream]
+
+class TestProgressPublisher:
+    """Test cases for worker-side progress publishing"""
+
+    def test_event_is_stored_for_late_subscribers(self, redis, publisher):
+        publisher.publish("job-1", "PROCESSING", status="Running inference...")
+
+        stored = json.loads(redis.values[last_event_key("job-1")])
+        assert stored["state"] == "PROCESSING"
+        assert stored["status"] == "Running inference..."
+
+    def test_redis_errors_do_not_fail_the_task(self):
+        class BrokenRedis:
+            def pipeline(self):
+                raise ConnectionError("redis down")
+
+        publisher = ProgressPublisher("redis://unused")
+        publisher._client = BrokenRedis()
+
+        assert publisher.publish("job-1", "SUCCESS")["state"] == "SUCCESS"
+
+class TestProgressEvents:
+    """Test cases for the SSE progress stream"""
+
+    @pytest.mark.asyncio
+    async def test_streams_until_terminal_state(self, redis, publisher):
+        stream = asyncio.ensure_future(collect(progress_events("job-1", redis_client=redis, keepalive_seconds=1)))
+        while not redis.subscribers:
+            await asyncio.sleep(0)
+
+        publisher.publish("job-1", "PROCESSING", status="Preprocessing image...")
+        publisher.publish("job-2", "PROCESSING", status="other job")
+        publisher.publish("job-1", "SUCCESS", result={"detections": []})
+        events = await asyncio.wait_for(stream, 5)
+
+        assert [event["state"] for event in events] == ["PROCESSING", "SUCCESS"]
+        assert redis.subscribers[0].closed
+
+    @pytest.mark.asyncio
+    async def test_late_subscriber_starts_from_last_event(self, redis, publisher):
+        publisher.publish("job-1", "PROCESSING", status="Running inference...")
+        publisher.publish("job-1", "FAILURE", error="boom")
+
+        events = await collect(progress_events("job-1", redis_client=redis))
+
+        assert [event["state"] for event in events] == ["FAILURE"]
+
+    @pytest.mark.asyncio
+    async def test_keepalive_when_idle(self, redis):
+        stream = progress_events("job-1", redis_client=redis, keepalive_seconds=0.01)
+
+        assert await stream.__anext__() is None
+        await stream.aclose()
+
+        assert redis.subscribers[0].closed
+        assert progress_channel("job-1") not in redis.subscribers[0].channels
@@ -0,0 +1,215 @@
+"""Tests for the process-wide PartDetector registry."""
+
+import threading
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from core.config import settings
+from ai_services.part_detection import registry as registry_module
+from ai_services.part_detection.registry import DetectorRegistry, UnknownModelVersion, resolve_model_version
+from apis.v1 import part_detection as part_detection_v1
+from apis.v2 import part_detection_fastapi
+
+class FakeDetector:
+    """Stand-in for PartDetector that records its lifecycle."""
+
+    def __init__(self, version):
+        self.version = version
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class TestDetectorRegistry:
+    """Test cases for DetectorRegistry"""
+
+    def setup_method(self):
+        self.created = []
+
+    def factory(self, version):
+        detector = FakeDetector(version)
+        self.created.append(detector)
+        return detector
+
+    def test_same_instance_per_version(self):
+        """Each version is loaded once and shared"""
+        registry = DetectorRegistry(max_resident=2, factory=self.factory)
+        assert registry.get("1") is registry.get("1")
+        assert len(self.created) == 1
+
+    def test_default_version_key(self):
+        """None is cached under the default key"""
+        registry = DetectorRegistry(max_resident=2, factory=self.factory)
+        registry.get()
+        registry.get(None)
+        assert registry.loaded_versions() == ["default"]
+        assert len(self.created) == 1
+
+    def test_lru_eviction_closes_detector(self):
+        """The least recently used version is evicted and closed"""
+        registry = DetectorRegistry(max_resident=2, factory=self.factory)
+        first = registry.get("1")
+        registry.get("2")
+        registry.get("1")
+        registry.get("3")
+
+        assert registry.loaded_versions() == ["1", "3"]
+        assert not first.closed
+        assert self.created[1].closed
+
+    def test_concurrent_get_loads_once(self):
+        """Concurrent callers for the same version share one load"""
+        registry = DetectorRegistry(max_resident=2, factory=self.factory)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get("1"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(self.created) == 1
+        assert all(result is results[0] for result in results)
+
+    def test_leased_detector_closed_after_release(self):
+        """An evicted detector stays open until its in-flight lease is released"""
+        registry = DetectorRegistry(max_resident=1, factory=self.factory)
+        leased = registry.acquire("a")
+        registry.get("b")
+
+        assert registry.loaded_versions() == ["b"]
+        assert not leased.closed
+        registry.release(leased)
+        assert leased.closed
+
+    def test_lease_counts_every_holder(self):
+        """The detector closes only when the last of several leases ends"""
+        registry = DetectorRegistry(max_resident=1, factory=self.factory)
+        with registry.lease("a") as first:
+            with registry.lease("a") as second:
+                assert first is second
+                registry.get("b")
+            assert not first.closed
+        assert first.closed
+
+    def test_released_resident_detector_stays_open(self):
+        """Releasing a lease does not close a detector that is still resident"""
+        registry = DetectorRegistry(max_resident=2, factory=self.factory)
+        with registry.lease("a") as detector:
+            pass
+        assert not detector.closed
+        assert registry.get("a") is detector
+
+    def test_load_locks_are_dropped(self):
+        """Load locks exist only while a load is in progress"""
+        registry = DetectorRegistry(max_resident=1, factory=self.factory)
+        for version in ("1", "2", "3"):
+            registry.get(version)
+        assert registry._load_locks == {}
+
+        def failing_factory(version):
+            raise RuntimeError("load failed")
+
+        registry = DetectorRegistry(max_resident=1, factory=failing_factory)
+        with pytest.raises(RuntimeError):
+            registry.get("1")
+        assert registry._load_locks == {}
+
+    def test_clear_closes_all(self):
+        """clear() closes every resident detector"""
+        registry = DetectorRegistry(max_resident=2, factory=self.factory)
+        registry.get("1")
+        registry.get("2")
+        registry.clear()
+
+        assert registry.loaded_versions() == []
+        assert all(detector.closed for detector in self.created)
+
+    def test_invalid_capacity(self):
+        """At least one version must be allowed to stay resident"""
+        with pytest.raises(ValueError):
+            DetectorRegistry(max_resident=0, factory=self.factory)
+
+class TestModelVersionValidation:
+    """Test cases for rejecting client-supplied model versions that are not configured or registered"""
+
+    @pytest.fixture(autouse=True)
+    def versions(self, monkeypatch):
+        self.registry_lookups = []
+
+        def is_registered(version):
+            self.registry_lookups.append(version)
+            return version == "7"
+
+        monkeypatch.setattr(settings, "MODEL_VERSIONS", {"V2": "models/v2.pt"})
+        monkeypatch.setattr(registry_module, "is_registered_version", is_registered)
+        monkeypatch.setattr(registry_module, "_registered_versions", set())
+
+    def test_known_versions(self):
+        assert resolve_model_version(None) is None
+        assert resolve_model_version("default") is None
+        assert resolve_model_version("V2") == "V2"
+        assert resolve_model_version("7") == "7"
+        assert resolve_model_version("7") == "7"
+        assert self.registry_lookups == ["7"]
+
+    @pytest.mark.parametrize("version", ["../../../../../tmp/evil", "V3", "8"])
+    def test_unknown_versions(self, version):
+        with pytest.raises(UnknownModelVersion):
+            resolve_model_version(version)
+
+    @pytest.mark.parametrize("router, path, headers", [
+        (part_detection_v1.router, "/identify-part", {}),
+        (part_detection_fastapi.router, "/detect", {"x-api-key": "test-key"}),
+    ], ids=["v1", "v2"])
+    def test_routes_return_404_before_loading(self, monkeypatch, router, path, headers):
+        loaded = []
+        for module in (part_detection_v1, part_detection_fastapi):
+            monkeypatch.setattr(module, "acquire_detector", lambda version=None: loaded.append(version))
+        monkeypatch.setattr(settings, "VALID_API_KEYS", "test-key")
+        app = FastAPI()
+        app.include_router(router)
+
+        response = TestClient(app).post(
+            path,
+            params={"model_version": "../../../../../tmp/evil"},
+            files={"image": ("part.jpg", b"\xff\xd8", "image/jpeg")},
+            headers=headers
+        )
+
+        assert response.status_code == 404
+        assert loaded == []
+
+class ThreadRecordingDetector:
+    """Detector whose async path records the thread it runs on."""
+
+    def __init__(self, threads):
+        self.threads = threads
+
+    async def detect_parts(self, image_file, confidence_threshold=0.7, include_columnar=False, include_arrays=False):
+        self.threads["detect"] = threading.get_ident()
+        return {"detections": []}
+
+class TestLoadOffEventLoop:
+    """Detector loading must not block the event loop"""
+
+    def test_acquire_runs_in_threadpool(self, monkeypatch):
+        threads = {}
+
+        def acquire(version=None):
+            threads["acquire"] = threading.get_ident()
+            return ThreadRecordingDetector(threads)
+
+        monkeypatch.setattr(part_detection_fastapi, "acquire_detector", acquire)
+        monkeypatch.setattr(part_detection_fastapi, "release_detector", lambda detector: None)
+        monkeypatch.setattr(settings, "VALID_API_KEYS", "test-key")
+        app = FastAPI()
+        app.include_router(part_detection_fastapi.router)
+
+        response = TestClient(app).post(
+            "/detect",
+            files={"image": ("part.jpg", b"\xff\xd8", "image/jpeg")},
+            headers={"x-api-key": "test-key"}
+        )
+
+        assert response.status_code == 200
+        assert threads["acquire"] != threads["detect"]
@@ -0,0 +1,116 @@
+"""Tests for the shared-memory frame handoff between API and workers."""
+
+import multiprocessing
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from core.config import Settings
+from ai_services.part_detection.frame_store import (
+    SHM_TRANSPORT, SPOOL_TRANSPORT, FrameHandle, SharedFrameStore
+)
+
+@pytest.fixture(params=[SHM_TRANSPORT, SPOOL_TRANSPORT])
+def store(request, tmp_path):
+    store = SharedFrameStore(transport=request.param, spool_dir=str(tmp_path), ttl_seconds=60, prefix=f"pdtest{request.param}")
+    yield store
+    store.ttl_seconds = -1
+    store.sweep()
+
+def make_frame(shape=(40, 60, 3)):
+    return np.random.default_rng(0).integers(0, 255, shape, dtype=np.uint8)
+
+def consume_in_child(handle, spool_dir, prefix, queue):
+    store = SharedFrameStore(spool_dir=spool_dir, prefix=prefix)
+    with store.consume(FrameHandle.from_dict(handle)) as frame:
+        queue.put(int(frame.sum()))
+
+class TestSharedFrameStore:
+    """Test cases for SharedFrameStore"""
+
+    def test_round_trip_is_read_only(self, store):
+        image = make_frame()
+        handle = store.put(image)
+        assert handle.transport == store.transport
+
+        with store.open(handle) as frame:
+            np.testing.assert_array_equal(frame, image)
+            assert not frame.flags.writeable
+        store.release(handle)
+
+    def test_handle_survives_json(self, store):
+        handle = store.put(make_frame((5, 7)))
+        assert FrameHandle.from_dict(handle.to_dict()) == handle
+        store.release(handle)
+
+    def test_unlinked_after_last_consumer(self, store):
+        handle = store.put(make_frame(), consumers=2)
+        with store.consume(handle):
+            pass
+        assert len(store) == 1
+        with store.consume(handle):
+            pass
+        assert len(store) == 0
+        with pytest.raises(FileNotFoundError):
+            with store.open(handle):
+                pass
+
+    def test_released_even_if_consumer_fails(self, store):
+        handle = store.put(make_frame())
+        with pytest.raises(RuntimeError):
+            with store.consume(handle):
+                raise RuntimeError("inference failed")
+        assert len(store) == 0
+
+    def test_take_maps_frame_and_unlinks_segment(self, store):
+        image = make_frame()
+        handle = store.put(image)
+
+        frame = store.take(handle)
+
+        assert len(store) == 0
+        np.testing.assert_array_equal(frame, image)
+        frame[0, 0] = 0
+        del frame
+
+    def test_sweep_removes_expired_frames(self, store):
+        store.put(make_frame())
+        assert store.sweep() == 0
+        store.ttl_seconds = -1
+        assert store.sweep() == 1
+        assert len(store) == 0
+
+    def test_consumed_by_another_process(self, store, tmp_path):
+        image = make_frame()
+        handle = store.put(image)
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        process = context.Process(
+            target=consume_in_child, args=(handle.to_dict(), str(tmp_path), store.prefix, queue)
+        )
+        process.start()
+        assert queue.get(timeout=60) == int(image.sum())
+        process.join()
+        assert len(store) == 0
+
+    def test_falls_back_to_spool_when_shm_is_full(self, tmp_path, monkeypatch):
+        store = SharedFrameStore(transport=SHM_TRANSPORT, spool_dir=str(tmp_path), prefix="pdtestfull")
+
+        def no_room(name, size):
+            raise OSError(28, "No space left on device")
+
+        monkeypatch.setattr(store.backends[SHM_TRANSPORT], "create", no_room)
+        handle = store.put(make_frame())
+        assert handle.transport == SPOOL_TRANSPORT
+        store.release(handle)
+        assert len(store) == 0
+
+class TestFrameStoreSettings:
+    """The frame TTL counts from put(), so it must outlast queued frame tasks"""
+
+    def test_ttl_must_outlast_task_expiry(self):
+        with pytest.raises(ValidationError, match="FRAME_STORE_TTL_SECONDS"):
+            Settings(FRAME_STORE_TTL_SECONDS=400, FRAME_TASK_EXPIRES_SECONDS=300)
+
+    def test_ttl_twice_task_expiry_is_accepted(self):
+        settings = Settings(FRAME_STORE_TTL_SECONDS=600, FRAME_TASK_EXPIRES_SECONDS=300)
+        assert settings.FRAME_STORE_TTL_SECONDS == 600
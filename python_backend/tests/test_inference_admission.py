@@ -0,0 +1,123 @@
+"""Tests for inference admission control and load shedding."""
+
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from core.config import settings
+from ai_services.part_detection.admission import AdmissionController, InferenceOverloaded
+from apis.v2 import part_detection_fastapi
+
+async def hold(controller, release, entered=None):
+    async with controller.admit():
+        if entered is not None:
+            entered.append(True)
+        await release.wait()
+
+class TestAdmissionController:
+    """Test cases for the bounded inference queue"""
+
+    @pytest.mark.asyncio
+    async def test_runs_up_to_limit_then_queues(self):
+        controller = AdmissionController(max_concurrency=2, max_queue=4, queue_timeout=5)
+        release, entered = asyncio.Event(), []
+        tasks = [asyncio.create_task(hold(controller, release, entered)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+
+        assert len(entered) == 2
+        assert controller.in_flight == 2 and controller.queue_depth == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert len(entered) == 3
+        assert controller.in_flight == 0 and controller.queue_depth == 0
+
+    @pytest.mark.asyncio
+    async def test_full_queue_fails_fast(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(controller, release)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(InferenceOverloaded) as exc_info:
+            await controller.acquire()
+
+        assert exc_info.value.reason == "queue_full"
+        assert exc_info.value.retry_after >= 1
+        release.set()
+        await asyncio.gather(*tasks)
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout=0.05)
+        release = asyncio.Event()
+        task = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(InferenceOverloaded) as exc_info:
+            await controller.acquire()
+
+        assert exc_info.value.reason == "timeout"
+        assert controller.queue_depth == 0
+        release.set()
+        await task
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_slots_are_handed_over_in_arrival_order(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout=5)
+        order = []
+
+        async def request(i):
+            async with controller.admit():
+                order.append(i)
+                await asyncio.sleep(0.001)
+
+        await asyncio.gather(*(request(i) for i in range(4)))
+        assert order == [0, 1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak_a_slot(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout=5)
+        release = asyncio.Event()
+        holder = asyncio.create_task(hold(controller, release))
+        waiter = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0.01)
+
+        waiter.cancel()
+        release.set()
+        await holder
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert controller.in_flight == 0 and controller.queue_depth == 0
+
+    @pytest.mark.asyncio
+    async def test_can_be_disabled(self, monkeypatch):
+        monkeypatch.setattr(settings, "INFERENCE_ADMISSION_ENABLED", False)
+        controller = AdmissionController(max_concurrency=0, max_queue=0, queue_timeout=0)
+        async with controller.admit():
+            assert controller.in_flight == 0
+
+class OverloadedDetector:
+    async def detect_parts(self, image_file, confidence_threshold=0.7, include_columnar=False, include_arrays=False):
+        raise InferenceOverloaded("queue_full", 3)
+
+class TestOverloadResponse:
+    """Test cases for the 503 answer to shed requests"""
+
+    def test_detect_returns_503_with_retry_after(self, monkeypatch):
+        monkeypatch.setattr(part_detection_fastapi, "acquire_detector", lambda version=None: OverloadedDetector())
+        monkeypatch.setattr(part_detection_fastapi, "release_detector", lambda detector: None)
+        monkeypatch.setattr(settings, "VALID_API_KEYS", "test-key")
+        app = FastAPI()
+        app.include_router(part_detection_fastapi.router)
+
+        response = TestClient(app).post(
+            "/detect",
+            files={"image": ("part.jpg", b"\xff\xd8", "image/jpeg")},
+            headers={"x-api-key": "test-key"}
+        )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
@@ -0,0 +1,102 @@
+"""Tests for the inference micro-batching scheduler."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from ai_services.part_detection.batching import MicroBatcher
+from core.timing import start_request
+
+class RecordingModel:
+    """Fake batched model that echoes each image's marker value."""
+
+    def __init__(self, fail=False):
+        self.batch_sizes = []
+        self.fail = fail
+
+    def run_batch(self, images, thresholds):
+        self.batch_sizes.append(len(images))
+        if self.fail:
+            raise RuntimeError("forward pass failed")
+        return [
+            {"marker": int(image[0, 0, 0]), "confidence_threshold": threshold}
+            for image, threshold in zip(images, thresholds)
+        ]
+
+def make_image(marker):
+    return np.full((4, 4, 3), marker, dtype=np.uint8)
+
+@pytest.fixture
+def executor():
+    pool = ThreadPoolExecutor(max_workers=2)
+    yield pool
+    pool.shutdown(wait=True)
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_batch(executor):
+    model = RecordingModel()
+    batcher = MicroBatcher(model.run_batch, executor, max_batch_size=8, max_wait_ms=50)
+
+    results = await asyncio.gather(*[
+        batcher.submit(make_image(i), 0.5 + i / 100) for i in range(5)
+    ])
+
+    assert model.batch_sizes == [5]
+    assert [r["marker"] for r in results] == list(range(5))
+    assert [r["confidence_threshold"] for r in results] == [0.5 + i / 100 for i in range(5)]
+
+@pytest.mark.asyncio
+async def test_batches_are_capped_at_max_size(executor):
+    model = RecordingModel()
+    batcher = MicroBatcher(model.run_batch, executor, max_batch_size=4, max_wait_ms=50)
+
+    results = await asyncio.gather(*[batcher.submit(make_image(i), 0.7) for i in range(10)])
+
+    assert max(model.batch_sizes) <= 4
+    assert sum(model.batch_sizes) == 10
+    assert [r["marker"] for r in results] == list(range(10))
+
+@pytest.mark.asyncio
+async def test_batch_failure_propagates_to_every_caller(executor):
+    model = RecordingModel(fail=True)
+    batcher = MicroBatcher(model.run_batch, executor, max_batch_size=8, max_wait_ms=20)
+
+    results = await asyncio.gather(
+        *[batcher.submit(make_image(i), 0.7) for i in range(3)],
+        return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+@pytest.mark.asyncio
+async def test_close_drains_queue_then_calls_on_close(executor):
+    model = RecordingModel()
+    closed = asyncio.Event()
+    batcher = MicroBatcher(model.run_batch, executor, max_wait_ms=20, on_close=closed.set)
+
+    pending = asyncio.ensure_future(batcher.submit(make_image(1), 0.7))
+    await asyncio.sleep(0)
+    batcher.close()
+
+    assert (await pending)["marker"] == 1
+    await asyncio.wait_for(closed.wait(), timeout=1)
+    with pytest.raises(RuntimeError):
+        await batcher.submit(make_image(2), 0.7)
+
+@pytest.mark.asyncio
+async def test_queue_and_inference_time_land_on_each_callers_timings(executor):
+    model = RecordingModel()
+    batcher = MicroBatcher(model.run_batch, executor, max_batch_size=8, max_wait_ms=20)
+
+    async def request(marker):
+        timings = start_request()
+        await batcher.submit(make_image(marker), 0.5)
+        return timings
+
+    first, second = await asyncio.gather(request(1), request(2))
+
+    assert model.batch_sizes == [2]
+    for timings in (first, second):
+        assert set(timings.stages) == {"queue", "inference"}
+        assert timings.stages["queue"] >= 0
+    assert first.stages["inference"] == second.stages["inference"]
@@ -0,0 +1,71 @@
+"""Tests for startup model preload and warm-up."""
+
+import pytest
+from ai_services.part_detection.registry import DetectorRegistry
+from ai_services.part_detection.warmup import ModelWarmup
+
+class FakeDetector:
+    """Stand-in for PartDetector that records which path warm-up inferences take."""
+
+    def __init__(self, version):
+        if version == "broken":
+            raise RuntimeError("model not found")
+        self.version = version
+        self.inference_shapes = []
+        self.sync_calls = 0
+
+    async def warm(self, image, confidence_threshold=0.5):
+        # Serving path: the MicroBatcher, or the inference executor without batching
+        self.inference_shapes.append(image.shape)
+
+    def detect_frame_sync(self, image, confidence_threshold=0.7, include_columnar=False):
+        self.sync_calls += 1
+        return {"detections": []}
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def registry():
+    return DetectorRegistry(max_resident=2, factory=FakeDetector)
+
+@pytest.mark.asyncio
+async def test_not_ready_until_warmup_finishes(registry):
+    warmup = ModelWarmup(registry, versions=["default", "v2"], iterations=3, input_size=320)
+    assert not warmup.ready
+    assert warmup.status()["versions"]["v2"]["status"] == "pending"
+
+    await warmup.run()
+
+    assert warmup.ready
+    assert registry.loaded_versions() == ["default", "v2"]
+    assert registry.get(None).inference_shapes == [(320, 320, 3)] * 3
+    assert registry.get(None).sync_calls == 0
+    assert registry._leases == {}
+    for version_status in warmup.status()["versions"].values():
+        assert version_status["status"] == "ready"
+        assert version_status["load_time_seconds"] >= 0
+
+@pytest.mark.asyncio
+async def test_failed_version_is_reported(registry):
+    warmup = ModelWarmup(registry, versions=["default", "broken"], iterations=1)
+    await warmup.run()
+
+    assert warmup.ready
+    assert warmup.status()["versions"]["broken"] == {"status": "failed", "error": "model not found"}
+
+@pytest.mark.asyncio
+async def test_disabled_warmup_is_ready(registry):
+    warmup = ModelWarmup(registry, versions=[])
+    await warmup.run()
+    assert warmup.ready
+
+def test_run_sync_warms_without_event_loop(registry):
+    warmup = ModelWarmup(registry, versions=["default", "broken"], iterations=1, input_size=64)
+
+    warmup.run_sync()
+
+    assert warmup.ready
+    assert registry.loaded_versions() == ["default"]
+    assert registry.get(None).sync_calls == 1
+    assert warmup.status()["versions"]["broken"]["status"] == "failed"
@@ -0,0 +1,215 @@
+"""Tests for the ONNX Runtime backend: parity with the Ultralytics model it was exported from, and INT8 quantization."""
+
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+torch = pytest.importorskip("torch")
+
+from ultralytics import YOLO
+from core.config import settings
+from ai_services.part_detection.backends import (
+    InferenceBackend, OnnxBackend, UltralyticsBackend, backend_for_version, ensure_onnx_model, export_onnx, onnx_path_for
+)
+from ai_services.part_detection.backends import export as export_module
+from ai_services.part_detection.backends.quantize import compare_detections, measure_latency, quantize_onnx
+from ai_services.part_detection.detections import RawDetections
+from ai_services.part_detection.inference import PartDetector
+
+CONF = 0.25
+SCORE_TOLERANCE = 1e-3
+BOX_TOLERANCE = 0.5  # pixels
+
+def make_image(height, width, seed):
+    """Gradients, blocks and noise so an untrained network still produces varied detections"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    image = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    for _ in range(6):
+        top, left = rng.integers(0, height - 40), rng.integers(0, width - 40)
+        image[top:top + rng.integers(20, 120), left:left + rng.integers(20, 120)] = rng.integers(0, 255, 3)
+    image += rng.normal(0, 10, image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+@pytest.fixture(scope="module")
+def weights(tmp_path_factory):
+    """A yolov8n built from its config with seeded, amplified class logits (no download needed)"""
+    model = YOLO("yolov8n.yaml")
+    torch.manual_seed(0)
+    with torch.no_grad():
+        for module in model.model.modules():
+            if isinstance(module, torch.nn.Conv2d) and module.weight.requires_grad:
+                torch.nn.init.kaiming_normal_(module.weight)
+        for branch in model.model.model[-1].cv3:
+            branch[-1].weight.mul_(60)
+            branch[-1].bias.fill_(-8.0)
+    path = tmp_path_factory.mktemp("weights") / "parity.pt"
+    model.save(str(path))
+    return str(path)
+
+@pytest.fixture(scope="module")
+def onnx_path(weights, tmp_path_factory):
+    return export_onnx(weights, str(tmp_path_factory.mktemp("onnx") / "parity.onnx"))
+
+@pytest.fixture(scope="module")
+def backends(weights, onnx_path):
+    return UltralyticsBackend(YOLO(weights)), OnnxBackend(onnx_path, intra_op_threads=2, inter_op_threads=1)
+
+def assert_detections_match(expected, actual, conf):
+    """Every detection has a counterpart with the same class, a close score and box; only
+    detections scored right at the threshold may appear on one side alone"""
+    assert expected.image_shape == actual.image_shape
+    unmatched = list(range(len(actual)))
+    for box, score, class_id in zip(expected.boxes, expected.scores, expected.class_ids):
+        match = next((
+            j for j in unmatched
+            if actual.class_ids[j] == class_id
+            and abs(actual.scores[j] - score) <= SCORE_TOLERANCE
+            and np.abs(actual.boxes[j] - box).max() <= BOX_TOLERANCE
+        ), None)
+        if match is None:
+            assert score - conf <= SCORE_TOLERANCE, f"no ONNX match for {box} ({score:.4f}, class {class_id})"
+            continue
+        unmatched.remove(match)
+    assert all(actual.scores[j] - conf <= SCORE_TOLERANCE for j in unmatched)
+
+class TestOnnxParity:
+    """Test cases comparing ONNX Runtime detections with the PyTorch model"""
+
+    @pytest.mark.parametrize("shapes", [
+        [(480, 640)],
+        [(720, 1280), (720, 1280)],
+        [(480, 640), (900, 600), (256, 256)],
+    ], ids=["single", "same-shape-batch", "mixed-batch"])
+    def test_detections_match_within_tolerance(self, backends, shapes):
+        ultralytics_backend, onnx_backend = backends
+        images = [make_image(h, w, seed) for seed, (h, w) in enumerate(shapes)]
+
+        expected = ultralytics_backend.predict(images, CONF)
+        actual = onnx_backend.predict(images, CONF)
+
+        assert len(actual) == len(images)
+        assert sum(len(raw) for raw in expected) > 0
+        for exp, act in zip(expected, actual):
+            assert_detections_match(exp, act, CONF)
+
+    def test_class_names_come_from_export_metadata(self, backends):
+        ultralytics_backend, onnx_backend = backends
+        assert onnx_backend.class_names == ultralytics_backend.class_names
+
+class TestInferenceBackend:
+    """Test cases for the backend base class"""
+
+    def test_backend_without_predict_cannot_be_created(self):
+        class NoPredict(InferenceBackend):
+            name = "incomplete"
+
+        with pytest.raises(TypeError, match="predict"):
+            NoPredict()
+
+class TestOnnxSelection:
+    """Test cases for per-version backend selection and on-demand export"""
+
+    def test_backend_is_chosen_per_version(self, monkeypatch):
+        monkeypatch.setattr(settings, "INFERENCE_BACKEND", "ultralytics")
+        monkeypatch.setattr(settings, "MODEL_BACKENDS", {"default": "onnx", "V3": "tensorrt"})
+
+        assert backend_for_version(None) == "onnx"
+        assert backend_for_version("V2") == "ultralytics"
+        with pytest.raises(ValueError):
+            backend_for_version("V3")
+
+    def test_detector_exports_and_serves_onnx(self, weights, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "MODEL_PATH", weights)
+        monkeypatch.setattr(settings, "MODEL_BACKENDS", {"default": "onnx"})
+        monkeypatch.setattr(settings, "ONNX_MODEL_DIR", str(tmp_path / "onnx"))
+        monkeypatch.setattr(settings, "MLFLOW_TRACKING_URI", f"file:{tmp_path / 'mlruns'}")
+
+        detector = PartDetector(version=None)
+        try:
+            assert (tmp_path / "onnx" / "default.onnx").exists()
+            assert detector.get_model_info()["backend"] == "onnx"
+            result = detector.detect_frame_sync(make_image(480, 640, 0), CONF)
+            assert result["image_info"] == {"width": 640, "height": 480, "channels": 3}
+        finally:
+            detector.close()
+
+    @pytest.mark.parametrize("version", ["../../../../../tmp/evil", "a/b", ".hidden"])
+    def test_unsafe_version_has_no_onnx_path(self, version, monkeypatch):
+        monkeypatch.setattr(settings, "ONNX_MODEL_DIR", "models/onnx")
+
+        with pytest.raises(ValueError):
+            onnx_path_for(version)
+
+    def test_missing_export_without_auto_export(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "ONNX_MODEL_DIR", str(tmp_path))
+        monkeypatch.setattr(settings, "ONNX_AUTO_EXPORT", False)
+
+        with pytest.raises(FileNotFoundError):
+            ensure_onnx_model("V2")
+
+    def test_registered_onnx_model_is_downloaded(self, onnx_path, tmp_path, monkeypatch):
+        registered = tmp_path / "artifact" / "model"
+        registered.mkdir(parents=True)
+        (registered / "model_int8.onnx").write_bytes(open(onnx_path, "rb").read())
+        monkeypatch.setattr(settings, "ONNX_MODEL_DIR", str(tmp_path / "onnx"))
+        monkeypatch.setattr(settings, "ONNX_AUTO_EXPORT", False)
+        monkeypatch.setattr(export_module, "download_registered_artifact", lambda version, download_dir=None: registered.parent)
+
+        path = ensure_onnx_model("7")
+
+        assert path == str(tmp_path / "onnx" / "7.onnx")
+        assert OnnxBackend(path).class_names
+
+def detections(boxes, scores, class_ids):
+    return RawDetections(
+        boxes=np.array(boxes, dtype=np.float32).reshape(-1, 4),
+        scores=np.array(scores, dtype=np.float32),
+        class_ids=np.array(class_ids, dtype=np.int32),
+        image_shape=(100, 100, 3)
+    )
+
+class TestInt8Quantization:
+    """Test cases for INT8 post-training quantization and its evaluation"""
+
+    def test_quantized_model_is_smaller_and_agrees_with_fp32(self, onnx_path, tmp_path):
+        int8_path = str(tmp_path / "int8.onnx")
+        params = quantize_onnx(onnx_path, int8_path, (make_image(480, 640, seed) for seed in range(8)))
+
+        assert params["calibration_images"] == 8
+        assert params["excluded_nodes"] > 0
+        assert os.path.getsize(int8_path) < os.path.getsize(onnx_path) / 2
+
+        fp32, int8 = OnnxBackend(onnx_path), OnnxBackend(int8_path)
+        assert int8.class_names == fp32.class_names
+        images = [make_image(480, 640, seed) for seed in range(8, 12)]
+        agreement = compare_detections(
+            [fp32.predict([image], CONF)[0] for image in images],
+            [int8.predict([image], CONF)[0] for image in images]
+        )
+        assert agreement["reference_detections"] > 0
+        assert agreement["f1"] > 0.7
+
+    def test_no_calibration_images(self, onnx_path, tmp_path):
+        with pytest.raises(ValueError):
+            quantize_onnx(onnx_path, str(tmp_path / "int8.onnx"), iter([]))
+
+    def test_compare_detections_matches_by_class_and_iou(self):
+        reference = [detections([[0, 0, 10, 10], [50, 50, 80, 80]], [0.9, 0.8], [0, 1])]
+        candidate = [detections([[1, 1, 10, 10], [50, 50, 80, 80], [20, 20, 30, 30]], [0.85, 0.8, 0.5], [0, 2, 0])]
+
+        agreement = compare_detections(reference, candidate)
+
+        assert agreement["reference_detections"] == 2 and agreement["candidate_detections"] == 3
+        assert agreement["recall"] == 0.5
+        assert agreement["precision"] == pytest.approx(1 / 3)
+        assert agreement["mean_iou"] == pytest.approx(0.81)
+        assert agreement["mean_score_delta"] == pytest.approx(0.05, abs=1e-6)
+
+    def test_measure_latency(self, onnx_path):
+        metrics = measure_latency(OnnxBackend(onnx_path), [make_image(256, 256, seed) for seed in range(3)], CONF, batch_size=2)
+
+        assert 0 < metrics["latency_p50_ms"] <= metrics["latency_p95_ms"]
+        assert metrics["throughput_images_per_s"] > 0
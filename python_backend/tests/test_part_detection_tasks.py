@@ -0,0 +1,288 @@
+"""Tests for the Celery part detection tasks."""
+
+import json
+import os
+import zipfile
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import cv2
+import numpy as np
+import pytest
+from celery_batches import SimpleRequest
+from core.celery_app import celery_app
+from core.config import settings
+from ai_services.part_detection import tasks
+from ai_services.part_detection.frame_store import SharedFrameStore
+from ai_services.part_detection.registry import DetectorRegistry
+
+class FakeDetector:
+    """Stand-in for PartDetector that counts loads and sync inferences."""
+
+    loads = 0
+
+    def __init__(self, version):
+        FakeDetector.loads += 1
+        self.version = version
+        self.sync_calls = 0
+
+    def detect_frame_sync(self, image, confidence_threshold=0.7, include_columnar=False):
+        self.sync_calls += 1
+        self.frame_shape = image.shape
+        return {
+            "detections": [{"bbox": [10.0, 20.0, 50.0, 80.0], "confidence": 0.9, "class_id": 0, "class_name": "motor"}],
+            "image_info": {"width": image.shape[1], "height": image.shape[0], "channels": image.shape[2]}
+        }
+
+    def detect_frames_sync(self, images, confidence_thresholds, include_columnar=False, original_shapes=None):
+        self.batch_sizes = getattr(self, "batch_sizes", []) + [len(images)]
+        self.batch_thresholds = list(confidence_thresholds)
+        return [self.detect_frame_sync(image, threshold) for image, threshold in zip(images, confidence_thresholds)]
+
+    def close(self):
+        pass
+
+class FakeTask:
+    """Replaces celery.current_task outside a worker."""
+
+    def __init__(self):
+        self.states = []
+
+    def update_state(self, state=None, meta=None):
+        self.states.append(meta["status"])
+
+class RecordingPublisher:
+    """Collects progress events instead of publishing them to Redis."""
+
+    def __init__(self):
+        self.events = []
+
+    def publish(self, task_id, state, **fields):
+        self.events.append((task_id, state, fields))
+
+    def states(self, task_id):
+        return [state for event_id, state, _ in self.events if event_id == task_id]
+
+@pytest.fixture
+def registry(monkeypatch):
+    FakeDetector.loads = 0
+    registry = DetectorRegistry(max_resident=2, factory=FakeDetector)
+    monkeypatch.setattr(tasks, "detector_registry", registry)
+    monkeypatch.setattr(tasks, "current_task", FakeTask())
+    monkeypatch.setattr(tasks, "progress_publisher", RecordingPublisher())
+    monkeypatch.setattr(settings, "CELERY_MODEL_VERSION", "1")
+    return registry
+
+@pytest.fixture
+def image_path(tmp_path):
+    path = tmp_path / "part.jpg"
+    cv2.imwrite(str(path), np.full((100, 120, 3), 90, dtype=np.uint8))
+    return str(path)
+
+class TestWorkerResidentModel:
+    """Test cases for per-process model loading in Celery workers"""
+
+    def test_worker_process_init_preloads(self, registry, monkeypatch):
+        monkeypatch.setattr(settings, "CELERY_PRELOAD_MODELS", True)
+        tasks.preload_detectors()
+        assert registry.loaded_versions() == ["1"]
+
+    def test_preload_can_be_disabled(self, registry, monkeypatch):
+        monkeypatch.setattr(settings, "CELERY_PRELOAD_MODELS", False)
+        tasks.preload_detectors()
+        assert registry.loaded_versions() == []
+
+    def test_tasks_reuse_the_resident_detector(self, registry, image_path):
+        tasks.preload_detectors()
+        warmup_calls = registry.get("1").sync_calls
+
+        for _ in range(3):
+            result = tasks.detect_parts.run(image_path)
+
+        assert FakeDetector.loads == 1
+        assert registry.get("1").sync_calls == warmup_calls + 3
+        assert registry.get("1").frame_shape == (100, 120, 3)
+        assert result["image_info"] == {"width": 120, "height": 100, "channels": 3}
+        assert result["detections"][0]["bbox"] == {"x": 10, "y": 20, "width": 40, "height": 60}
+
+    def test_shared_frame_input(self, registry, tmp_path, monkeypatch):
+        store = SharedFrameStore(spool_dir=str(tmp_path), prefix="pdtesttask")
+        monkeypatch.setattr(tasks, "frame_store", store)
+        handle = store.put(np.full((30, 40, 3), 90, dtype=np.uint8))
+
+        result = tasks.detect_parts.run(frame=handle.to_dict(), confidence_threshold=0.5)
+
+        assert result["image_info"] == {"width": 40, "height": 30, "channels": 3}
+        assert registry.get("1").frame_shape == (30, 40, 3)
+        assert len(store) == 0
+
+    def test_tasks_serve_the_configured_version(self, registry, image_path, monkeypatch):
+        tasks.detect_parts.run(image_path)
+        assert registry.loaded_versions() == ["1"]
+
+        monkeypatch.setattr(settings, "CELERY_MODEL_VERSION", "default")
+        tasks.detect_parts.run(image_path)
+        assert registry.loaded_versions() == ["1", "default"]
+        assert registry.get().version is None
+
+    def test_progress_is_published(self, registry, image_path):
+        result = tasks.detect_parts.run(image_path)
+
+        publisher = tasks.progress_publisher
+        assert publisher.states(None) == ["PROCESSING", "PROCESSING", "PROCESSING", "SUCCESS"]
+        assert publisher.events[-1][2]["result"] == result
+
+    def test_failure_is_published(self, registry):
+        with pytest.raises(ValueError):
+            tasks.detect_parts.run("/missing.jpg")
+
+        _, state, fields = tasks.progress_publisher.events[-1]
+        assert state == "FAILURE"
+        assert fields["error_type"] == "ValueError"
+
+    def test_cleanup_removes_job_upload(self, registry, image_path):
+        tasks.detect_parts.run(image_path, cleanup=True)
+        assert not os.path.exists(image_path)
+
+    def test_archive_job_writes_results(self, registry, image_path, tmp_path):
+        source = tmp_path / "catalog.zip"
+        with zipfile.ZipFile(source, "w") as archive:
+            archive.write(image_path, "machines/part.jpg")
+        output_path = tmp_path / "out" / "job.jsonl"
+
+        result = tasks.detect_archive.run(str(source), str(output_path), cleanup=True)
+
+        assert result["processed"] == 1 and result["failed"] == 0
+        record = json.loads(output_path.read_text())
+        assert record["file"] == "machines/part.jpg"
+        assert record["width"] == 120
+        assert tasks.progress_publisher.states(None)[-1] == "SUCCESS"
+        assert not source.exists()
+
+    def test_health_check_reports_loaded_models(self, registry):
+        assert tasks.health_check.run()["model_loaded"] == "false"
+        registry.get()
+        assert tasks.health_check.run()["model_loaded"] == "true"
+
+def make_request(task_id, *args, request_dict=None, **kwargs):
+    return SimpleRequest(
+        id=task_id, name="detect_parts_batch", args=args, kwargs=kwargs, delivery_info={},
+        hostname="test", ignore_result=False, reply_to=None, correlation_id=None, request_dict=request_dict or {}
+    )
+
+class TestBatchedDetection:
+    """Test cases for the detect_parts_batch consumer"""
+
+    @pytest.fixture
+    def outcomes(self, monkeypatch):
+        outcomes = {}
+        backend = celery_app.backend
+        monkeypatch.setattr(backend, "mark_as_done", lambda task_id, result, request=None: outcomes.__setitem__(task_id, result))
+        monkeypatch.setattr(backend, "mark_as_failure", lambda task_id, exc, request=None: outcomes.__setitem__(task_id, exc))
+        return outcomes
+
+    def test_one_forward_pass_per_batch(self, registry, image_path, outcomes):
+        requests = [
+            make_request("a", image_path),
+            make_request("b", image_path, 0.5),
+            make_request("c", image_path=image_path, confidence_threshold=0.9),
+        ]
+
+        tasks.detect_parts_batch.run(requests)
+
+        assert registry.get("1").batch_sizes == [3]
+        assert registry.get("1").batch_thresholds == [0.7, 0.5, 0.9]
+        assert set(outcomes) == {"a", "b", "c"}
+        assert outcomes["b"]["task_id"] == "b"
+        assert outcomes["b"]["image_info"] == {"width": 120, "height": 100, "channels": 3}
+
+    def test_bad_image_fails_only_its_task(self, registry, image_path, outcomes):
+        tasks.detect_parts_batch.run([make_request("ok", image_path), make_request("bad", "/missing.jpg")])
+
+        assert registry.get("1").batch_sizes == [1]
+        assert outcomes["ok"]["status"] == "completed"
+        assert isinstance(outcomes["bad"], ValueError)
+        assert tasks.progress_publisher.states("ok") == ["PROCESSING", "SUCCESS"]
+        assert tasks.progress_publisher.states("bad") == ["FAILURE"]
+
+    def test_shared_frames_are_batched_and_released(self, registry, tmp_path, monkeypatch, outcomes):
+        store = SharedFrameStore(spool_dir=str(tmp_path), prefix="pdtestbatch")
+        monkeypatch.setattr(tasks, "frame_store", store)
+        handles = [store.put(np.zeros((30, 40, 3), dtype=np.uint8)) for _ in range(2)]
+
+        tasks.detect_parts_batch.run([make_request(str(i), frame=h.to_dict()) for i, h in enumerate(handles)])
+
+        assert registry.get("1").batch_sizes == [2]
+        assert outcomes["1"]["image_info"]["width"] == 40
+        assert len(store) == 0
+
+    def test_routed_to_batch_queue(self):
+        assert celery_app.conf.task_routes["detect_parts_batch"]["queue"] == settings.CELERY_BATCH_QUEUE
+        assert tasks.detect_parts_batch.flush_every == settings.CELERY_BATCH_MAX_SIZE
+
+class RecordingTask:
+    """Stand-in for a Celery task that records apply_async options."""
+
+    def __init__(self):
+        self.options = []
+
+    def apply_async(self, kwargs=None, **options):
+        self.options.append(options)
+        return SimpleNamespace(id="job-1")
+
+class TestFrameTaskExpiry:
+    """Frame tasks must not outwait the frame store TTL"""
+
+    @pytest.fixture
+    def store(self, monkeypatch, tmp_path):
+        store = SharedFrameStore(spool_dir=str(tmp_path), prefix="pdtestexpiry")
+        monkeypatch.setattr(tasks, "frame_store", store)
+        yield store
+        store.ttl_seconds = -1
+        store.sweep()
+
+    @pytest.mark.parametrize("batch", [False, True])
+    def test_frame_tasks_are_sent_with_expiry(self, store, monkeypatch, batch):
+        task = RecordingTask()
+        monkeypatch.setattr(tasks, "detect_parts_batch" if batch else "detect_parts", task)
+        monkeypatch.setattr(settings, "FRAME_TASK_EXPIRES_SECONDS", 120)
+
+        tasks.submit_frame(np.zeros((30, 40, 3), dtype=np.uint8), batch=batch)
+
+        assert task.options == [{"expires": 120}]
+        assert len(store) == 1
+
+    def test_expired_task_releases_its_frame(self, registry, store):
+        handle = store.put(np.zeros((30, 40, 3), dtype=np.uint8))
+        request = SimpleNamespace(id="late", kwargs={"frame": handle.to_dict(), "confidence_threshold": 0.5})
+
+        tasks.release_revoked_frame(request=request, terminated=False, expired=True)
+
+        assert len(store) == 0
+        assert tasks.progress_publisher.states("late") == ["REVOKED"]
+
+    def test_terminated_task_keeps_its_frame(self, registry, store):
+        handle = store.put(np.zeros((30, 40, 3), dtype=np.uint8))
+        request = SimpleNamespace(id="running", kwargs={"frame": handle.to_dict()})
+
+        tasks.release_revoked_frame(request=request, terminated=True, expired=False)
+
+        assert len(store) == 1
+
+    def test_expired_batch_request_is_failed_and_released(self, registry, store, monkeypatch):
+        outcomes = {}
+        monkeypatch.setattr(celery_app.backend, "mark_as_done", lambda task_id, result, request=None: outcomes.__setitem__(task_id, result))
+        monkeypatch.setattr(celery_app.backend, "mark_as_failure", lambda task_id, exc, request=None: outcomes.__setitem__(task_id, exc))
+        past = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+        future = (datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat()
+        handles = [store.put(np.zeros((30, 40, 3), dtype=np.uint8)) for _ in range(2)]
+
+        tasks.detect_parts_batch.run([
+            make_request("late", frame=handles[0].to_dict(), request_dict={"expires": past}),
+            make_request("ok", frame=handles[1].to_dict(), request_dict={"expires": future}),
+        ])
+
+        assert registry.get("1").batch_sizes == [1]
+        assert outcomes["ok"]["status"] == "completed"
+        assert type(outcomes["late"]).__name__ == "TaskRevokedError"
+        assert tasks.progress_publisher.states("late") == ["FAILURE"]
+        assert len(store) == 0
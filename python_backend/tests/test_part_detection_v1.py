@@ -5,7 +5,7 @@ import numpy as np
 import cv2
 import os
 from ai_services.part_detection.v1.model import PartDetectionModel
-from ai_services.part_detection.v1.inference import run_inference
+from ai_services.part_detection.v1.inference import run_inference, get_model, clear_models
 
 class TestPartDetectionV1:
     """Critical tests for Part Detection v1."""
@@ -71,3 +71,32 @@ class TestPartDetectionV1:
         assert info["framework"] == "TensorFlow"
         assert "class_names" in info
         assert len(info["class_names"]) == 8
+
+class TestPartDetectionV1Serving:
+    """Tests for the cached model and its compiled predict function."""
+
+    def setup_method(self):
+        clear_models()
+
+    def teardown_method(self):
+        clear_models()
+
+    def test_model_is_loaded_once(self, monkeypatch):
+        """Repeated inference reuses one loaded model."""
+        loads = []
+        original = PartDetectionModel.load_model
+        monkeypatch.setattr(PartDetectionModel, "load_model", lambda self: (loads.append(self), original(self)))
+
+        assert get_model() is get_model()
+        assert len(loads) == 1
+
+    def test_compiled_predict_matches_keras(self):
+        """The tf.function output matches a direct Keras call."""
+        model = get_model()
+        image = np.random.randint(0, 255, (300, 400, 3), dtype=np.uint8)
+
+        results = model.predict(image)
+        expected = model.model(model._preprocess_image(image).astype(np.float32), training=False).numpy()[0]
+
+        assert list(results) == model.class_names
+        np.testing.assert_allclose(list(results.values()), expected, rtol=1e-5, atol=1e-6)
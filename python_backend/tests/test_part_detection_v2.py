@@ -0,0 +1,143 @@
+"""Tests for the cached Part Detection Model v2 and its compiled predict function."""
+
+import cv2
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from ai_services.part_detection.v2 import inference
+from ai_services.part_detection.v2.inference import batch_inference, clear_models_v2, get_model_v2
+from ai_services.part_detection.v2.model import PartDetectionModelV2
+
+@pytest.fixture
+def model_path(tmp_path):
+    """A small stand-in for the trained .h5 (the fallback would download ResNet50 weights)"""
+    num_classes = len(PartDetectionModelV2().class_names)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(256, 256, 3)),
+        tf.keras.layers.Conv2D(4, 3, strides=4, activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(num_classes, activation="softmax")
+    ])
+    path = tmp_path / "part_detection_v2.h5"
+    model.save(path)
+    return str(path)
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    clear_models_v2()
+    yield
+    clear_models_v2()
+
+class TestPartDetectionV2Serving:
+    """Test cases for the cached v2 model"""
+
+    def test_model_is_loaded_once_per_path(self, model_path, monkeypatch):
+        loads = []
+        original = PartDetectionModelV2.load_model
+        monkeypatch.setattr(PartDetectionModelV2, "load_model", lambda self: (loads.append(self.model_path), original(self)))
+
+        assert get_model_v2(model_path) is get_model_v2(model_path)
+        assert loads == [model_path]
+
+    def test_compiled_predict_matches_keras(self, model_path):
+        model = get_model_v2(model_path)
+        image = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+        results = model.predict(image)
+        expected = model.model(model._preprocess_image(image).astype(np.float32), training=False).numpy()[0]
+
+        assert list(results) == model.class_names
+        np.testing.assert_allclose(list(results.values()), expected, rtol=1e-5, atol=1e-6)
+
+class TestPartDetectionV2BatchInference:
+    """Test cases for chunked batch inference"""
+
+    def test_one_forward_pass_per_chunk(self, model_path, tmp_path, monkeypatch):
+        model = get_model_v2(model_path)
+        monkeypatch.setitem(inference._models, None, model)
+        rng = np.random.default_rng(0)
+        paths = []
+        for i in range(10):
+            path = tmp_path / f"image_{i}.jpg"
+            cv2.imwrite(str(path), rng.integers(0, 255, (200 + 10 * i, 300, 3), dtype=np.uint8))
+            paths.append(str(path))
+        paths[3] = str(tmp_path / "missing.jpg")
+        passes = []
+        original = model.predict_preprocessed
+        monkeypatch.setattr(model, "predict_preprocessed", lambda batch: (passes.append(len(batch)), original(batch))[1])
+
+        results = batch_inference(paths, confidence_threshold=0.0, batch_size=4)
+
+        assert passes == [4, 4, 1]
+        assert results[3] == {"error": f"Image not found at path: {paths[3]}", "image_path": paths[3]}
+        for path, result in zip(paths, results):
+            if path == paths[3]:
+                continue
+            expected = model.predict(cv2.imread(path))
+            np.testing.assert_allclose(list(result["all_predictions"].values()), list(expected.values()), rtol=1e-5, atol=1e-6)
+            assert result["predictions"] == result["all_predictions"]
+
+    def test_failed_forward_pass_only_affects_its_chunk(self, model_path, tmp_path, monkeypatch):
+        model = get_model_v2(model_path)
+        monkeypatch.setitem(inference._models, None, model)
+        paths = []
+        for i in range(3):
+            path = tmp_path / f"image_{i}.jpg"
+            cv2.imwrite(str(path), np.full((64, 64, 3), 40 * i, dtype=np.uint8))
+            paths.append(str(path))
+        original = model.predict_preprocessed
+        calls = []
+
+        def flaky(batch):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise RuntimeError("out of memory")
+            return original(batch)
+        monkeypatch.setattr(model, "predict_preprocessed", flaky)
+
+        results = batch_inference(paths, batch_size=2)
+
+        assert [r.get("error") for r in results] == ["out of memory", "out of memory", None]
+        assert "all_predictions" in results[2]
+
+class TestPartDetectionV2Graphs:
+    """Test cases for the separate training and serving graphs"""
+
+    @staticmethod
+    def _augmentation_layers(model):
+        kinds = (tf.keras.layers.RandomFlip, tf.keras.layers.RandomRotation, tf.keras.layers.RandomZoom)
+        return [layer for layer in model.layers if isinstance(layer, kinds)]
+
+    def test_serving_graph_has_no_augmentation_or_compilation(self):
+        detector = PartDetectionModelV2()
+        serving = detector.build_serving_model(backbone_weights=None)
+        training = detector.build_training_model(serving)
+
+        assert self._augmentation_layers(serving) == []
+        assert getattr(serving, "optimizer", None) is None
+        assert len(self._augmentation_layers(training)) == 3
+        assert training.optimizer is not None
+        # Training updates the weights the serving graph uses
+        assert training.layers[-1] is serving
+
+    def test_serving_predictions_are_deterministic(self):
+        detector = PartDetectionModelV2()
+        detector.model = detector.build_serving_model(backbone_weights=None)
+        image = np.random.default_rng(0).integers(0, 255, (300, 300, 3), dtype=np.uint8)
+
+        assert detector.predict(image) == detector.predict(image)
+
+    def test_saved_model_export_round_trip(self, model_path, tmp_path):
+        detector = get_model_v2(model_path)
+        export_dir = detector.export_saved_model(str(tmp_path / "serving"))
+        image = np.random.default_rng(1).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+        exported = PartDetectionModelV2(export_dir)
+        exported.load_model()
+
+        assert not isinstance(exported.model, tf.keras.Model)
+        np.testing.assert_allclose(
+            list(exported.predict(image).values()), list(detector.predict(image).values()), rtol=1e-5, atol=1e-6
+        )
@@ -0,0 +1,341 @@
+"""Tests for PartDetector inference paths using a stand-in YOLO model."""
+
+import asyncio
+import io
+import cv2
+import numpy as np
+import pytest
+from core.config import settings
+from ai_services.part_detection import inference
+from ai_services.part_detection.admission import AdmissionController, InferenceOverloaded
+from ai_services.part_detection.cache import detection_cache, raw_detection_cache
+from ai_services.part_detection.detections import RawDetections
+from ai_services.part_detection.inference import PartDetector
+from ai_services.part_detection.registry import DetectorRegistry
+from ai_services.part_detection.warmup import ModelWarmup
+from ai_services.preprocessing.ingest import UploadTooLarge
+from core.timing import start_request
+
+# x1, y1, x2, y2, confidence, class_id
+FAKE_BOXES = np.array([
+    [10, 20, 50, 80, 0.95, 0],
+    [30, 30, 60, 60, 0.75, 1],
+    [5, 5, 15, 15, 0.30, 2],
+    [0, 0, 8, 8, 0.06, 1],
+], dtype=np.float32)
+
+class FakeArray:
+    """Mimics the .cpu().numpy() chain on ultralytics tensors."""
+
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+class FakeBoxes:
+    def __init__(self, data):
+        self.data = FakeArray(data)
+
+    def __len__(self):
+        return len(self.data.array)
+
+class FakeResult:
+    def __init__(self, data):
+        self.boxes = FakeBoxes(data)
+
+class FakeYOLO:
+    """Stand-in YOLO model that applies the conf argument like ultralytics does."""
+
+    def __init__(self):
+        self.model = type("Inner", (), {"names": {0: "motor", 1: "blade", 2: "sensor"}})()
+        self.predict_calls = []
+        self.image_shapes = []
+
+    def predict(self, images, conf=0.25):
+        self.predict_calls.append((len(images), conf))
+        self.image_shapes.extend(image.shape for image in images)
+        return [FakeResult(FAKE_BOXES[FAKE_BOXES[:, 4] >= conf]) for _ in images]
+
+@pytest.fixture
+def detector(monkeypatch):
+    monkeypatch.setattr(PartDetector, "_load_ultralytics_model", lambda self: FakeYOLO())
+    detection_cache.clear()
+    raw_detection_cache.clear()
+    part_detector = PartDetector(version="test")
+    yield part_detector
+    part_detector.close()
+
+def encode_image(color=(0, 0, 255), size=(120, 100), ext=".png"):
+    image = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    image[:] = color
+    ok, buffer = cv2.imencode(ext, image)
+    assert ok
+    return buffer.tobytes()
+
+class TestRawDetections:
+    """Test cases for RawDetections filtering"""
+
+    def test_filter_is_vectorized_threshold(self):
+        raw = RawDetections(
+            boxes=FAKE_BOXES[:, :4],
+            scores=FAKE_BOXES[:, 4],
+            class_ids=FAKE_BOXES[:, 5].astype(np.int32),
+            image_shape=(100, 120, 3)
+        )
+        filtered = raw.filter(0.5)
+        assert len(filtered) == 2
+        assert filtered.class_ids.tolist() == [0, 1]
+        assert raw.filter(0.0) is raw
+
+    def test_rescaled_maps_boxes_to_original_pixels(self):
+        raw = RawDetections(
+            boxes=FAKE_BOXES[:2, :4],
+            scores=FAKE_BOXES[:2, 4],
+            class_ids=np.zeros(2, dtype=np.int32),
+            image_shape=(100, 120, 3)
+        )
+        rescaled = raw.rescaled((400, 240, 3))
+        assert rescaled.boxes[0].tolist() == [20.0, 80.0, 100.0, 320.0]
+        assert rescaled.image_shape == (400, 240, 3)
+        assert raw.rescaled((100, 120)) is raw
+
+    def test_empty(self):
+        raw = RawDetections.empty((10, 20))
+        assert len(raw) == 0
+        assert raw.image_shape == (10, 20, 1)
+
+class TestPartDetector:
+    """Test cases for PartDetector with a stand-in model"""
+
+    def test_run_inference_response_structure(self, detector):
+        result = detector._run_inference(np.zeros((100, 120, 3), dtype=np.uint8), 0.7)
+
+        assert [d["class_name"] for d in result["detections"]] == ["motor", "blade"]
+        first = result["detections"][0]
+        assert first["bbox"] == [10.0, 20.0, 50.0, 80.0]
+        assert first["center"] == [30.0, 50.0]
+        assert first["confidence"] == pytest.approx(0.95)
+        assert result["image_info"] == {"width": 120, "height": 100, "channels": 3}
+        assert result["model_info"]["model_version"] == "test"
+
+    @pytest.mark.asyncio
+    async def test_threshold_changes_reuse_raw_detections(self, detector, monkeypatch):
+        monkeypatch.setattr(settings, "RAW_DETECTION_CACHE_ENABLED", True)
+        monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+        image_bytes = encode_image()
+
+        first = await detector.detect_parts(io.BytesIO(image_bytes), confidence_threshold=0.5)
+        second = await detector.detect_parts(io.BytesIO(image_bytes), confidence_threshold=0.9)
+        third = await detector.detect_parts(io.BytesIO(image_bytes), confidence_threshold=0.1)
+
+        assert detector.model.predict_calls == [(1, settings.RAW_DETECTION_SCORE_FLOOR)]
+        assert len(first["detections"]) == 2
+        assert len(second["detections"]) == 1
+        assert len(third["detections"]) == 3
+        assert second["model_info"]["confidence_threshold"] == 0.9
+
+    @pytest.mark.asyncio
+    async def test_without_raw_cache_predicts_at_requested_threshold(self, detector, monkeypatch):
+        monkeypatch.setattr(settings, "RAW_DETECTION_CACHE_ENABLED", False)
+        monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+        image_bytes = encode_image()
+
+        await detector.detect_parts(io.BytesIO(image_bytes), confidence_threshold=0.5)
+        await detector.detect_parts(io.BytesIO(image_bytes), confidence_threshold=0.9)
+
+        assert detector.model.predict_calls == [(1, 0.5), (1, 0.9)]
+
+    @pytest.mark.asyncio
+    async def test_result_cache_hit_skips_inference(self, detector, monkeypatch):
+        monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+        image_bytes = encode_image(color=(1, 2, 3))
+
+        first = await detector.detect_parts(io.BytesIO(image_bytes), confidence_threshold=0.7)
+        second = await detector.detect_parts(io.BytesIO(image_bytes), confidence_threshold=0.7)
+
+        assert first == second
+        assert len(detector.model.predict_calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_arrays_are_attached_but_not_cached(self, detector, monkeypatch):
+        monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", True)
+        image_bytes = encode_image(color=(4, 5, 6))
+
+        result = await detector.detect_parts(io.BytesIO(image_bytes), confidence_threshold=0.5, include_arrays=True)
+
+        arrays = result["arrays"]
+        assert isinstance(arrays["bbox"], np.ndarray)
+        assert arrays["bbox"].tolist() == [d["bbox"] for d in result["detections"]]
+        assert arrays["class_name"] == ["motor", "blade"]
+        cached = await detector.detect_parts(io.BytesIO(image_bytes), confidence_threshold=0.5)
+        assert "arrays" not in cached
+
+    @pytest.mark.asyncio
+    async def test_oversized_upload_is_rejected_before_inference(self, detector, monkeypatch):
+        monkeypatch.setattr(settings, "MAX_UPLOAD_BYTES", 16)
+
+        with pytest.raises(UploadTooLarge):
+            await detector.detect_parts(io.BytesIO(encode_image()), confidence_threshold=0.7)
+        assert detector.model.predict_calls == []
+
+    @pytest.mark.asyncio
+    async def test_overloaded_request_is_shed_before_decode(self, detector, monkeypatch):
+        monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+        monkeypatch.setattr(inference, "inference_admission", AdmissionController(0, 0, 1.0))
+        monkeypatch.setattr(detector, "_decode", lambda data: pytest.fail("decoded a rejected request"))
+
+        with pytest.raises(InferenceOverloaded):
+            await detector.detect_parts(io.BytesIO(encode_image()), confidence_threshold=0.7)
+        assert detector.model.predict_calls == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("batching", [True, False])
+    async def test_rejected_batch_cancels_remaining_images(self, detector, monkeypatch, batching):
+        monkeypatch.setattr(settings, "BATCHING_ENABLED", batching)
+        monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+        monkeypatch.setattr(settings, "RAW_DETECTION_CACHE_ENABLED", False)
+        monkeypatch.setattr(inference, "inference_admission", AdmissionController(1, 1, 5.0))
+        predicts = []
+        predict = detector._predict
+
+        async def counting_predict(image, confidence_threshold):
+            predicts.append(image.shape)
+            return await predict(image, confidence_threshold)
+
+        monkeypatch.setattr(detector, "_predict", counting_predict)
+        uploads = [io.BytesIO(encode_image()) for _ in range(4)]
+
+        with pytest.raises(InferenceOverloaded):
+            await detector.batch_detect(uploads, confidence_threshold=0.5)
+        model_calls = list(detector.model.predict_calls)
+        await asyncio.sleep(0.1)
+
+        # Only the image admitted before the rejection reached _predict; the queued one never ran
+        assert len(predicts) == 1
+        assert detector.model.predict_calls == model_calls
+        if batching:
+            assert model_calls == []
+        assert inference.inference_admission.in_flight == 0
+        assert inference.inference_admission.queue_depth == 0
+        for upload in uploads:
+            upload.close()
+
+    @pytest.mark.asyncio
+    async def test_large_jpeg_is_inferred_reduced_and_reported_full_size(self, detector, monkeypatch):
+        monkeypatch.setattr(settings, "REDUCED_DECODE_ENABLED", True)
+        monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+        image_bytes = encode_image(size=(2560, 1920), ext=".jpg")
+
+        result = await detector.detect_parts(io.BytesIO(image_bytes), confidence_threshold=0.7)
+
+        assert detector.model.image_shapes == [(480, 640, 3)]
+        assert result["image_info"] == {"width": 2560, "height": 1920, "channels": 3}
+        assert result["detections"][0]["bbox"] == [40.0, 80.0, 200.0, 320.0]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("batching", [True, False])
+    async def test_detect_parts_records_stage_timings(self, detector, monkeypatch, batching):
+        monkeypatch.setattr(settings, "BATCHING_ENABLED", batching)
+        timings = start_request()
+
+        await detector.detect_parts(io.BytesIO(encode_image()), confidence_threshold=0.7)
+
+        assert set(timings.stages) == {"cache", "admission", "decode", "queue", "inference", "postprocess"}
+        assert all(seconds >= 0 for seconds in timings.stages.values())
+
+    def test_detect_parts_sync_matches_async_path(self, detector, monkeypatch):
+        monkeypatch.setattr(settings, "RESULT_CACHE_ENABLED", False)
+        image_bytes = encode_image(size=(2560, 1920), ext=".jpg")
+
+        result = detector.detect_parts_sync(io.BytesIO(image_bytes), confidence_threshold=0.7)
+
+        assert detector.model.predict_calls == [(1, 0.7)]
+        assert result["image_info"] == {"width": 2560, "height": 1920, "channels": 3}
+        assert [d["class_name"] for d in result["detections"]] == ["motor", "blade"]
+
+    @pytest.mark.asyncio
+    async def test_detect_frame_skips_decode(self, detector, monkeypatch):
+        monkeypatch.setattr(settings, "BATCHING_ENABLED", True)
+        frame = np.zeros((100, 120, 3), dtype=np.uint8)
+
+        result = await detector.detect_frame(frame, confidence_threshold=0.7)
+
+        assert detector.model.image_shapes == [(100, 120, 3)]
+        assert result == detector.detect_frame_sync(frame, confidence_threshold=0.7)
+
+    @pytest.mark.asyncio
+    async def test_warmup_goes_through_the_batcher(self, detector, monkeypatch):
+        monkeypatch.setattr(settings, "BATCHING_ENABLED", True)
+        submitted = []
+        submit = detector.batcher.submit
+
+        async def recording_submit(image, confidence_threshold):
+            submitted.append(image.shape)
+            return await submit(image, confidence_threshold)
+
+        monkeypatch.setattr(detector.batcher, "submit", recording_submit)
+        registry = DetectorRegistry(max_resident=1, factory=lambda version: detector)
+        warmup = ModelWarmup(registry, versions=["default"], iterations=2, input_size=64)
+
+        await warmup.run()
+
+        assert warmup.ready
+        assert submitted == [(64, 64, 3)] * 2
+
+    def test_detect_frames_sync_is_one_forward_pass(self, detector):
+        frames = [np.zeros((100, 120, 3), dtype=np.uint8), np.zeros((50, 60, 3), dtype=np.uint8)]
+
+        results = detector.detect_frames_sync(frames, [0.9, 0.25])
+
+        assert detector.model.predict_calls == [(2, 0.25)]
+        assert [len(r["detections"]) for r in results] == [1, 3]
+        assert results[1]["image_info"]["width"] == 60
+
+    def test_detect_frames_sync_reports_original_sizes(self, detector):
+        frame = np.zeros((50, 60, 3), dtype=np.uint8)
+
+        plain, = detector.detect_frames_sync([frame], [0.25])
+        scaled, = detector.detect_frames_sync([frame], [0.25], original_shapes=[(100, 120, 3)])
+
+        assert scaled["image_info"]["width"] == 120
+        assert scaled["detections"][0]["bbox"] == [2 * v for v in plain["detections"][0]["bbox"]]
+
+    @pytest.mark.parametrize("shape", [(100, 120), (100, 120, 4)])
+    def test_detect_frame_converts_to_bgr(self, detector, shape):
+        detector.detect_frame_sync(np.zeros(shape, dtype=np.uint8))
+        assert detector.model.image_shapes == [(100, 120, 3)]
+
+    def test_detect_frame_rejects_non_images(self, detector):
+        with pytest.raises(ValueError):
+            detector.detect_frame_sync(np.zeros((100, 120, 3), dtype=np.float32))
+
+class TestPostProcessing:
+    """Test cases for vectorized post-processing"""
+
+    def test_columnar_matches_detections(self, detector):
+        raw = detector._predict_batch([np.zeros((100, 120, 3), dtype=np.uint8)], [0.25])[0]
+        result = detector._format_result(raw.filter(0.25), 0.25, include_columnar=True)
+
+        columns = result["columnar"]
+        assert columns["class_name"] == ["motor", "blade", "sensor"]
+        assert columns["center"] == [d["center"] for d in result["detections"]]
+        assert columns["bbox"] == [d["bbox"] for d in result["detections"]]
+        assert "columnar" not in detector._format_result(raw, 0.25)
+
+    def test_unknown_class_ids_fall_back_to_generic_name(self, detector):
+        raw = RawDetections(
+            boxes=np.zeros((2, 4), dtype=np.float32),
+            scores=np.ones(2, dtype=np.float32),
+            class_ids=np.array([1, 7], dtype=np.int32),
+            image_shape=(10, 10, 3)
+        )
+        assert detector._lookup_class_names(raw.class_ids) == ["blade", "class_7"]
+
+    def test_empty_result(self, detector):
+        result = detector._format_result(RawDetections.empty((10, 10, 3)), 0.5, include_columnar=True)
+        assert result["detections"] == []
+        assert result["columnar"]["class_name"] == []
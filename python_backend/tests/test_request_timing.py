@@ -0,0 +1,150 @@
+"""Tests for per-stage request timings, their histograms and the Server-Timing header."""
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from core.config import settings
+from core.timing import RequestTimings, current_timings, model_version_label, stage
+from apis.timing import StageTimingMiddleware
+from ai_services.part_detection import registry as registry_module
+from apis.v2 import part_detection_fastapi
+
+class StagedDetector:
+    """Stand-in detector that spends its time in named stages."""
+
+    async def detect_parts(self, image_file, confidence_threshold=0.7, include_columnar=False, include_arrays=False):
+        with stage("decode"):
+            pass
+        with stage("inference"):
+            pass
+        return {
+            "detections": [],
+            "image_info": {"width": 1, "height": 1, "channels": 3},
+            "model_info": {"framework": "YOLOv8", "confidence_threshold": confidence_threshold, "model_version": "V2"}
+        }
+
+    async def batch_detect(self, image_files, confidence_threshold=0.7, include_columnar=False, include_arrays=False):
+        return [await self.detect_parts(f, confidence_threshold) for f in image_files]
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(part_detection_fastapi, "acquire_detector", lambda version=None: StagedDetector())
+    monkeypatch.setattr(part_detection_fastapi, "release_detector", lambda detector: None)
+    monkeypatch.setattr(settings, "VALID_API_KEYS", "test-key")
+    monkeypatch.setattr(settings, "MODEL_VERSIONS", {"V2": "models/v2.pt"})
+    app = FastAPI()
+    app.include_router(part_detection_fastapi.router, prefix="/api/v2/part-detection")
+    app.add_middleware(StageTimingMiddleware)
+    return TestClient(app)
+
+def detect(client, path="/api/v2/part-detection/detect", files=None, model_version=None):
+    return client.post(
+        path,
+        params={"model_version": model_version} if model_version else None,
+        files=files or {"image": ("part.jpg", b"\xff\xd8", "image/jpeg")},
+        headers={"x-api-key": "test-key"}
+    )
+
+def stage_count(endpoint, stage_name, version="V2"):
+    return REGISTRY.get_sample_value(
+        "request_stage_duration_seconds_count",
+        {"endpoint": endpoint, "model_version": version, "stage": stage_name}
+    ) or 0
+
+class TestRequestTimings:
+    """Test cases for the per-request stage accumulator"""
+
+    def test_repeated_stages_accumulate(self):
+        timings = RequestTimings(started=0.0)
+        timings.add("decode", 0.010)
+        timings.add("decode", 0.005)
+        timings.add("inference", 0.040)
+
+        assert timings.stages == {"decode": pytest.approx(0.015), "inference": 0.040}
+        header = timings.server_timing()
+        assert header.startswith("decode;dur=15.00, inference;dur=40.00, total;dur=")
+
+    def test_model_version_label_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(settings, "MODEL_VERSIONS", {"V2": "models/v2.pt"})
+        monkeypatch.setattr(settings, "PRELOAD_MODEL_VERSIONS", ["3"])
+
+        assert model_version_label(None) == "default"
+        assert model_version_label("V2") == "V2"
+        assert model_version_label("3") == "3"
+        assert model_version_label("17") == "other"
+
+    def test_stage_is_a_no_op_outside_a_request(self):
+        assert current_timings() is None
+        with stage("decode"):
+            pass
+        assert current_timings() is None
+
+class TestStageTimingMiddleware:
+    """Test cases for stage histograms and the Server-Timing header"""
+
+    def test_stages_are_observed_per_endpoint_and_version(self, client):
+        endpoint = "/api/v2/part-detection/detect"
+        before = {name: stage_count(endpoint, name) for name in ("upload", "decode", "inference", "serialize")}
+
+        assert detect(client, model_version="V2").status_code == 200
+
+        for name, count in before.items():
+            assert stage_count(endpoint, name) == count + 1
+
+    def test_server_timing_header_when_enabled(self, client, monkeypatch):
+        monkeypatch.setattr(settings, "SERVER_TIMING_ENABLED", True)
+
+        response = detect(client)
+
+        entries = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+        assert entries == ["upload", "decode", "inference", "serialize", "total"]
+
+    def test_no_server_timing_header_by_default(self, client, monkeypatch):
+        monkeypatch.setattr(settings, "SERVER_TIMING_ENABLED", False)
+        assert "server-timing" not in detect(client).headers
+
+    def test_batch_endpoint_sums_stages_over_images(self, client, monkeypatch):
+        monkeypatch.setattr(settings, "SERVER_TIMING_ENABLED", True)
+        files = [("images", (f"part{i}.jpg", b"\xff\xd8", "image/jpeg")) for i in range(3)]
+
+        response = detect(client, "/api/v2/part-detection/batch-detect", files)
+
+        assert response.status_code == 200
+        assert response.headers["server-timing"].count("decode;") == 1
+
+    def test_uninstrumented_routes_are_left_alone(self, client, monkeypatch):
+        monkeypatch.setattr(settings, "SERVER_TIMING_ENABLED", True)
+        response = client.get("/api/v2/part-detection/health")
+        assert response.status_code == 200
+        assert "server-timing" not in response.headers
+
+    def test_unconfigured_version_is_labelled_other(self, client, monkeypatch):
+        monkeypatch.setattr(registry_module, "is_registered_version", lambda version: True)
+        monkeypatch.setattr(registry_module, "_registered_versions", set())
+        endpoint = "/api/v2/part-detection/detect"
+        before = stage_count(endpoint, "inference", version="other")
+
+        assert detect(client, model_version="17").status_code == 200
+
+        assert stage_count(endpoint, "inference", version="other") == before + 1
+        assert stage_count(endpoint, "inference", version="17") == 0
+
+    def test_endpoint_label_is_the_route_template(self):
+        router = APIRouter()
+
+        @router.get("/items/{item_id}")
+        async def item(item_id: str):
+            with stage("decode"):
+                pass
+            return {"id": item_id}
+
+        app = FastAPI()
+        app.include_router(router, prefix="/api/v2/templated")
+        app.add_middleware(StageTimingMiddleware)
+        client = TestClient(app)
+        for item_id in ("a", "b"):
+            assert client.get(f"/api/v2/templated/items/{item_id}").status_code == 200
+
+        assert stage_count("/api/v2/templated/items/{item_id}", "decode", version="default") == 2
+        assert stage_count("/api/v2/templated/items/a", "decode", version="default") == 0
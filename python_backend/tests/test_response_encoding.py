@@ -0,0 +1,114 @@
+"""Tests for detection response content negotiation and binary encodings."""
+
+import json
+import numpy as np
+import pytest
+from apis.responses import (
+    ARROW_MEDIA_TYPE, JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE,
+    detection_response, encode_arrow, encode_msgpack, negotiate_media_type
+)
+
+def make_result(n, offset=0.0):
+    bbox = [[offset + i, offset + i + 1, offset + i + 2, offset + i + 3] for i in range(n)]
+    confidence = [0.5 + i / (2 * max(n, 1)) for i in range(n)]
+    class_id = [i % 3 for i in range(n)]
+    class_name = [["motor", "blade", "sensor"][c] for c in class_id]
+    return {
+        "detections": [
+            {"bbox": b, "confidence": c, "class_id": k, "class_name": name, "center": [0.0, 0.0]}
+            for b, c, k, name in zip(bbox, confidence, class_id, class_name)
+        ],
+        "image_info": {"width": 640, "height": 480, "channels": 3},
+        "model_info": {"framework": "YOLOv8", "confidence_threshold": 0.5, "model_version": "1"}
+    }
+
+class TestNegotiation:
+    """Test cases for Accept header negotiation"""
+
+    @pytest.mark.parametrize("accept, expected", [
+        (None, JSON_MEDIA_TYPE),
+        ("*/*", JSON_MEDIA_TYPE),
+        ("application/json", JSON_MEDIA_TYPE),
+        ("application/x-msgpack", MSGPACK_MEDIA_TYPE),
+        ("application/vnd.apache.arrow.stream, application/json;q=0.5", ARROW_MEDIA_TYPE),
+        ("application/json;q=0.9, application/x-msgpack", MSGPACK_MEDIA_TYPE),
+        ("application/x-msgpack;q=0", JSON_MEDIA_TYPE),
+        ("text/html", JSON_MEDIA_TYPE),
+    ])
+    def test_negotiate(self, accept, expected):
+        assert negotiate_media_type(accept) == expected
+
+class TestBinaryEncodings:
+    """Test cases for MessagePack and Arrow IPC payloads"""
+
+    def test_msgpack_round_trip(self):
+        msgpack = pytest.importorskip("msgpack")
+        result = make_result(5)
+        payload = msgpack.unpackb(encode_msgpack({"success": True, "data": result}, result), raw=False)
+
+        data = payload["data"]
+        assert payload["success"] is True
+        assert data["count"] == 5
+        boxes = np.frombuffer(data["bbox"], dtype="<f4").reshape(-1, 4)
+        np.testing.assert_allclose(boxes, [d["bbox"] for d in result["detections"]])
+        np.testing.assert_allclose(
+            np.frombuffer(data["confidence"], dtype="<f4"),
+            [d["confidence"] for d in result["detections"]],
+            rtol=1e-6
+        )
+        assert np.frombuffer(data["class_id"], dtype="<i4").tolist() == [0, 1, 2, 0, 1]
+        assert data["class_name"] == ["motor", "blade", "sensor", "motor", "blade"]
+        assert data["image_info"] == result["image_info"]
+
+    def test_arrow_batch_round_trip(self):
+        pa = pytest.importorskip("pyarrow")
+        results = [make_result(3), make_result(0), make_result(2, offset=100.0)]
+        body = encode_arrow({"success": True, "processed_count": 3, "data": results}, results)
+
+        table = pa.ipc.open_stream(body).read_all()
+        assert table.column("image_index").to_pylist() == [0, 0, 0, 2, 2]
+        assert table.column("bbox").to_pylist()[3] == [100.0, 101.0, 102.0, 103.0]
+        assert table.column("class_name").to_pylist() == ["motor", "blade", "sensor", "motor", "blade"]
+
+        metadata = table.schema.metadata
+        assert json.loads(metadata[b"envelope"]) == {"success": True, "processed_count": 3, "batch": True}
+        assert len(json.loads(metadata[b"images"])) == 3
+
+    def test_columnar_result_is_used_when_present(self):
+        msgpack = pytest.importorskip("msgpack")
+        result = make_result(0)
+        result["columnar"] = {
+            "bbox": [[1.0, 2.0, 3.0, 4.0]], "confidence": [0.9], "class_id": [1],
+            "class_name": ["blade"], "center": [[2.0, 3.0]]
+        }
+        payload = msgpack.unpackb(encode_msgpack({}, result), raw=False)
+        assert payload["data"]["count"] == 1
+
+    def test_detector_arrays_are_packed_as_is(self):
+        msgpack = pytest.importorskip("msgpack")
+        pa = pytest.importorskip("pyarrow")
+        result = make_result(0)
+        result["arrays"] = {
+            "bbox": np.array([[1.0, 2.0, 3.0, 4.0], [5.0, 6.0, 7.0, 8.0]], dtype=np.float32),
+            "confidence": np.array([0.9, 0.8], dtype=np.float32),
+            "class_id": np.array([1, 2], dtype=np.int64),
+            "class_name": ["blade", "sensor"]
+        }
+
+        data = msgpack.unpackb(encode_msgpack({}, result), raw=False)["data"]
+        assert data["count"] == 2
+        assert data["bbox"] == result["arrays"]["bbox"].tobytes()
+        assert np.frombuffer(data["class_id"], dtype="<i4").tolist() == [1, 2]
+
+        table = pa.ipc.open_stream(encode_arrow({}, [result, make_result(1)])).read_all()
+        assert table.column("image_index").to_pylist() == [0, 0, 1]
+        assert table.column("class_id").type == pa.int32()
+        assert table.column("bbox").to_pylist()[1] == [5.0, 6.0, 7.0, 8.0]
+
+    def test_detection_response_media_types(self):
+        pytest.importorskip("msgpack")
+        pytest.importorskip("pyarrow")
+        content = {"success": True, "data": make_result(2)}
+        assert detection_response(JSON_MEDIA_TYPE, content).media_type == JSON_MEDIA_TYPE
+        assert detection_response(MSGPACK_MEDIA_TYPE, content).media_type == MSGPACK_MEDIA_TYPE
+        assert detection_response(ARROW_MEDIA_TYPE, content).media_type == ARROW_MEDIA_TYPE
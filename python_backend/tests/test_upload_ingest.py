@@ -0,0 +1,137 @@
+"""Tests for zero-copy upload ingestion."""
+
+import io
+import tempfile
+import cv2
+import numpy as np
+import pytest
+from ai_services.preprocessing.ingest import (
+    BufferPool, UploadTooLarge, decode_image, decode_image_reduced, jpeg_dimensions, open_upload, reduction_factor
+)
+
+def encode_image(size=(60, 50), ext=".png"):
+    ok, buffer = cv2.imencode(ext, np.full((size[1], size[0], 3), 127, dtype=np.uint8))
+    assert ok
+    return buffer.tobytes()
+
+class NonSeekableStream:
+    """Stream without readinto/fileno, like a socket-backed body."""
+
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return self._stream.read(size)
+
+def spooled(data, max_size):
+    spool = tempfile.SpooledTemporaryFile(max_size=max_size)
+    spool.write(data)
+    spool.seek(0)
+    return spool
+
+class TestOpenUpload:
+    """Test cases for open_upload"""
+
+    def test_in_memory_spool_is_viewed_in_place(self):
+        data = encode_image()
+        with spooled(data, max_size=1 << 20) as spool:
+            with open_upload(spool) as view:
+                assert not spool._rolled
+                assert isinstance(view, memoryview) and view.readonly
+                assert bytes(view) == data
+                assert decode_image(view).shape == (50, 60, 3)
+            # The export is released, so the spool can be written to and closed again
+            spool.write(b"more")
+
+    def test_rolled_spool_is_mmapped(self):
+        data = encode_image()
+        with spooled(data, max_size=16) as spool:
+            assert spool._rolled
+            with open_upload(spool) as view:
+                assert bytes(view) == data
+                assert decode_image(view).shape == (50, 60, 3)
+
+    def test_respects_current_position(self):
+        data = encode_image()
+        stream = io.BytesIO(b"junk" + data)
+        stream.seek(4)
+        with open_upload(stream) as view:
+            assert bytes(view) == data
+
+    def test_stream_is_read_in_chunks(self):
+        data = encode_image()
+        stream = NonSeekableStream(data)
+        with open_upload(stream, chunk_size=32) as view:
+            assert bytes(view) == data
+        assert stream.reads == len(data) // 32 + 2
+
+    def test_oversized_stream_is_rejected_without_reading_it_all(self):
+        stream = NonSeekableStream(b"\0" * 10_000)
+        with pytest.raises(UploadTooLarge):
+            with open_upload(stream, max_bytes=100, chunk_size=64):
+                pass
+        assert stream.reads == 2
+
+    @pytest.mark.parametrize("max_size", [1 << 20, 16])
+    def test_oversized_spool_is_rejected(self, max_size):
+        with spooled(b"\0" * 1000, max_size=max_size) as spool:
+            with pytest.raises(UploadTooLarge):
+                with open_upload(spool, max_bytes=999):
+                    pass
+
+    def test_undecodable_data(self):
+        with open_upload(io.BytesIO(b"not an image")) as view:
+            with pytest.raises(ValueError):
+                decode_image(view)
+
+class TestBufferPool:
+    """Test cases for BufferPool reuse"""
+
+    def test_buffers_are_reused(self):
+        pool = BufferPool(max_idle=1)
+        buffer = pool.acquire()
+        buffer.extend(b"\0" * 10)
+        pool.release(buffer)
+        assert pool.acquire() is buffer
+        assert len(pool.acquire()) == 0
+
+    def test_large_buffers_are_not_kept(self):
+        pool = BufferPool(max_buffer_bytes=4)
+        pool.release(bytearray(8))
+        assert len(pool.acquire()) == 0
+
+class TestReducedDecode:
+    """Test cases for reduced-resolution JPEG decoding"""
+
+    def test_jpeg_dimensions_from_header(self):
+        assert jpeg_dimensions(encode_image((1234, 567), ext=".jpg")) == (1234, 567)
+        assert jpeg_dimensions(encode_image((64, 32), ext=".png")) is None
+        assert jpeg_dimensions(b"\xff\xd8\xff") is None
+
+    @pytest.mark.parametrize("width, height, factor", [
+        (4000, 3000, 4), (5200, 3900, 8), (1280, 720, 2), (1000, 800, 1), (640, 640, 1)
+    ])
+    def test_reduction_factor_keeps_long_side_above_target(self, width, height, factor):
+        assert reduction_factor(width, height, 640) == factor
+
+    def test_large_jpeg_is_decoded_reduced(self):
+        image, original_shape = decode_image_reduced(encode_image((2600, 1300), ext=".jpg"), 640)
+        assert original_shape == (1300, 2600, 3)
+        assert image.shape == (325, 650, 3)
+
+    def test_exif_rotation_is_applied_to_original_shape(self):
+        from PIL import Image
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotate 90 degrees clockwise
+        buffer = io.BytesIO()
+        Image.fromarray(np.zeros((1300, 2600, 3), dtype=np.uint8)).save(buffer, "JPEG", exif=exif.tobytes())
+
+        image, original_shape = decode_image_reduced(buffer.getvalue(), 640)
+        assert image.shape == (650, 325, 3)
+        assert original_shape == (2600, 1300, 3)
+
+    def test_small_or_non_jpeg_is_decoded_in_full(self):
+        image, original_shape = decode_image_reduced(encode_image((2600, 1300)), 640)
+        assert image.shape == original_shape == (1300, 2600, 3)